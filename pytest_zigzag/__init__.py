@@ -5,15 +5,35 @@
 # ======================================================================================================================
 from __future__ import absolute_import
 import os
-import re
+import time
+import socket
 import pytest
 from json import loads
 from datetime import datetime
-# noinspection PyPackageRequirements
-from zigzag.zigzag import ZigZag
+from multiprocessing.pool import ThreadPool
 from pkg_resources import resource_stream
 from jsonschema import validate, ValidationError
+from pytest_zigzag.artifacts import ArtifactStore, attach
+from pytest_zigzag.backends import create_backend
+from pytest_zigzag.events import EventStream
+from pytest_zigzag.budget import TimeBudget, SKIP_REASON
+from pytest_zigzag.checkpoint import CheckpointJournal, make_record
+from pytest_zigzag.computed_props import compute_properties
+from pytest_zigzag.compaction import cap_captured_output, dedupe_tracebacks
+from pytest_zigzag.dependencies import DependencyGraph, DEPENDS_ON_MARK, DEPENDENCY_FAILED
+from pytest_zigzag.dry_run import StageProfiler
+from pytest_zigzag.fixture_costs import FixtureCosts, format_costs
+from pytest_zigzag.flaky import OutcomeHistory, QUARANTINE_MODES, report_outcome
+from pytest_zigzag.merge import merge_into, MERGE_STRATEGIES
+from pytest_zigzag.metrics import SessionMetrics
+from pytest_zigzag.outage import OutageBreaker, OUTAGE
+from pytest_zigzag.resume import StepProgress
+from pytest_zigzag.rollup import rollup_steps
 from pytest_zigzag.session_messages import SessionMessages
+from pytest_zigzag.tracing import Tracer
+from pytest_zigzag.upload import CircuitBreaker, upload_with_retries
+from pytest_zigzag.upload_policy import split_results, write_failures_only, UPLOAD_POLICIES
+from pytest_zigzag.validation import validate_results_file
 
 __version__ = '1.1.1'
 
@@ -45,7 +65,8 @@ def _capture_marks(items, mark_names):
 
 
 def _capture_config_path(session):
-    """Capture the CI environment variables for the current session using the scheme specified by the user.
+    """Capture the CI environment variables and the computed properties for the current session using the scheme
+    specified by the user.
 
     Args:
         session (_pytest.main.Session): The pytest session object
@@ -68,6 +89,14 @@ def _capture_config_path(session):
             for key, val in list(config_dict['pytest_zigzag_env_vars'].items()):
                 junit_xml_config.add_global_property(key, os.getenv(key, val))
 
+            # Record the values of commands and files which are computed concurrently or read from the cache
+            computed_props = config_dict.get('pytest_zigzag_computed_props')
+            if computed_props:
+                values, errors = compute_properties(computed_props, getattr(session.config, 'cache', None))
+                for key, val in values.items():
+                    junit_xml_config.add_global_property(key, val)
+                session.config._zigzag_computed_errors = errors
+
 
 def _get_option_of_highest_precedence(config, option_name):
     """looks in the config and returns the option of the highest precedence
@@ -96,8 +125,571 @@ def _get_option_of_highest_precedence(config, option_name):
     return highest_precedence
 
 
-def _validate_qtest_token(token):
-    return token if re.match("^[a-zA-Z0-9]+$", token) else ""
+def _get_typed_option(config, option_name, cast, default=None):
+    """Looks up an option of highest precedence and converts it to the desired type.
+
+    Args:
+        config (_pytest.config.Config): The pytest config object
+        option_name (str): The name of the option
+        cast (type): The type to convert the option value into. (e.g. int, float)
+        default (object): The value to return if the option is not present.
+
+    Returns:
+        object: The converted value of the option or the default.
+    """
+
+    value = _get_option_of_highest_precedence(config, option_name)
+    if value is None or value == '':
+        return default
+
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        pytest.exit("The '{}' option must be of type '{}'!".format(option_name, cast.__name__), returncode=1)
+
+
+def _make_breaker(config):
+    """Create the upload circuit breaker configured for the session.
+
+    Args:
+        config (_pytest.config.Config): The pytest config object
+
+    Returns:
+        CircuitBreaker: The circuit breaker.
+    """
+
+    return CircuitBreaker(_get_typed_option(config, 'zigzag-upload-breaker-threshold', int, 0),
+                          _get_typed_option(config, 'zigzag-upload-breaker-cooldown', float, 600.0),
+                          getattr(config, 'cache', None))
+
+
+def _upload_deadline(config):
+    """Get the time by which the whole upload must finish from the upload deadline and the session time budget.
+
+    Args:
+        config (_pytest.config.Config): The pytest config object
+
+    Returns:
+        float: The deadline in seconds since the epoch or None for no limit.
+    """
+
+    deadline = _get_typed_option(config, 'zigzag-upload-deadline', float)
+    budget = getattr(config, '_zigzag_time_budget', None)
+    if budget is not None:  # give up before the job is killed
+        deadline = max(min(budget.remaining, deadline or budget.remaining), 0.001)
+
+    return time.time() + deadline if deadline is not None else None
+
+
+def _upload_file(session, backend, file_path, breaker=None, deadline_at=None):
+    """Upload a JUnitXML results file with the upload backend using the retry policy configured for the session.
+
+    Args:
+        session (_pytest.main.Session): The pytest session object
+        backend (pytest_zigzag.backends.UploadBackend): The prepared upload backend.
+        file_path (str): The path to the JUnitXML results file.
+        breaker (CircuitBreaker): A circuit breaker shared with concurrent uploads. (Optional)
+        deadline_at (float): The time by which the whole upload must finish in seconds since the epoch. (Optional)
+
+    Returns:
+        object: The queue job ID or the reference returned by the backend.
+    """
+
+    config = session.config
+    deadline = max(deadline_at - time.time(), 0.001) if deadline_at is not None else None  # the time left
+
+    metrics = getattr(config, '_zigzag_metrics', None)
+    if metrics is not None:
+        metrics.documents += 1
+        size = os.path.getsize(file_path)
+
+    def upload():
+        if metrics is None:
+            return backend.upload(file_path)
+        sent = time.time()
+        if backend.splits_upload:
+            parsed = backend.parse(file_path)
+            metrics.record_parse(time.time() - sent)
+            sent = time.time()
+            send = backend.send
+        else:  # a custom backend which only overrides 'upload' is timed as a whole
+            parsed, send = file_path, backend.upload
+        try:
+            result = send(parsed)
+        except Exception:
+            metrics.record_attempt(time.time() - sent, size, False)
+            raise
+        metrics.record_attempt(time.time() - sent, size, True)
+
+        return result
+
+    return upload_with_retries(upload,
+                               SESSION_MESSAGES,
+                               retries=_get_typed_option(config, 'zigzag-upload-retries', int, 0),
+                               backoff=_get_typed_option(config, 'zigzag-upload-backoff', float, 1.0),
+                               jitter=_get_typed_option(config, 'zigzag-upload-jitter', float, 0.5),
+                               attempt_timeout=_get_typed_option(config, 'zigzag-upload-timeout', float),
+                               deadline=deadline,
+                               breaker=breaker or _make_breaker(config))
+
+
+def _upload_chunks(session, backend, chunk_paths, deadline_at=None):
+    """Upload the chunks of a split JUnitXML results file in parallel with a bounded number of connections.
+
+    Args:
+        session (_pytest.main.Session): The pytest session object
+        backend (pytest_zigzag.backends.UploadBackend): The prepared upload backend.
+        chunk_paths (list(str)): The paths to the chunks.
+        deadline_at (float): The time by which every chunk must be uploaded in seconds since the epoch. (Optional)
+
+    Returns:
+        list: The queue job IDs in chunk order.
+
+    Raises:
+        RuntimeError: One or more chunks failed to upload. (The job IDs of the other chunks are reported)
+    """
+
+    config = session.config
+    breaker = _make_breaker(config)
+
+    def upload(chunk_path):
+        try:
+            return _upload_file(session, backend, chunk_path, breaker, deadline_at), None
+        except Exception as e:  # report every chunk even if some fail
+            return None, e
+
+    pool = ThreadPool(max(1, _get_typed_option(config, 'zigzag-upload-connections', int, 4)))
+    try:
+        results = pool.map(upload, chunk_paths)
+    finally:
+        pool.close()
+        pool.join()
+
+    job_ids = [job_id for job_id, error in results if error is None]
+    errors = [error for _, error in results if error is not None]
+    if errors:
+        if job_ids:
+            SESSION_MESSAGES.append("Queue Job IDs of the uploaded chunks: {}".format(', '.join(map(str, job_ids))))
+        raise RuntimeError("{} of {} chunk uploads failed: {}".format(len(errors), len(results), errors[0]))
+
+    return job_ids
+
+
+def _build_upload_documents(config, junit_file_path, temp_paths):
+    """Build the upload documents for a JUnitXML results file according to the upload policy and payload size options.
+
+    Args:
+        config (_pytest.config.Config): The pytest config object
+        junit_file_path (str): The path to the JUnitXML results file. (Unchanged)
+        temp_paths (list(str)): The paths of the temporary files written are appended to this list for cleanup.
+
+    Returns:
+        list(str): The paths of the documents to upload.
+    """
+
+    upload_file_path = junit_file_path
+    if _get_option_of_highest_precedence(config, 'zigzag-upload-policy') == 'failures':
+        upload_file_path = '{}.zigzag-upload.xml'.format(junit_file_path)
+        temp_paths.append(upload_file_path)
+        group_by = _get_option_of_highest_precedence(config, 'zigzag-summary-group') or 'module'
+        included, summarized = write_failures_only(junit_file_path, upload_file_path, group_by)
+        SESSION_MESSAGES.append("Uploading {} failed, errored or skipped tests and a summary of {} passed "
+                                "tests".format(included, summarized))
+
+    max_bytes = _get_typed_option(config, 'zigzag-max-payload-bytes', int)
+    chunk_paths = split_results(upload_file_path, max_bytes) if max_bytes else []
+    if chunk_paths:
+        temp_paths.extend(chunk_paths)
+        SESSION_MESSAGES.append("Split the upload into {} chunks of at most {} bytes".format(len(chunk_paths),
+                                                                                             max_bytes))
+        return chunk_paths
+
+    return [upload_file_path]
+
+
+def _remove_files(paths):
+    """Remove files which exist.
+
+    Args:
+        paths (list(str)): The paths of the files.
+    """
+
+    for path in paths:
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def _upload_results(session, backend, junit_file_path, deadline_at=None):
+    """Build the upload documents for a JUnitXML results file according to the upload options and upload them.
+
+    Args:
+        session (_pytest.main.Session): The pytest session object
+        backend (pytest_zigzag.backends.UploadBackend): The prepared upload backend.
+        junit_file_path (str): The path to the JUnitXML results file. (Unchanged)
+        deadline_at (float): The time by which the whole upload must finish in seconds since the epoch. (Optional)
+
+    Returns:
+        list: The queue job IDs.
+    """
+
+    temp_paths = []
+    try:
+        upload_paths = _build_upload_documents(session.config, junit_file_path, temp_paths)
+        if len(upload_paths) > 1:
+            return _upload_chunks(session, backend, upload_paths, deadline_at)
+
+        return [_upload_file(session, backend, upload_paths[0], deadline_at=deadline_at)]
+    finally:
+        _remove_files(temp_paths)
+
+
+def _dry_run_upload(session, backend, junit_file_path, profiler):
+    """Build and serialize the upload payloads for a JUnitXML results file without sending them and report the cost
+    of each stage.
+
+    Args:
+        session (_pytest.main.Session): The pytest session object
+        backend (pytest_zigzag.backends.UploadBackend): The prepared upload backend.
+        junit_file_path (str): The path to the JUnitXML results file. (Unchanged)
+        profiler (StageProfiler): The profiler which timed the earlier stages.
+    """
+
+    payload_path = _get_option_of_highest_precedence(session.config, 'zigzag-dry-run-payload')
+    temp_paths = []
+    payload_bytes = 0
+    try:
+        with profiler.stage('build'):
+            upload_paths = _build_upload_documents(session.config, junit_file_path, temp_paths)
+        for index, upload_path in enumerate(upload_paths, 1):
+            with profiler.stage('parse'):
+                parsed = backend.parse(upload_path)
+            with profiler.stage('serialize'):
+                payload = backend.serialize(parsed)
+            payload_bytes += len(payload)
+            if payload_path:
+                path = payload_path if len(upload_paths) == 1 else '{}.{}'.format(payload_path, index)
+                with open(path, 'wb') as f:
+                    f.write(payload)
+    finally:
+        _remove_files(temp_paths)
+
+    peak, measure = profiler.peak_memory
+    SESSION_MESSAGES.append("ZigZag dry run with the '{}' backend (nothing was sent):".format(backend.name))
+    for stage, duration in profiler.durations.items():
+        SESSION_MESSAGES.append("  {}: {:.3f}s".format(stage, duration))
+    SESSION_MESSAGES.append("  payload: {} bytes in {} document(s)".format(payload_bytes, len(upload_paths)))
+    if peak is not None:
+        SESSION_MESSAGES.append("  peak memory: {:.1f} MiB ({})".format(peak / 1048576.0, measure))
+    if payload_path:
+        SESSION_MESSAGES.append("  payload written to: {}".format(payload_path if len(upload_paths) == 1 else
+                                                                  '{}.1-{}'.format(payload_path, len(upload_paths))))
+
+
+def _upload_attachments(session, backend):
+    """Upload the attachment blobs stored during the session which were not sent to the backend's destination before.
+
+    Args:
+        session (_pytest.main.Session): The pytest session object
+        backend (pytest_zigzag.backends.UploadBackend): The prepared upload backend.
+    """
+
+    config = session.config
+    store = getattr(config, '_zigzag_artifacts', None)
+    if store is None or not store.attached:
+        return
+
+    if not backend.supports_attachments:
+        SESSION_MESSAGES.append("The '{}' backend does not support attachments: {} attachment blobs were kept in "
+                                "'{}'".format(backend.name, len(store.attached), store.root))
+        return
+
+    sent = store.sent(backend.destination)
+    pending = sorted(store.attached - sent)
+    failed = []
+    for digest in pending:
+        try:
+            upload_with_retries(lambda: backend.upload_blob(digest, store.path(digest)),
+                                [],  # attempts are only reported for the results
+                                retries=_get_typed_option(config, 'zigzag-upload-retries', int, 0),
+                                backoff=_get_typed_option(config, 'zigzag-upload-backoff', float, 1.0),
+                                attempt_timeout=_get_typed_option(config, 'zigzag-upload-timeout', float),
+                                idempotent=True)  # blobs are stored by their digest
+        except Exception as e:  # report every blob even if some fail
+            failed.append(str(e))
+        else:
+            store.mark_sent(backend.destination, digest)
+
+    SESSION_MESSAGES.append("Uploaded {} attachment blobs ({} already sent)".format(len(pending) - len(failed),
+                                                                                    len(store.attached) - len(pending)))
+    if failed:
+        SESSION_MESSAGES.append("{} attachment blob uploads failed: {}".format(len(failed), failed[0]))
+
+
+def _publish_results(session, dry_run, profiler):
+    """Validate the JUnitXML results file of the session, or the merged results file if the user merges sessions, and
+    upload it with the configured backend, or only build the payload for a dry run.
+
+    Args:
+        session (_pytest.main.Session): The pytest session object
+        dry_run (bool): Build and serialize the payload without sending it.
+        profiler (StageProfiler): The profiler timing each stage.
+
+    Returns:
+        bool: Whether the results were uploaded.
+    """
+
+    # upload everything merged so far instead of only this session
+    junit_file_path = (_get_option_of_highest_precedence(session.config, 'zigzag-merge-into')
+                       or getattr(session.config, '_xml', None).logfile)
+
+    # validate the backend settings and credentials (e.g. the qTest API token)
+    with profiler.stage('config'):
+        backend = create_backend(lambda option_name: _get_option_of_highest_precedence(session.config, option_name))
+    with profiler.stage('prepare'):
+        backend.prepare()
+
+    # validate locally to avoid a wasted round trip for a malformed results file
+    with profiler.stage('validate'):
+        validation = validate_results_file(junit_file_path, getattr(session.config, 'cache', None))
+    if validation.invalid:
+        SESSION_MESSAGES.append('The ZigZag upload was skipped because the results file is not valid')
+        SESSION_MESSAGES.append("Invalid testcases: {}".format(', '.join(validation.invalid)))
+        return False
+
+    if dry_run:
+        _dry_run_upload(session, backend, junit_file_path, profiler)
+        return False
+
+    deadline_at = _upload_deadline(session.config)  # shared by every chunk
+    with profiler.stage('upload'):
+        job_ids = _upload_results(session, backend, junit_file_path, deadline_at)
+    SESSION_MESSAGES.append("ZigZag upload was successful!")
+    if len(job_ids) == 1:
+        SESSION_MESSAGES.append("Queue Job ID: {}".format(job_ids[0]))
+    else:
+        SESSION_MESSAGES.append("Queue Job IDs: {}".format(', '.join(map(str, job_ids))))
+
+    with profiler.stage('attachments'):
+        _upload_attachments(session, backend)
+
+    return True
+
+
+def _trace_upload(config, profiler, start, succeeded, error, dry_run):
+    """Trace the upload with a child span for each of its stages.
+
+    Args:
+        config (_pytest.config.Config): The pytest config object
+        profiler (StageProfiler): The profiler which timed the stages of the upload.
+        start (float): When the upload started in seconds since the epoch.
+        succeeded (bool): Whether the results were uploaded.
+        error (str): The error which stopped the upload. (Optional)
+        dry_run (bool): Whether it was a dry run.
+    """
+
+    tracer = config._zigzag_tracer
+    span = tracer.start_span('zigzag dry run' if dry_run else 'zigzag upload', config._zigzag_session_span,
+                             {'zigzag.backend': _get_option_of_highest_precedence(config, 'zigzag-backend')}, start)
+    if not succeeded:
+        span.error = error or 'The upload was not successful'
+    for name, stage_start, stage_end in profiler.timeline:
+        tracer.record_span(name, span, stage_start, stage_end)
+    tracer.end_span(span)
+
+
+def _write_metrics(config, metrics):
+    """Write the session and upload metrics to the Prometheus textfile and the JSON file chosen by the user.
+
+    Args:
+        config (_pytest.config.Config): The pytest config object
+        metrics (SessionMetrics): The metrics of the session.
+    """
+
+    for option_name, write in (('zigzag-metrics-textfile', metrics.write_textfile),
+                               ('zigzag-metrics-json', metrics.write_json)):
+        path = _get_option_of_highest_precedence(config, option_name)
+        if path:
+            try:
+                write(path)
+            except (IOError, OSError) as e:
+                SESSION_MESSAGES.append("Failed to write the metrics to '{}': {}".format(path, e))
+
+
+def _emit_event(config, event_type, **fields):
+    """Emit an event to the live event stream if the user enabled it.
+
+    Args:
+        config (_pytest.config.Config): The pytest config object
+        event_type (str): The type of the event.
+        **fields: Additional JSON serializable fields for the event.
+    """
+
+    event_stream = getattr(config, '_zigzag_event_stream', None)
+    if event_stream is not None:
+        fields.update(event=event_type, session=config._zigzag_session_id, timestamp=time.time())
+        event_stream.emit(fields)
+
+
+def _emit_test_event(item, report):
+    """Emit an event describing the outcome of a single test phase.
+
+    Args:
+        item (_pytest.nodes.Item): An item object.
+        report (_pytest.runner.TestReport): The report for the test phase.
+    """
+
+    if getattr(item.config, '_zigzag_event_stream', None) is None:
+        return
+
+    test_step = TEST_STEPS_MARK in item.keywords
+    step_class = item.getparent(pytest.Class) if test_step else None
+    _emit_event(item.config,
+                'test_report',
+                nodeid=report.nodeid,
+                when=report.when,
+                outcome=report.outcome,
+                duration=report.duration,
+                test_id=next((v for k, v in item.user_properties if k == 'test_id'), None),
+                jira=[v for k, v in item.user_properties if k == 'jira'],
+                test_step=test_step,
+                step_class=step_class.nodeid if step_class is not None else None)
+
+
+def _trace_attributes(item):
+    """Get the trace attributes which identify a test case.
+
+    Args:
+        item (_pytest.nodes.Item): An item object.
+
+    Returns:
+        dict: Attribute values by key.
+    """
+
+    return {'pytest.nodeid': item.nodeid,
+            'test_id': next((v for k, v in item.user_properties if k == 'test_id'), None),
+            'jira': [v for k, v in item.user_properties if k == 'jira'] or None}
+
+
+def _trace_report(item, call, report):
+    """Trace a single test phase as a child span of the test case and mark the test case and its test case with steps
+    class as failed if the phase failed.
+
+    Args:
+        item (_pytest.nodes.Item): An item object.
+        call (_pytest.runner.CallInfo): The call info object for the test phase.
+        report (_pytest.runner.TestReport): The report for the test phase.
+    """
+
+    span = item._zigzag_span
+    error = None
+    if report.failed:
+        error = call.excinfo.exconly() if call.excinfo is not None else '{} failed'.format(report.when)
+    item.config._zigzag_tracer.record_span(report.when, span, call.start, call.stop,
+                                           {'pytest.outcome': report.outcome}, error)
+
+    if report.when == 'call' or not report.passed:
+        span.attributes['pytest.outcome'] = report.outcome
+    if error is not None:
+        span.error = error
+        class_span = getattr(item.parent, '_zigzag_span', None)
+        if class_span is not None:
+            class_span.error = 'step failed: {}'.format(item.name)
+
+
+def _resolve_dependencies(config, items):
+    """Resolve the 'depends_on' marks of the collected tests and exit if a target is ambiguous or they form a cycle.
+
+    Args:
+        config (_pytest.config.Config): The pytest config object
+        items (list(_pytest.nodes.Item)): List of item objects.
+    """
+
+    if not any(item.get_closest_marker(DEPENDS_ON_MARK) for item in items):
+        return
+
+    dependencies = DependencyGraph(items, TEST_STEPS_MARK)
+    if dependencies.ambiguous:
+        nodeid, target, modules = dependencies.ambiguous[0]
+        pytest.exit("The 'depends_on' target '{}' of '{}' matches tests in several other modules: {}. Use a node ID "
+                    "or a 'test_id' instead.".format(target, nodeid, ', '.join(modules)), returncode=1)
+    cycle = dependencies.find_cycle()
+    if cycle:
+        pytest.exit("The 'depends_on' marks form a cycle: {}".format(' -> '.join(cycle)), returncode=1)
+    config._zigzag_dependencies = dependencies
+
+
+def _start_checkpoint_journal(config, items):
+    """Start the checkpoint journal if the user enabled it and deselect the tests already completed when resuming.
+
+    Args:
+        config (_pytest.config.Config): The pytest config object
+        items (list(_pytest.nodes.Item)): List of item objects.
+    """
+
+    journal_path = _get_option_of_highest_precedence(config, 'zigzag-checkpoint')
+    resume = _get_option_of_highest_precedence(config, 'zigzag-resume')
+
+    if not (journal_path or resume) or config.option.collectonly:
+        return
+    if not journal_path:
+        if not getattr(config, 'cache', None):
+            return
+        journal_path = str(config.cache.makedir('zigzag').join('checkpoint.jsonl'))
+
+    config._zigzag_checkpoint = CheckpointJournal(journal_path,
+                                                  resume=bool(resume),
+                                                  batch_size=_get_typed_option(config, 'zigzag-checkpoint-batch',
+                                                                               int, 20))
+    if resume:
+        config._zigzag_checkpoint.deselect_completed(config, items)
+
+
+def _start_outcome_history(config, items):
+    """Load the outcome history if the user enabled it, add the flip rate of each test as a property and quarantine
+    flaky tests.
+
+    Args:
+        config (_pytest.config.Config): The pytest config object
+        items (list(_pytest.nodes.Item)): List of item objects. (Modified in-place)
+    """
+
+    quarantine = _get_option_of_highest_precedence(config, 'zigzag-quarantine')
+    if quarantine and quarantine not in QUARANTINE_MODES:
+        pytest.exit("The 'zigzag-quarantine' option must be one of: {}".format(', '.join(QUARANTINE_MODES)),
+                    returncode=1)
+
+    history_path = _get_option_of_highest_precedence(config, 'zigzag-history')
+    if not (history_path or quarantine or _get_option_of_highest_precedence(config, 'zigzag-flaky')):
+        return
+    if not history_path:
+        if not getattr(config, 'cache', None):
+            return
+        history_path = str(config.cache.makedir('zigzag').join('history.sqlite'))
+
+    history = OutcomeHistory(history_path, _get_typed_option(config, 'zigzag-history-window', int, 30))
+    threshold = _get_typed_option(config, 'zigzag-flaky-threshold', float, 0.3)
+    flaky = {}
+    remaining = []
+    deselected = []
+
+    for item in items:
+        test_id = next((v for k, v in item.user_properties if k == 'test_id'), None)
+        rate = history.flip_rate(test_id) if test_id else None
+        if rate is not None:
+            item.user_properties.append(('flip_rate', '{:.2f}'.format(rate)))
+            if rate >= threshold:
+                flaky[test_id] = rate
+        if quarantine and (test_id in flaky) == (quarantine == 'exclude'):
+            deselected.append(item)
+        else:
+            remaining.append(item)
+
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = remaining
+
+    config._zigzag_history = history
+    config._zigzag_flaky = (threshold, flaky, len(deselected) if quarantine == 'exclude' else 0)
 
 
 def _load_default_config_file():
@@ -150,6 +742,22 @@ def _load_config(config_file):
     return config_dict
 
 
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture
+def zigzag_attach(request):
+    """Attach content to the current test case through the content-addressed artifact store.
+
+    Usage: zigzag_attach('keystone.log', log_text)
+
+    Returns:
+        callable: A function taking the attachment name and its content (bytes or str) and returning its digest.
+    """
+
+    return lambda name, data: attach(request.node, name, data)
+
+
 # ======================================================================================================================
 # Hooks
 # ======================================================================================================================
@@ -163,23 +771,127 @@ def pytest_sessionfinish(session):
     """
 
     SESSION_MESSAGES.drain()  # need to reset this on every pass through this hook
+    metrics = getattr(session.config, '_zigzag_metrics', None)
+    tracer = getattr(session.config, '_zigzag_tracer', None)
+
+    event_stream = getattr(session.config, '_zigzag_event_stream', None)
+    if event_stream is not None:
+        _emit_event(session.config, 'session_finish', exitstatus=int(session.exitstatus))
+        event_stream.close()
+        SESSION_MESSAGES.append("ZigZag event stream: {} events written, {} dropped".format(
+            event_stream.written, event_stream.dropped))
+        if event_stream.invalid:
+            SESSION_MESSAGES.append("ZigZag event stream: {} events could not be serialized to JSON".format(
+                event_stream.invalid))
+        if event_stream.error:
+            SESSION_MESSAGES.append("ZigZag event stream error: {}".format(event_stream.error))
+        session.config._zigzag_event_stream = None
+
+    step_progress = getattr(session.config, '_zigzag_step_progress', None)
+    if step_progress is not None:
+        step_progress.save()
+
+    fixture_costs = getattr(session.config, '_zigzag_fixture_costs', None)
+    if fixture_costs is not None and fixture_costs.totals:
+        SESSION_MESSAGES.append("Most expensive fixtures (setup + teardown):")
+        for name, scope, setup, teardown, count in fixture_costs.ranking():
+            SESSION_MESSAGES.append("  {} ({}): {:.3f}s setup + {:.3f}s teardown over {} setups".format(
+                name, scope, setup, teardown, count))
+        session.config._zigzag_fixture_costs = None
+
+    for name, error in getattr(session.config, '_zigzag_computed_errors', ()):
+        SESSION_MESSAGES.append("Failed to compute the '{}' property: {}".format(name, error))
+
+    outage_breaker = getattr(session.config, '_zigzag_outage_breaker', None)
+    if outage_breaker is not None:
+        for outage in outage_breaker.tripped.values():
+            SESSION_MESSAGES.append("Outage breaker tripped in '{}' ({}): skipped {} tests after: {}".format(
+                outage['group'], outage['signature'], outage['skipped'], outage['description']))
+
+    budget = getattr(session.config, '_zigzag_time_budget', None)
+    if budget is not None and budget.skipped:
+        SESSION_MESSAGES.append("Time budget of {}s used up: skipped {} tests".format(budget.budget, budget.skipped))
+
+    history = getattr(session.config, '_zigzag_history', None)
+    if history is not None:
+        history.save()
+        threshold, flaky, quarantined = session.config._zigzag_flaky
+        if flaky:
+            SESSION_MESSAGES.append("Flaky tests (flip rate >= {:.2f}):".format(threshold))
+            for test_id in sorted(flaky, key=lambda t: (-flaky[t], t)):
+                SESSION_MESSAGES.append("  {}: {:.2f}".format(test_id, flaky[test_id]))
+        if quarantined:
+            SESSION_MESSAGES.append("Quarantined {} flaky tests".format(quarantined))
+        session.config._zigzag_history = None
+
+    checkpoint = getattr(session.config, '_zigzag_checkpoint', None)
+    if checkpoint is not None:
+        checkpoint.close()
+        junit_xml_config = getattr(session.config, '_xml', None)
+        if junit_xml_config and os.path.isfile(junit_xml_config.logfile):
+            checkpoint.merge_into(junit_xml_config.logfile)
+        if checkpoint.resumed:
+            SESSION_MESSAGES.append("Merged {} results from the checkpoint journal".format(len(checkpoint.resumed)))
+        session.config._zigzag_checkpoint = None
+
+    junit_xml_config = getattr(session.config, '_xml', None)
+    if (_get_option_of_highest_precedence(session.config, 'zigzag-rollup-steps') and junit_xml_config
+            and os.path.isfile(junit_xml_config.logfile)):
+        classes, steps = rollup_steps(junit_xml_config.logfile)
+        if classes:
+            SESSION_MESSAGES.append("Rolled up {} test steps into {} test cases".format(steps, classes))
+
+    if (_get_option_of_highest_precedence(session.config, 'zigzag-dedupe-tracebacks') and junit_xml_config
+            and os.path.isfile(junit_xml_config.logfile)):
+        shared, references = dedupe_tracebacks(junit_xml_config.logfile)
+        if shared:
+            SESSION_MESSAGES.append("Stored {} tracebacks shared by {} testcases once".format(shared, references))
+
+    merge_target = _get_option_of_highest_precedence(session.config, 'zigzag-merge-into')
+    if merge_target and junit_xml_config and os.path.isfile(junit_xml_config.logfile):
+        testcases, dropped = merge_into(merge_target,
+                                        junit_xml_config.logfile,
+                                        _get_option_of_highest_precedence(session.config, 'zigzag-merge-strategy')
+                                        or 'last')
+        SESSION_MESSAGES.append("Merged the results into '{}': {} testcases ({} duplicates dropped)".format(
+            merge_target, testcases, dropped))
+
     if session.config.pluginmanager.hasplugin('junitxml'):
         zz_option = _get_option_of_highest_precedence(session.config, 'zigzag')
+        dry_run = _get_option_of_highest_precedence(session.config, 'zigzag-dry-run')
         pytest_zigzag_config = _get_option_of_highest_precedence(session.config, 'pytest-zigzag-config')
-        if zz_option and pytest_zigzag_config:
+        if (zz_option or dry_run) and pytest_zigzag_config:
+            profiler = StageProfiler(trace_memory=bool(dry_run))
+            succeeded = False
+            error = None
+            start = time.time()
             try:
-                junit_file_path = getattr(session.config, '_xml', None).logfile
-
-                # noinspection PyTypeChecker
-                # validate token
-                token = _validate_qtest_token(os.environ['QTEST_API_TOKEN'])
-                zz = ZigZag(junit_file_path, pytest_zigzag_config, token)
-                job_id = zz.upload_test_results()
-                SESSION_MESSAGES.append("ZigZag upload was successful!")
-                SESSION_MESSAGES.append("Queue Job ID: {}".format(job_id))
+                succeeded = _publish_results(session, dry_run, profiler)
             except Exception as e:  # we want this super broad so we dont break test execution
-                SESSION_MESSAGES.append('The ZigZag upload was not successful')
+                error = str(e)
+                SESSION_MESSAGES.append('The ZigZag {} was not successful'.format('dry run' if dry_run else 'upload'))
                 SESSION_MESSAGES.append("Original error message:\n\n{}".format(str(e)))
+            finally:
+                profiler.stop()
+                if metrics is not None and not dry_run:
+                    metrics.record_upload(profiler.durations, succeeded)
+                if tracer is not None:
+                    _trace_upload(session.config, profiler, start, succeeded, error, dry_run)
+
+    if metrics is not None:
+        _write_metrics(session.config, metrics)
+
+    if tracer is not None:
+        session_span = session.config._zigzag_session_span
+        session_span.attributes['pytest.exitstatus'] = int(session.exitstatus)
+        tracer.end_span(session_span)
+        tracer.close()
+        SESSION_MESSAGES.append("ZigZag trace: {} spans written to '{}'".format(
+            tracer.exported, _get_option_of_highest_precedence(session.config, 'zigzag-trace')))
+        if tracer.dropped_spans or tracer.error:
+            SESSION_MESSAGES.append("ZigZag trace error: {} spans dropped ({})".format(tracer.dropped_spans,
+                                                                                       tracer.error))
+        session.config._zigzag_tracer = None
 
 
 @pytest.hookimpl(trylast=True)
@@ -190,6 +902,65 @@ def pytest_terminal_summary(terminalreporter):
         terminalreporter.write_line(message)
 
 
+def pytest_sessionstart(session):
+    """Validate the upload policy and the merge strategy, open the artifact store and start the tracing, the metrics,
+    the fixture cost tracking, the outage breaker, the time budget and the live event stream if the user enabled them.
+
+    Args:
+        session (_pytest.main.Session): The pytest session object
+    """
+
+    policy = _get_option_of_highest_precedence(session.config, 'zigzag-upload-policy')
+    if policy and policy not in UPLOAD_POLICIES:
+        pytest.exit("The 'zigzag-upload-policy' option must be one of: {}".format(', '.join(UPLOAD_POLICIES)),
+                    returncode=1)
+
+    strategy = _get_option_of_highest_precedence(session.config, 'zigzag-merge-strategy')
+    if strategy and strategy not in MERGE_STRATEGIES:
+        pytest.exit("The 'zigzag-merge-strategy' option must be one of: {}".format(', '.join(MERGE_STRATEGIES)),
+                    returncode=1)
+
+    artifact_dir = _get_option_of_highest_precedence(session.config, 'zigzag-artifact-dir')
+    if not artifact_dir and getattr(session.config, 'cache', None):
+        artifact_dir = str(session.config.cache.makedir('zigzag').join('artifacts'))
+    if artifact_dir:
+        session.config._zigzag_artifacts = ArtifactStore(artifact_dir, bool(_get_option_of_highest_precedence(
+            session.config, 'zigzag-artifact-compress')))
+
+    trace_path = _get_option_of_highest_precedence(session.config, 'zigzag-trace')
+    if trace_path:
+        session.config._zigzag_tracer = Tracer(trace_path)
+        session.config._zigzag_session_span = session.config._zigzag_tracer.start_span(
+            'session', attributes={'pytest.rootdir': str(session.config.rootdir)})
+
+    if (_get_option_of_highest_precedence(session.config, 'zigzag-metrics-textfile')
+            or _get_option_of_highest_precedence(session.config, 'zigzag-metrics-json')):
+        session.config._zigzag_metrics = SessionMetrics()
+
+    if _get_option_of_highest_precedence(session.config, 'zigzag-fixture-costs'):
+        session.config._zigzag_fixture_costs = FixtureCosts()
+
+    outage_threshold = _get_typed_option(session.config, 'zigzag-outage-threshold', int)
+    if outage_threshold:
+        session.config._zigzag_outage_breaker = OutageBreaker(outage_threshold, _get_option_of_highest_precedence(
+            session.config, 'zigzag-outage-mark'))
+
+    budget = _get_typed_option(session.config, 'zigzag-time-budget', float)
+    if budget:
+        session.config._zigzag_time_budget = TimeBudget(budget,
+                                                        _get_typed_option(session.config, 'zigzag-time-reserve', float))
+
+    target = _get_option_of_highest_precedence(session.config, 'zigzag-event-stream')
+    if target:
+        session.config._zigzag_session_id = '{}-{}-{}'.format(socket.gethostname(), os.getpid(), int(time.time()))
+        session.config._zigzag_event_stream = EventStream(target,
+                                                          _get_typed_option(session.config,
+                                                                            'zigzag-event-buffer',
+                                                                            int,
+                                                                            10000))
+        _emit_event(session.config, 'session_start', rootdir=str(session.config.rootdir))
+
+
 @pytest.hookimpl(tryfirst=True)
 def pytest_runtestloop(session):
     """Add XML properties group to the 'testsuite' element that captures the values for specified environment variables.
@@ -204,21 +975,90 @@ def pytest_runtestloop(session):
         if junit_xml_config:
             _capture_config_path(session)
 
+            # make resumed runs obvious in the uploaded results
+            step_progress = getattr(session.config, '_zigzag_step_progress', None)
+            if step_progress is not None and step_progress.resumed_classes:
+                junit_xml_config.add_global_property('resumed_step_classes', str(step_progress.resumed_classes))
 
-def pytest_collection_modifyitems(items):
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_collection(session):
+    """Trace the collection if the user enabled tracing.
+
+    Args:
+        session (_pytest.main.Session): The pytest session object
+    """
+
+    start = time.time()
+    yield
+    tracer = getattr(session.config, '_zigzag_tracer', None)
+    if tracer is not None:
+        tracer.record_span('collection', session.config._zigzag_session_span, start, time.time(),
+                           {'pytest.collected': len(getattr(session, 'items', []))})
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    """Trace a test case, nested in a span for its test case with steps class, if the user enabled tracing.
+
+    Args:
+        item (_pytest.nodes.Item): An item object.
+        nextitem (_pytest.nodes.Item): The item that runs next or None.
+    """
+
+    tracer = getattr(item.config, '_zigzag_tracer', None)
+    if tracer is None:
+        yield
+        return
+
+    parent = item.config._zigzag_session_span
+    step_class = item.getparent(pytest.Class) if TEST_STEPS_MARK in item.keywords else None
+    is_step = step_class is not None  # a marked function outside a class is a plain test case
+    if is_step:
+        parent = getattr(item.parent, '_zigzag_span', None)
+        if parent is None:
+            attributes = dict(_trace_attributes(item), **{'pytest.nodeid': step_class.nodeid})
+            parent = item.parent._zigzag_span = tracer.start_span(step_class.name,
+                                                                  item.config._zigzag_session_span,
+                                                                  attributes)
+    item._zigzag_span = tracer.start_span(item.name, parent, _trace_attributes(item))
+
+    yield
+
+    tracer.end_span(item._zigzag_span)
+    if is_step and (nextitem is None or nextitem.parent is not item.parent):
+        tracer.end_span(item.parent._zigzag_span)
+
+
+def pytest_collection_modifyitems(config, items):
     """Called after collection has been performed, may filter or re-order the items in-place.
 
     Args:
+        config (_pytest.config.Config): The pytest config object
         items (list(_pytest.nodes.Item)): List of item objects.
     """
 
     _capture_marks(items, ('test_id', 'jira'))
 
+    _resolve_dependencies(config, items)
+
+    _start_checkpoint_journal(config, items)
+
+    if _get_option_of_highest_precedence(config, 'zigzag-resume-steps') and getattr(config, 'cache', None):
+        config._zigzag_step_progress = StepProgress(config.cache)
+        config._zigzag_step_progress.deselect_passed_steps(config, items, TEST_STEPS_MARK)
+
+    _start_outcome_history(config, items)
+
+    _emit_event(config, 'collection_finish', count=len(items))
+
 
 @pytest.hookimpl(tryfirst=True)
 def pytest_runtest_setup(item):
     """Add XML properties group to the 'testcase' element that captures start time in UTC. Also, skip test cases
-    in a class where the previous test case failed.
+    in a class where the previous test case failed, tests that depend on a failed test, tests in a group where the
+    outage breaker tripped and tests that would start after the time budget is used up. (Before any of their fixtures
+    are set up)
 
     Args:
         item (_pytest.nodes.Item): An item object.
@@ -228,6 +1068,37 @@ def pytest_runtest_setup(item):
     item.user_properties.append(('start_time', now))
     item.user_properties.append(('end_time', now))  # will override if we get to teardown
 
+    fixture_costs = getattr(item.config, '_zigzag_fixture_costs', None)
+    if fixture_costs is not None:
+        fixture_costs.current_item = item
+
+    budget = getattr(item.config, '_zigzag_time_budget', None)
+    if budget is not None:
+        # let a test case with steps class that already started finish so it is not reported half done
+        is_step = TEST_STEPS_MARK in item.keywords
+        if budget.exhausted and not (is_step and getattr(item.parent, '_zigzag_started', False)):
+            budget.skipped += 1
+            item.user_properties.append(('skip_reason', SKIP_REASON))
+            pytest.skip("because the session time budget of {}s is used up".format(budget.budget))
+        if is_step:
+            item.parent._zigzag_started = True
+
+    outage_breaker = getattr(item.config, '_zigzag_outage_breaker', None)
+    if outage_breaker is not None:
+        outage = outage_breaker.check(item)
+        if outage is not None:
+            item.user_properties.append(('skip_reason', OUTAGE))
+            item.user_properties.append(('outage_signature', outage['signature']))
+            pytest.skip("because {} consecutive tests in '{}' failed with: {}".format(
+                outage_breaker.threshold, outage['group'], outage['description']))
+
+    dependencies = getattr(item.config, '_zigzag_dependencies', None)
+    if dependencies is not None:
+        failed = dependencies.failed_dependency(item)
+        if failed is not None:
+            item.user_properties.append(('skip_reason', DEPENDENCY_FAILED))
+            pytest.skip("because it depends on '{}' and {} failed".format(*failed))
+
     if "test_case_with_steps" in item.keywords and 'setup' not in item.name and 'teardown' not in item.name:
         previousfailed = getattr(item.parent, "_previousfailed", None)
         if previousfailed is not None:
@@ -236,7 +1107,8 @@ def pytest_runtest_setup(item):
 
 @pytest.hookimpl(trylast=True)
 def pytest_runtest_teardown(item):
-    """Add XML properties group to the 'testcase' element that captures start time in UTC.
+    """Add XML properties group to the 'testcase' element that captures start time in UTC. Also, add the setup and
+    teardown costs of the fixtures triggered by the test case if the user enabled fixture cost tracking.
 
     Args:
         item (_pytest.nodes.Item): An item object.
@@ -255,6 +1127,42 @@ def pytest_runtest_teardown(item):
     else:
         item.user_properties.append(now_tup)
 
+    costs = getattr(item, '_zigzag_fixture_costs', None)
+    if costs is not None:
+        for name, fixture_costs in zip(('fixture_setup', 'fixture_teardown'), costs):
+            value = format_costs(fixture_costs)
+            if value:
+                item.user_properties.append((name, value))
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    """Time the setup of a fixture if the user enabled fixture cost tracking.
+
+    Args:
+        fixturedef (_pytest.fixtures.FixtureDef): The fixture definition.
+        request (_pytest.fixtures.SubRequest): The fixture request.
+    """
+
+    fixture_costs = getattr(request.config, '_zigzag_fixture_costs', None)
+    start = time.time()
+    yield
+    if fixture_costs is not None:
+        fixture_costs.record_setup(fixturedef, time.time() - start)
+
+
+def pytest_fixture_post_finalizer(fixturedef, request):
+    """Record the teardown time of a fixture if the user enabled fixture cost tracking.
+
+    Args:
+        fixturedef (_pytest.fixtures.FixtureDef): The fixture definition.
+        request (_pytest.fixtures.SubRequest): The fixture request.
+    """
+
+    fixture_costs = getattr(request.config, '_zigzag_fixture_costs', None)
+    if fixture_costs is not None:
+        fixture_costs.record_teardown(fixturedef)
+
 
 def pytest_addoption(parser):
     """Adds a config option to pytest
@@ -273,9 +1181,163 @@ def pytest_addoption(parser):
     parser.addini('zigzag', zigzag_help, type='bool', default=False)
     parser.addoption('--zigzag', help=zigzag_help, action="store_true", default=False)
 
-
+    # options related to resuming test case with steps classes
+    resume_steps_help = 'Resume test case with steps classes from the step which failed in the previous run'
+    parser.addini('zigzag-resume-steps', resume_steps_help, type='bool', default=False)
+    parser.addoption('--zigzag-resume-steps', help=resume_steps_help, action="store_true", default=False)
+
+    # options related to fixture costs
+    fixture_costs_help = 'Record the setup and teardown time of the fixtures triggered by each test case'
+    parser.addini('zigzag-fixture-costs', fixture_costs_help, type='bool', default=False)
+    parser.addoption('--zigzag-fixture-costs', help=fixture_costs_help, action="store_true", default=False)
+
+    # options related to the session time budget
+    budget_options = (
+        ('zigzag-time-budget', 'Stop starting new tests when the session has run for this many seconds minus the '
+                               'reserve and report the remaining tests as skipped.'),
+        ('zigzag-time-reserve', 'The number of seconds of the time budget kept for writing and uploading the '
+                                'results. (Default: 10% of the budget)'),
+    )
+    for option_name, option_help in budget_options:
+        parser.addini(option_name, option_help)
+        parser.addoption("--{}".format(option_name), help=option_help)
+
+    # options related to shrinking the results
+    max_output_help = 'Truncate the captured stdout, stderr and log output of each test case to this many bytes.'
+    parser.addini('zigzag-max-output-bytes', max_output_help)
+    parser.addoption('--zigzag-max-output-bytes', help=max_output_help)
+    dedupe_help = 'Store identical tracebacks once as testsuite properties referenced by hash from each test case'
+    parser.addini('zigzag-dedupe-tracebacks', dedupe_help, type='bool', default=False)
+    parser.addoption('--zigzag-dedupe-tracebacks', help=dedupe_help, action="store_true", default=False)
+
+    # options related to attachments
+    artifact_dir_help = 'The content-addressed store for attachments. (Default: in the pytest cache)'
+    parser.addini('zigzag-artifact-dir', artifact_dir_help)
+    parser.addoption('--zigzag-artifact-dir', help=artifact_dir_help)
+    artifact_compress_help = 'Store attachments gzip compressed'
+    parser.addini('zigzag-artifact-compress', artifact_compress_help, type='bool', default=False)
+    parser.addoption('--zigzag-artifact-compress', help=artifact_compress_help, action="store_true", default=False)
+
+    # options related to the outage breaker
+    outage_options = (
+        ('zigzag-outage-threshold', 'Skip the rest of a module once this many consecutive tests in it fail with the '
+                                    'same exception signature.'),
+        ('zigzag-outage-mark', 'Group tests by the first argument of this mark instead of by module for the outage '
+                               'breaker.'),
+    )
+    for option_name, option_help in outage_options:
+        parser.addini(option_name, option_help)
+        parser.addoption("--{}".format(option_name), help=option_help)
+
+    # options related to merging sessions
+    merge_options = (
+        ('zigzag-merge-into', 'Merge the results of the session into this results file shared by several sessions. '
+                              'With --zigzag the merged results are uploaded, so only pass --zigzag to the final '
+                              'session.'),
+        ('zigzag-merge-strategy', "Keep the 'last' (default) or the 'worst' result of tests run by several sessions."),
+    )
+    for option_name, option_help in merge_options:
+        parser.addini(option_name, option_help)
+        parser.addoption("--{}".format(option_name), help=option_help)
+
+    # options related to tracing
+    trace_help = 'Append trace spans of the session, its tests and the upload to this OTLP JSON file.'
+    parser.addini('zigzag-trace', trace_help)
+    parser.addoption('--zigzag-trace', help=trace_help)
+
+    # options related to metrics
+    metrics_options = (
+        ('zigzag-metrics-textfile', 'Write session and upload metrics to this Prometheus node exporter textfile.'),
+        ('zigzag-metrics-json', 'Write session and upload metrics to this JSON file.'),
+    )
+    for option_name, option_help in metrics_options:
+        parser.addini(option_name, option_help)
+        parser.addoption("--{}".format(option_name), help=option_help)
+
+    # options related to dry runs
+    dry_run_help = 'Build and serialize the upload payload without sending it and report the cost of each stage'
+    parser.addini('zigzag-dry-run', dry_run_help, type='bool', default=False)
+    parser.addoption('--zigzag-dry-run', help=dry_run_help, action="store_true", default=False)
+    dry_run_payload_help = 'Write the payload serialized by a dry run to this path for inspection.'
+    parser.addini('zigzag-dry-run-payload', dry_run_payload_help)
+    parser.addoption('--zigzag-dry-run-payload', help=dry_run_payload_help)
+
+    # options related to rolling up test case with steps classes
+    rollup_help = 'Write each test case with steps class as a single testcase with the step outcomes and durations'
+    parser.addini('zigzag-rollup-steps', rollup_help, type='bool', default=False)
+    parser.addoption('--zigzag-rollup-steps', help=rollup_help, action="store_true", default=False)
+
+    # options related to checkpointing
+    checkpoint_help = 'Append each finished test result to this checkpoint journal. (Default: in the pytest cache)'
+    parser.addini('zigzag-checkpoint', checkpoint_help)
+    parser.addoption('--zigzag-checkpoint', help=checkpoint_help)
+    checkpoint_batch_help = 'The number of checkpoint records written between syncs to disk. (Default: 20)'
+    parser.addini('zigzag-checkpoint-batch', checkpoint_batch_help)
+    parser.addoption('--zigzag-checkpoint-batch', help=checkpoint_batch_help)
+    resume_help = 'Skip the tests completed in the checkpoint journal and merge their results into the JUnitXML'
+    parser.addini('zigzag-resume', resume_help, type='bool', default=False)
+    parser.addoption('--zigzag-resume', help=resume_help, action="store_true", default=False)
+
+    # options related to flaky test detection
+    flaky_help = 'Record the outcome history of each test in the pytest cache and report flaky tests'
+    parser.addini('zigzag-flaky', flaky_help, type='bool', default=False)
+    parser.addoption('--zigzag-flaky', help=flaky_help, action="store_true", default=False)
+    flaky_options = (
+        ('zigzag-history', 'Record the outcome history of each test in this SQLite database instead of the cache.'),
+        ('zigzag-history-window', 'The number of most recent outcomes kept per test. (Default: 30)'),
+        ('zigzag-flaky-threshold', 'The flip rate, from 0 to 1, at which a test is considered flaky. (Default: 0.3)'),
+        ('zigzag-quarantine', "Deselect flaky tests ('exclude') or run only the flaky tests ('only')."),
+    )
+    for option_name, option_help in flaky_options:
+        parser.addini(option_name, option_help)
+        parser.addoption("--{}".format(option_name), help=option_help)
+
+    # options related to the live event stream
+    event_stream_help = "Stream JSON test events to a file, a named pipe or a Unix socket ('unix:/path/to/socket')."
+    parser.addini('zigzag-event-stream', event_stream_help)
+    parser.addoption('--zigzag-event-stream', help=event_stream_help)
+    event_buffer_help = 'The number of buffered events before new events are dropped. (Default: 10000)'
+    parser.addini('zigzag-event-buffer', event_buffer_help)
+    parser.addoption('--zigzag-event-buffer', help=event_buffer_help)
+
+    # options related to the upload backend
+    backend_options = (
+        ('zigzag-backend', "The upload backend: 'zigzag' (default), 'directory', 'http' or an installed backend."),
+        ('zigzag-upload-dir', "The destination directory of the 'directory' upload backend."),
+        ('zigzag-upload-url', "The endpoint URL of the 'http' upload backend."),
+    )
+    for option_name, option_help in backend_options:
+        parser.addini(option_name, option_help)
+        parser.addoption("--{}".format(option_name), help=option_help)
+    upload_compress_help = "Gzip compress the request body of the 'http' upload backend on the fly."
+    parser.addini('zigzag-upload-compress', upload_compress_help, type='bool', default=False)
+    parser.addoption('--zigzag-upload-compress', help=upload_compress_help, action="store_true", default=False)
+
+    # options related to upload retries
+    upload_options = (
+        ('zigzag-upload-retries', 'The number of times a failed ZigZag upload is retried. (Default: 0)'),
+        ('zigzag-upload-backoff', 'The base delay in seconds for exponential backoff between retries. (Default: 1)'),
+        ('zigzag-upload-jitter', 'The randomized fraction of each backoff delay, from 0 to 1. (Default: 0.5)'),
+        ('zigzag-upload-timeout', 'The number of seconds allowed for a single upload attempt.'),
+        ('zigzag-upload-deadline', 'The number of seconds allowed for all upload attempts combined.'),
+        ('zigzag-upload-breaker-threshold', 'Stop retrying uploads after this many consecutive failures.'),
+        ('zigzag-upload-breaker-cooldown', 'Seconds before retries resume after the breaker opens. (Default: 600)'),
+        ('zigzag-upload-policy', "Upload 'all' tests or only the 'failures' and a summary of the passed tests."),
+        ('zigzag-summary-group', "Summarize passed tests per 'module' or per value of a testcase property."),
+        ('zigzag-max-payload-bytes', 'Split uploads larger than this into several JUnitXML documents.'),
+        ('zigzag-upload-connections', 'The maximum number of chunks uploaded concurrently. (Default: 4)'),
+    )
+    for option_name, option_help in upload_options:
+        parser.addini(option_name, option_help)
+        parser.addoption("--{}".format(option_name), help=option_help)
+
+
+@pytest.hookimpl(hookwrapper=True)
 def pytest_runtest_makereport(item, call):
-    """Re-write the report concerning test cases with steps so it looks correct.
+    """Re-write the report concerning test cases with steps so it looks correct. Also, cap the captured output, stream
+    an event for the resulting report, trace the test phase, record the metrics, failure signatures, failed
+    dependencies and the progress of test case with steps classes, record the outcome history and checkpoint finished
+    tests.
 
     Args:
         item (_pytest.nodes.Item): An item object.
@@ -286,3 +1348,44 @@ def pytest_runtest_makereport(item, call):
         if call.excinfo is not None:
             parent = item.parent
             parent._previousfailed = item
+
+    outcome = yield
+    report = outcome.get_result()
+
+    max_output_bytes = _get_typed_option(item.config, 'zigzag-max-output-bytes', int)
+    if max_output_bytes:
+        cap_captured_output(report, max_output_bytes)
+
+    _emit_test_event(item, report)
+
+    metrics = getattr(item.config, '_zigzag_metrics', None)
+    if metrics is not None:
+        metrics.record_report(report)
+
+    if getattr(item, '_zigzag_span', None) is not None:
+        _trace_report(item, call, report)
+
+    outage_breaker = getattr(item.config, '_zigzag_outage_breaker', None)
+    if outage_breaker is not None:
+        outage_breaker.record(item, report, call.excinfo)
+
+    dependencies = getattr(item.config, '_zigzag_dependencies', None)
+    if dependencies is not None and (report.failed or (report.skipped and
+                                                       ('skip_reason', DEPENDENCY_FAILED) in item.user_properties)):
+        dependencies.record_failure(item)
+
+    step_progress = getattr(item.config, '_zigzag_step_progress', None)
+    if step_progress is not None and TEST_STEPS_MARK in item.keywords:
+        step_progress.record(item, report)
+
+    history = getattr(item.config, '_zigzag_history', None)
+    if history is not None:
+        test_id = next((v for k, v in item.user_properties if k == 'test_id'), None)
+        if test_id:
+            history.record(test_id, report_outcome(report))
+
+    checkpoint = getattr(item.config, '_zigzag_checkpoint', None)
+    if checkpoint is not None:
+        item._zigzag_reports = getattr(item, '_zigzag_reports', []) + [report]
+        if report.when == 'teardown':
+            checkpoint.append(make_record(item, item._zigzag_reports))
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+"""A local content-addressed store for test attachments.
+
+Attachments are stored once per unique content, named by the SHA-256 hash of their bytes, and test cases only record
+the hash and the size as a property. (e.g. 'attachment.keystone.log' = '<sha256> 5242880')
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import gzip
+import hashlib
+import threading
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+ATTACHMENT_PROPERTY_PREFIX = 'attachment.'
+COMPRESSED_SUFFIX = '.gz'
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class ArtifactStore(object):
+    """A directory of blobs named by the SHA-256 hash of their content and a manifest of the blobs already sent to
+    each upload destination.
+    """
+
+    def __init__(self, root, compress=False):
+        """Create an ArtifactStore object.
+
+        Args:
+            root (str): The directory of the store. (Created when the first blob is stored)
+            compress (bool): Store new blobs gzip compressed.
+        """
+
+        self.root = root
+        self.compress = compress
+        self.attached = set()  # the digests attached during this session
+        self._lock = threading.Lock()
+
+    def _blob_path(self, digest, compressed):
+        """Get the path of a blob.
+
+        Args:
+            digest (str): The hex SHA-256 digest of the content.
+            compressed (bool): Whether the blob is compressed.
+
+        Returns:
+            str: The path. Blobs are spread over 256 sub-directories by the first two characters of their digest.
+        """
+
+        return os.path.join(self.root, digest[:2], digest + (COMPRESSED_SUFFIX if compressed else ''))
+
+    def path(self, digest):
+        """Find a stored blob.
+
+        Args:
+            digest (str): The hex SHA-256 digest of the content.
+
+        Returns:
+            str: The path of the blob or None if it is not stored. (Compressed blobs end with '.gz')
+        """
+
+        for compressed in (self.compress, not self.compress):
+            path = self._blob_path(digest, compressed)
+            if os.path.isfile(path):
+                return path
+
+    def put(self, data):
+        """Store content unless an identical blob is already stored.
+
+        Args:
+            data (bytes): The content.
+
+        Returns:
+            str: The hex SHA-256 digest of the content.
+        """
+
+        digest = hashlib.sha256(data).hexdigest()
+        if self.path(digest) is None:
+            path = self._blob_path(digest, self.compress)
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:  # created concurrently
+                    pass
+            temp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.current_thread().ident)
+            with (gzip.open(temp_path, 'wb') if self.compress else open(temp_path, 'wb')) as f:
+                f.write(data)
+            os.rename(temp_path, path)  # atomic so readers never see a partial blob
+        with self._lock:
+            self.attached.add(digest)
+
+        return digest
+
+    def get(self, digest):
+        """Read the content of a stored blob.
+
+        Args:
+            digest (str): The hex SHA-256 digest of the content.
+
+        Returns:
+            bytes: The content.
+
+        Raises:
+            KeyError: No such blob.
+        """
+
+        path = self.path(digest)
+        if path is None:
+            raise KeyError(digest)
+        with (gzip.open(path, 'rb') if path.endswith(COMPRESSED_SUFFIX) else open(path, 'rb')) as f:
+            return f.read()
+
+    def _manifest_path(self, destination):
+        """Get the path of the manifest of the blobs sent to an upload destination.
+
+        Args:
+            destination (str): A key which identifies the destination. (e.g. 'http:https://example.com/')
+
+        Returns:
+            str: The path.
+        """
+
+        return os.path.join(self.root, 'sent-{}.txt'.format(hashlib.sha1(destination.encode('utf-8')).hexdigest()[:12]))
+
+    def sent(self, destination):
+        """Get the digests of the blobs already sent to an upload destination.
+
+        Args:
+            destination (str): A key which identifies the destination.
+
+        Returns:
+            set(str): The digests.
+        """
+
+        path = self._manifest_path(destination)
+        if not os.path.isfile(path):
+            return set()
+        with open(path) as f:
+            return set(line.strip() for line in f if line.strip())
+
+    def mark_sent(self, destination, digest):
+        """Record that a blob was sent to an upload destination.
+
+        Args:
+            destination (str): A key which identifies the destination.
+            digest (str): The hex SHA-256 digest of the blob.
+        """
+
+        with self._lock:
+            with open(self._manifest_path(destination), 'a') as f:  # the root exists since the blob was stored
+                f.write('{}\n'.format(digest))
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def attach(item, name, data):
+    """Attach content to a test case through the artifact store.
+
+    Only the digest and the size of the content are recorded in the 'attachment.<name>' testcase property so repeated
+    attachments cost nothing extra in the results file or the upload.
+
+    Args:
+        item (_pytest.nodes.Item): The test item. (e.g. 'request.node')
+        name (str): The name of the attachment. (e.g. 'keystone.log')
+        data (bytes or str): The content. Text is encoded as UTF-8.
+
+    Returns:
+        str: The hex SHA-256 digest of the content.
+
+    Raises:
+        RuntimeError: The artifact store is not available.
+    """
+
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    store = getattr(item.config, '_zigzag_artifacts', None)
+    if store is None:
+        raise RuntimeError('The artifact store is not available! (Is the pytest cache disabled?)')
+    digest = store.put(data)
+    item.user_properties.append(('{}{}'.format(ATTACHMENT_PROPERTY_PREFIX, name), '{} {}'.format(digest, len(data))))
+
+    return digest
@@ -0,0 +1,537 @@
+# -*- coding: utf-8 -*-
+
+"""Pluggable destinations for uploading JUnitXML results files.
+
+A backend is selected with the 'zigzag-backend' option. The built-in backends are 'zigzag' (qTest through ZigZag, the
+default), 'directory' and 'http'. Other packages can provide backends by registering a subclass of 'UploadBackend' in
+the 'pytest_zigzag.backends' entry point group::
+
+    entry_points={'pytest_zigzag.backends': ['s3 = my_package.backends:S3Backend']}
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import re
+import json
+import zlib
+import shutil
+import itertools
+from pkg_resources import iter_entry_points
+# noinspection PyPackageRequirements
+import swagger_client
+# noinspection PyPackageRequirements
+from zigzag.zigzag import ZigZag
+try:
+    from http.client import HTTPConnection, HTTPSConnection
+    from urllib.error import HTTPError
+    from urllib.parse import urljoin, urlsplit
+except ImportError:  # Python 2
+    from httplib import HTTPConnection, HTTPSConnection
+    from urllib2 import HTTPError
+    from urlparse import urljoin, urlsplit
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+ENTRY_POINT_GROUP = 'pytest_zigzag.backends'
+DEFAULT_BACKEND = 'zigzag'
+# The size of the blocks read from disk and sent as chunks by the 'http' backend.
+CHUNK_SIZE = 64 * 1024
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class UploadBackend(object):
+    """The interface of an upload backend.
+
+    Backends read their settings through the 'get_option' callable, which resolves an option name (e.g.
+    'zigzag-upload-url') from the command line or the pytest ini file exactly like the plug-in options. An upload is
+    split into 'parse', which builds the payload, and 'send', which performs the request, so that each can be timed.
+    Both may be called concurrently from several threads. A backend may instead override 'upload' as a whole, in which
+    case 'parse' and 'send' are never called in its place.
+    """
+
+    name = None
+    supports_attachments = False
+
+    def __init__(self, get_option):
+        """Create an UploadBackend object.
+
+        Args:
+            get_option (callable): Resolve the value of an option by name. (None if not set)
+        """
+
+        self._get_option = get_option
+
+    def prepare(self):
+        """Validate the settings and credentials of the backend before any payload is built.
+
+        Raises:
+            Exception: The backend cannot be used.
+        """
+
+        pass
+
+    def upload(self, file_path):
+        """Upload a JUnitXML results file.
+
+        Args:
+            file_path (str): The path to a JUnitXML results file.
+
+        Returns:
+            object: A reference to the upload such as a queue job ID.
+        """
+
+        return self.send(self.parse(file_path))
+
+    @property
+    def splits_upload(self):
+        """bool: True unless a subclass overrides 'upload', so that calling 'parse' then 'send' is equivalent."""
+
+        return next(cls for cls in type(self).__mro__ if 'upload' in vars(cls)) is UploadBackend
+
+    def send(self, parsed):
+        """Send parsed results.
+
+        Args:
+            parsed (object): The value returned by 'parse'.
+
+        Returns:
+            object: A reference to the upload such as a queue job ID.
+        """
+
+        raise NotImplementedError
+
+    @property
+    def destination(self):
+        """str: A key which identifies where uploads go, used to remember which attachment blobs were already sent."""
+
+        return self.name
+
+    def upload_blob(self, digest, blob_path):
+        """Upload an attachment blob from the artifact store. (Only called if 'supports_attachments' is set)
+
+        Args:
+            digest (str): The hex SHA-256 digest of the blob content.
+            blob_path (str): The path of the blob. (Compressed blobs end with '.gz')
+
+        Raises:
+            NotImplementedError: The backend does not support attachments.
+        """
+
+        raise NotImplementedError("The '{}' backend does not support attachments".format(self.name))
+
+    def parse(self, file_path):
+        """Parse a JUnitXML results file into the form the backend sends.
+
+        Args:
+            file_path (str): The path to a JUnitXML results file.
+
+        Returns:
+            object: The parsed results. (Default: the file path, the file is sent as is)
+        """
+
+        return file_path
+
+    def serialize(self, parsed):
+        """Serialize parsed results into the request payload without sending it. (Used by dry runs)
+
+        Args:
+            parsed (object): The value returned by 'parse'.
+
+        Returns:
+            bytes: The payload.
+        """
+
+        with open(parsed, 'rb') as f:
+            return f.read()
+
+
+class ZigZagBackend(UploadBackend):
+    """Upload to qTest Manager with ZigZag. (Requires the 'QTEST_API_TOKEN' environment variable)"""
+
+    name = 'zigzag'
+
+    def __init__(self, get_option):
+        """Create a ZigZagBackend object.
+
+        Args:
+            get_option (callable): Resolve the value of an option by name. (None if not set)
+        """
+
+        super(ZigZagBackend, self).__init__(get_option)
+        self._config_path = None
+        self._token = None
+
+    def prepare(self):
+        """Validate the qTest API token.
+
+        Raises:
+            KeyError: The 'QTEST_API_TOKEN' environment variable is not defined.
+        """
+
+        self._config_path = self._get_option('pytest-zigzag-config')
+        self._token = validate_qtest_token(os.environ['QTEST_API_TOKEN'])
+
+    def parse(self, file_path):
+        """Parse a JUnitXML results file into qTest test logs.
+
+        Args:
+            file_path (str): The path to a JUnitXML results file.
+
+        Returns:
+            zigzag.zigzag.ZigZag: A ZigZag object ready to upload.
+        """
+
+        zz = ZigZag(file_path, self._config_path, self._token)
+        zz.parse()
+
+        return zz
+
+    def send(self, parsed):
+        """Upload parsed results to qTest Manager.
+
+        Args:
+            parsed (zigzag.zigzag.ZigZag): A parsed ZigZag object.
+
+        Returns:
+            int: The queue job ID.
+        """
+
+        return parsed.upload_test_results()
+
+    def serialize(self, parsed):
+        """Serialize the qTest automation request for parsed results without contacting qTest.
+
+        Custom field values, attachments and the test cycle require qTest API lookups so they are left out and the
+        payload is a lower bound of the request ZigZag would send.
+
+        Args:
+            parsed (zigzag.zigzag.ZigZag): A parsed ZigZag object.
+
+        Returns:
+            bytes: The JSON payload.
+        """
+
+        request = swagger_client.AutomationRequest()
+        request.test_logs = []
+        for test_log in parsed.test_logs:
+            log = swagger_client.AutomationTestLogResource()
+            log.name = test_log.name
+            log.automation_content = test_log.automation_content
+            log.exe_start_date = test_log.start_date
+            log.exe_end_date = test_log.end_date
+            log.build_url = parsed.build_url
+            log.build_number = parsed.build_number
+            log.module_names = test_log.module_hierarchy
+            log.status = test_log.status
+            request.test_logs.append(log)
+
+        return json.dumps(swagger_client.ApiClient().sanitize_for_serialization(request)).encode('utf-8')
+
+
+class DirectoryBackend(UploadBackend):
+    """Copy results files into a local directory. (The 'zigzag-upload-dir' option)"""
+
+    name = 'directory'
+    supports_attachments = True
+
+    def __init__(self, get_option):
+        """Create a DirectoryBackend object.
+
+        Args:
+            get_option (callable): Resolve the value of an option by name. (None if not set)
+        """
+
+        super(DirectoryBackend, self).__init__(get_option)
+        self._directory = None
+        self._counter = itertools.count(1)
+
+    def prepare(self):
+        """Validate the destination directory option. (The directory is only created by the first upload so that a dry
+        run leaves no trace)
+
+        Raises:
+            ValueError: The 'zigzag-upload-dir' option is not set.
+        """
+
+        self._directory = self._get_option('zigzag-upload-dir')
+        if not self._directory:
+            raise ValueError("The 'directory' backend requires the 'zigzag-upload-dir' option!")
+
+    def send(self, file_path):
+        """Copy a results file into the destination directory.
+
+        Args:
+            file_path (str): The path to a JUnitXML results file.
+
+        Returns:
+            str: The path of the copy.
+        """
+
+        name = '{}-{}-{}'.format(os.getpid(), next(self._counter), os.path.basename(file_path))
+        self._make_dirs(self._directory)
+
+        return self._copy(file_path, os.path.join(self._directory, name))
+
+    @property
+    def destination(self):
+        """str: The absolute path of the destination directory."""
+
+        return 'directory:{}'.format(os.path.abspath(self._directory))
+
+    def upload_blob(self, digest, blob_path):
+        """Copy an attachment blob into the 'blobs' sub-directory of the destination directory.
+
+        Args:
+            digest (str): The hex SHA-256 digest of the blob content.
+            blob_path (str): The path of the blob.
+        """
+
+        blobs = os.path.join(self._directory, 'blobs')
+        self._make_dirs(blobs)
+        self._copy(blob_path, os.path.join(blobs, os.path.basename(blob_path)))
+
+    @staticmethod
+    def _make_dirs(directory):
+        """Create a directory and its parents unless it exists. (Safe when chunks are uploaded concurrently)
+
+        Args:
+            directory (str): The path of the directory.
+        """
+
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+
+    @staticmethod
+    def _copy(source_path, destination_path):
+        """Copy a file so that the copy appears atomically.
+
+        Args:
+            source_path (str): The file to copy.
+            destination_path (str): The path of the copy.
+
+        Returns:
+            str: The path of the copy.
+        """
+
+        temp_path = '{}.tmp'.format(destination_path)
+        shutil.copyfile(source_path, temp_path)
+        os.rename(temp_path, destination_path)
+
+        return destination_path
+
+
+class HttpBackend(UploadBackend):
+    """POST results files to an HTTP endpoint. (The 'zigzag-upload-url' option)
+
+    The value of the 'ZIGZAG_UPLOAD_TOKEN' environment variable, when defined, is sent as a bearer token. If the
+    endpoint responds with a JSON object containing an 'id' it is returned as the job ID. Files are streamed from disk
+    as a chunked request body, gzip compressed on the fly with the 'zigzag-upload-compress' option, so memory use does
+    not grow with the size of the file.
+    """
+
+    name = 'http'
+    supports_attachments = True
+
+    def __init__(self, get_option):
+        """Create an HttpBackend object.
+
+        Args:
+            get_option (callable): Resolve the value of an option by name. (None if not set)
+        """
+
+        super(HttpBackend, self).__init__(get_option)
+        self._url = None
+        self._timeout = None
+        self._compress = False
+
+    def prepare(self):
+        """Validate the endpoint URL.
+
+        Raises:
+            ValueError: The 'zigzag-upload-url' option is not set.
+        """
+
+        self._url = self._get_option('zigzag-upload-url')
+        if not self._url:
+            raise ValueError("The 'http' backend requires the 'zigzag-upload-url' option!")
+        timeout = self._get_option('zigzag-upload-timeout')
+        self._timeout = float(timeout) if timeout else None
+        compress = self._get_option('zigzag-upload-compress')
+        self._compress = compress is True or str(compress).lower() in ('true', 'yes', '1')
+
+    def _iter_body(self, file_path):
+        """Read a file block by block, compressing the blocks if enabled.
+
+        Args:
+            file_path (str): The file to send.
+
+        Yields:
+            bytes: The non-empty blocks of the request body.
+        """
+
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, 16 + zlib.MAX_WBITS) \
+            if self._compress else None  # gzip format
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                if compressor is not None:
+                    block = compressor.compress(block)
+                if block:
+                    yield block
+        if compressor is not None:
+            yield compressor.flush()
+
+    def _post(self, url, file_path, content_type):
+        """POST a file to a URL as a chunked request body streamed from disk.
+
+        Args:
+            url (str): The URL.
+            file_path (str): The file to send.
+            content_type (str): The content type of the file.
+
+        Returns:
+            object: The job ID reported by the endpoint or the HTTP status code.
+
+        Raises:
+            urllib.error.HTTPError: The endpoint responded with an error status.
+        """
+
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path = '{}?{}'.format(path, parts.query)
+        connection_class = HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+        connection = connection_class(parts.netloc, timeout=self._timeout)
+        try:
+            connection.putrequest('POST', path)
+            connection.putheader('Content-Type', content_type)
+            connection.putheader('Transfer-Encoding', 'chunked')
+            if self._compress:
+                connection.putheader('Content-Encoding', 'gzip')
+            if os.environ.get('ZIGZAG_UPLOAD_TOKEN'):
+                connection.putheader('Authorization', 'Bearer {}'.format(os.environ['ZIGZAG_UPLOAD_TOKEN']))
+            connection.endheaders()
+            for block in self._iter_body(file_path):
+                connection.send('{:x}\r\n'.format(len(block)).encode('ascii') + block + b'\r\n')
+            connection.send(b'0\r\n\r\n')
+
+            response = connection.getresponse()
+            content = response.read()
+            status = response.status
+        finally:
+            connection.close()
+
+        if status >= 400:
+            raise HTTPError(url, status, response.reason, response.msg, None)
+        try:
+            return json.loads(content.decode('utf-8'))['id']
+        except (ValueError, KeyError, TypeError):
+            return status
+
+    def send(self, file_path):
+        """POST a results file to the endpoint.
+
+        Args:
+            file_path (str): The path to a JUnitXML results file.
+
+        Returns:
+            object: The job ID reported by the endpoint or the HTTP status code.
+
+        Raises:
+            urllib.error.HTTPError: The endpoint responded with an error status.
+        """
+
+        return self._post(self._url, file_path, 'application/xml')
+
+    @property
+    def destination(self):
+        """str: The endpoint URL."""
+
+        return 'http:{}'.format(self._url)
+
+    def upload_blob(self, digest, blob_path):
+        """POST an attachment blob to 'blobs/<file name>' relative to the endpoint URL.
+
+        Args:
+            digest (str): The hex SHA-256 digest of the blob content.
+            blob_path (str): The path of the blob.
+
+        Raises:
+            urllib.error.HTTPError: The endpoint responded with an error status.
+        """
+
+        self._post(urljoin(self._url, 'blobs/{}'.format(os.path.basename(blob_path))),
+                   blob_path,
+                   'application/gzip' if blob_path.endswith('.gz') else 'application/octet-stream')
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def validate_qtest_token(token):
+    """Check that a qTest API token only contains alphanumeric characters.
+
+    Args:
+        token (str): A qTest API token.
+
+    Returns:
+        str: The token or an empty string if it is not valid.
+    """
+
+    return token if re.match("^[a-zA-Z0-9]+$", token) else ""
+
+
+def load_backend(name):
+    """Find an upload backend class by name among the built-in backends and the 'pytest_zigzag.backends' entry points.
+
+    Args:
+        name (str): The name of the backend.
+
+    Returns:
+        type: A subclass of 'UploadBackend'.
+
+    Raises:
+        ValueError: No backend with that name is available.
+    """
+
+    for backend in (ZigZagBackend, DirectoryBackend, HttpBackend):
+        if backend.name == name:
+            return backend
+    for entry_point in iter_entry_points(ENTRY_POINT_GROUP, name):
+        return entry_point.load()
+
+    raise ValueError("Unknown upload backend '{}'! Available backends: {}".format(
+        name, ', '.join(available_backends())))
+
+
+def available_backends():
+    """List the names of the available upload backends.
+
+    Returns:
+        list(str): The names of the built-in backends followed by the names registered as entry points.
+    """
+
+    names = [ZigZagBackend.name, DirectoryBackend.name, HttpBackend.name]
+
+    return names + sorted(ep.name for ep in iter_entry_points(ENTRY_POINT_GROUP) if ep.name not in names)
+
+
+def create_backend(get_option):
+    """Create the upload backend selected by the 'zigzag-backend' option.
+
+    Args:
+        get_option (callable): Resolve the value of an option by name. (None if not set)
+
+    Returns:
+        UploadBackend: The backend. ('prepare' has not been called yet)
+    """
+
+    return load_backend(get_option('zigzag-backend') or DEFAULT_BACKEND)(get_option)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""Stop starting new tests once a session time budget is nearly used up."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import time
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+DEFAULT_RESERVE_FRACTION = 0.1
+SKIP_REASON = 'time_budget_exhausted'
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class TimeBudget(object):
+    """The wall clock time budget of a pytest session.
+
+    No new tests should start once less than 'reserve' seconds of the budget are left, so that the results can still be
+    written and uploaded before the job is killed.
+    """
+
+    def __init__(self, budget, reserve=None):
+        """Create a TimeBudget object which starts now.
+
+        Args:
+            budget (float): The number of seconds the session may run for.
+            reserve (float): The number of seconds kept for writing and uploading the results. (Default: 10% of the
+                budget)
+        """
+
+        self.budget = budget
+        self.reserve = budget * DEFAULT_RESERVE_FRACTION if reserve is None else reserve
+        self.skipped = 0
+        self._end = time.time() + budget
+
+    @property
+    def remaining(self):
+        """float: The number of seconds left until the end of the budget. (Negative once it has been overrun)"""
+
+        return self._end - time.time()
+
+    @property
+    def exhausted(self):
+        """bool: Whether only the reserve is left, so no new tests should start."""
+
+        return self.remaining <= self.reserve
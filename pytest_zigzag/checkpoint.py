@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import io
+import os
+import json
+import itertools
+from collections import OrderedDict
+from lxml import etree
+from _pytest.junitxml import mangle_test_address
+from pytest_zigzag.junit_xml import (add_to_counts, count_outcomes, iter_suite, make_property, write_suite,
+                                     OUTCOME_ELEMENTS)
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+OUTCOME_TAGS = {outcome: tag for tag, (outcome, _) in OUTCOME_ELEMENTS.items()}
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _longrepr_message(report):
+    """Extract a short message and the full text from the long representation of a report.
+
+    Args:
+        report (_pytest.runner.TestReport): A test report.
+
+    Returns:
+        tuple: (str: A short message, str: The full text)
+    """
+
+    longrepr = report.longrepr
+    if isinstance(longrepr, tuple):  # skips are reported as (file, line, reason)
+        reason = longrepr[2][9:] if longrepr[2].startswith('Skipped: ') else longrepr[2]
+        return reason, '{}:{}: {}'.format(longrepr[0], longrepr[1], reason)
+    if hasattr(longrepr, 'reprcrash'):
+        return longrepr.reprcrash.message, str(longrepr)
+
+    return str(longrepr), str(longrepr)
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def make_record(item, reports):
+    """Build a journal record for a finished test from the reports of all its phases.
+
+    Args:
+        item (_pytest.nodes.Item): An item object.
+        reports (list(_pytest.runner.TestReport)): The reports for the setup, call and teardown phases.
+
+    Returns:
+        dict: A JSON serializable journal record.
+    """
+
+    names = mangle_test_address(item.nodeid)
+    record = {'nodeid': item.nodeid,
+              'classname': '.'.join(names[:-1]),
+              'name': names[-1],
+              'file': reports[0].location[0],
+              'line': reports[0].location[1],
+              'time': sum(r.duration for r in reports),
+              'outcome': 'passed',
+              'message': None,
+              'text': None,
+              'system_out': reports[-1].capstdout,
+              'system_err': reports[-1].capstderr,
+              'properties': [list(p) for p in item.user_properties]}
+
+    for report in reports:
+        if report.failed or report.skipped:
+            if report.failed:
+                record['outcome'] = 'failed' if report.when == 'call' else 'error'
+            else:
+                record['outcome'] = 'skipped'
+            record['message'], record['text'] = _longrepr_message(report)
+            break
+
+    return record
+
+
+def record_to_testcase(record):
+    """Build a 'testcase' element from a journal record.
+
+    Args:
+        record (dict): A journal record.
+
+    Returns:
+        lxml.etree._Element: A 'testcase' element.
+    """
+
+    testcase = etree.Element('testcase', classname=record['classname'], name=record['name'],
+                             file=record['file'], time='{:.3f}'.format(record['time']))
+    if record['line'] is not None:
+        testcase.set('line', str(record['line']))
+
+    if record['properties']:
+        properties = etree.SubElement(testcase, 'properties')
+        for name, value in record['properties']:
+            properties.append(make_property(name, value))
+
+    if record['outcome'] != 'passed':
+        outcome = etree.SubElement(testcase, OUTCOME_TAGS[record['outcome']], message=record['message'] or '')
+        outcome.text = record['text']
+
+    for tag, key in (('system-out', 'system_out'), ('system-err', 'system_err')):
+        if record[key]:
+            etree.SubElement(testcase, tag).text = record[key]
+
+    return testcase
+
+
+def load_journal(path):
+    """Load the records of a checkpoint journal, ignoring a partially written last line.
+
+    Args:
+        path (str): The path to the journal.
+
+    Returns:
+        dict: A dictionary of journal records keyed by node ID.
+    """
+
+    records = {}
+    if not os.path.exists(path):
+        return records
+
+    with io.open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # the runner died while writing this record
+            records[record['nodeid']] = record
+
+    return records
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class CheckpointJournal(object):
+    """An append-only journal of finished test results which survives the test runner being killed."""
+
+    def __init__(self, path, resume=False, batch_size=20):
+        """Create a CheckpointJournal object.
+
+        Args:
+            path (str): The path to the journal.
+            resume (bool): Continue an existing journal instead of starting a new one.
+            batch_size (int): The number of records written between calls to fsync.
+        """
+
+        self._path = path
+        self._batch_size = max(1, batch_size)
+        self._pending = 0
+        self.completed = load_journal(path) if resume else {}
+        self.resumed = []
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._journal = io.open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def deselect_completed(self, config, items):
+        """Deselect the items which already completed according to the journal.
+
+        Args:
+            config (_pytest.config.Config): The pytest config object
+            items (list(_pytest.nodes.Item)): List of item objects. (Modified in-place)
+        """
+
+        remaining = []
+        deselected = []
+        for item in items:
+            (deselected if item.nodeid in self.completed else remaining).append(item)
+
+        self.resumed = [self.completed[item.nodeid] for item in deselected]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = remaining
+
+    def append(self, record):
+        """Append a record to the journal. Records are flushed immediately and synced to disk in batches.
+
+        Args:
+            record (dict): A journal record.
+        """
+
+        self._journal.write(u'{}\n'.format(json.dumps(record, sort_keys=True)))
+        self._journal.flush()
+        self._pending += 1
+        if self._pending >= self._batch_size:
+            self.sync()
+
+    def sync(self):
+        """Sync the written records to disk."""
+
+        os.fsync(self._journal.fileno())
+        self._pending = 0
+
+    def close(self):
+        """Sync and close the journal."""
+
+        if not self._journal.closed:
+            self.sync()
+            self._journal.close()
+
+    def merge_into(self, junit_file_path):
+        """Merge the results of the tests completed in a previous session into a JUnitXML results file.
+
+        Each resumed result is written just before the first testcase of the current session with the same classname so
+        that the steps of a test case with steps class stay together and in order. Resumed results of a classname
+        without a testcase in the current session are written together at the end.
+
+        Args:
+            junit_file_path (str): The path to the JUnitXML results file written for the current session.
+        """
+
+        if not self.resumed:
+            return
+
+        testcases = [record_to_testcase(record) for record in self.resumed]
+        resumed_property = make_property('resumed_tests', len(testcases))
+        suite = iter_suite(junit_file_path)
+        attribs = add_to_counts(dict(next(suite).attrib), count_outcomes(testcases))
+        pending = OrderedDict()  # resumed testcases by classname in journal order
+        for testcase in testcases:
+            pending.setdefault(testcase.get('classname'), []).append(testcase)
+
+        def children():
+            child = next(suite, None)
+            if child is not None and child.tag == 'properties':
+                child.append(resumed_property)
+                yield child
+                child = next(suite, None)
+            else:
+                properties = etree.Element('properties')
+                properties.append(resumed_property)
+                yield properties
+            rest = itertools.chain([child], suite) if child is not None else suite
+            for child in rest:
+                if child.tag == 'testcase':
+                    for testcase in pending.pop(child.get('classname'), ()):
+                        yield testcase
+                yield child
+            for group in pending.values():
+                for testcase in group:
+                    yield testcase
+
+        write_suite(junit_file_path, attribs, children())
@@ -0,0 +1,498 @@
+# -*- coding: utf-8 -*-
+
+"""Console script for pytest-zigzag."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import, print_function
+import os
+import sys
+import glob
+import time
+import argparse
+import pytest
+import py
+from lxml import etree
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from pytest_zigzag import _get_option_of_highest_precedence, _load_config_file
+from pytest_zigzag.backends import create_backend, validate_qtest_token, HttpBackend
+from pytest_zigzag.diff import diff_results, index_results
+from pytest_zigzag.merge import merge_results, MERGE_STRATEGIES
+from pytest_zigzag.stub_server import StubUploadServer
+from pytest_zigzag.upload import upload_with_retries
+from pytest_zigzag.upload_policy import percentile
+from pytest_zigzag.validation import validate_results_file
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class _CommandLineConfig(object):
+    """Adapt parsed command line arguments and a pytest ini file to the subset of the pytest config API used to resolve
+    plug-in options, so that the console script resolves options exactly like the plug-in does.
+    """
+
+    _INI_FILES = (('pytest.ini', 'pytest'), ('tox.ini', 'pytest'), ('setup.cfg', 'tool:pytest'))
+
+    def __init__(self, args):
+        """Create a _CommandLineConfig object.
+
+        Args:
+            args (argparse.Namespace): The parsed command line arguments.
+        """
+
+        self._args = args
+        self._ini_section = self._find_ini_section(args.inifile)
+
+    def _find_ini_section(self, inifile):
+        """Find the pytest section of an ini file by searching the current directory and its parents.
+
+        Args:
+            inifile (str): An explicit path to an ini file. (Optional)
+
+        Returns:
+            py.iniconfig.SectionWrapper: The pytest section of the ini file or None if not found.
+        """
+
+        if inifile:
+            ini = py.iniconfig.IniConfig(inifile)
+            sections = ('tool:pytest', 'pytest') if inifile.endswith('.cfg') else ('pytest',)  # like pytest itself
+            return next((ini[section] for section in sections if section in ini), None)
+
+        for directory in py.path.local().parts(reverse=True):
+            for name, section in self._INI_FILES:
+                path = directory.join(name)
+                if path.isfile():
+                    ini = py.iniconfig.IniConfig(str(path))
+                    if section in ini:
+                        return ini[section]
+
+    def getoption(self, name):
+        """Get the value of a command line option.
+
+        Args:
+            name (str): The name of the option. (e.g. '--pytest-zigzag-config')
+
+        Returns:
+            object: The value of the option.
+
+        Raises:
+            ValueError: No such option.
+        """
+
+        try:
+            return getattr(self._args, name.lstrip('-').replace('-', '_'))
+        except AttributeError:
+            raise ValueError("no option named '{}'".format(name))
+
+    def getini(self, name):
+        """Get the value of an option from the pytest section of the ini file.
+
+        Args:
+            name (str): The name of the ini option.
+
+        Returns:
+            str: The value of the option or None if not present.
+        """
+
+        return self._ini_section.get(name) if self._ini_section is not None else None
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _find_results_files(paths):
+    """Expand directories and glob patterns into a sorted list of JUnitXML result files.
+
+    Args:
+        paths (list(str)): File paths, directories or glob patterns.
+
+    Returns:
+        list(str): A sorted list of unique file paths.
+    """
+
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            found.update(glob.glob(os.path.join(path, '*.xml')))
+        elif os.path.isfile(path):
+            found.add(path)
+        else:
+            found.update(p for p in glob.glob(path) if os.path.isfile(p))
+
+    return sorted(found)
+
+
+def _validate_results_file(file_path):
+    """Validate a JUnitXML results file against the JUnitXML schema. (Executed in a worker process)
+
+    Args:
+        file_path (str): The path to a JUnitXML results file.
+
+    Returns:
+        tuple: (str: The file path, int: The number of testcases, str: An error message or None)
+    """
+
+    try:
+        testcases, invalid = validate_results_file(file_path)
+    except (IOError, OSError) as e:
+        return file_path, 0, str(e)
+
+    return file_path, testcases, "Invalid testcases: {}".format(', '.join(invalid)) if invalid else None
+
+
+def _upload_results_file(file_path, backend, args):
+    """Upload a single JUnitXML results file with the upload backend using the retry policy from the command line.
+
+    Args:
+        file_path (str): The path to a JUnitXML results file.
+        backend (pytest_zigzag.backends.UploadBackend): The prepared upload backend.
+        args (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        tuple: (str: The file path, object: The queue job ID or None, list(str): Messages describing the upload)
+    """
+
+    messages = []
+
+    try:
+        job_id = upload_with_retries(lambda: backend.upload(file_path),
+                                     messages,
+                                     retries=args.retries,
+                                     backoff=args.backoff,
+                                     attempt_timeout=args.timeout,
+                                     deadline=args.deadline)
+    except Exception as e:  # report every file even if some fail
+        messages.append(str(e))
+        job_id = None
+
+    return file_path, job_id, messages
+
+
+def _prepare_backend(config):
+    """Create and prepare the upload backend selected on the command line or in the pytest ini file.
+
+    Args:
+        config (_CommandLineConfig): The command line config.
+
+    Returns:
+        tuple: (pytest_zigzag.backends.UploadBackend: The backend or None, str: An error message or None)
+    """
+
+    try:
+        backend = create_backend(lambda option_name: _get_option_of_highest_precedence(config, option_name))
+    except ValueError as e:
+        return None, str(e)
+
+    if backend.name == 'zigzag':
+        zigzag_config = _get_option_of_highest_precedence(config, 'pytest-zigzag-config')
+        if not zigzag_config:
+            return None, ("A pytest-zigzag config file must be specified with '--pytest-zigzag-config' or in a pytest "
+                          "ini file!")
+        try:
+            _load_config_file(zigzag_config)
+        except pytest.exit.Exception as e:
+            return None, str(e)
+        if not validate_qtest_token(os.environ.get('QTEST_API_TOKEN', '')):
+            return None, "The 'QTEST_API_TOKEN' environment variable is not defined or invalid!"
+
+    try:
+        backend.prepare()
+    except (KeyError, ValueError, IOError, OSError) as e:
+        return None, str(e)
+
+    return backend, None
+
+
+def _upload(args):
+    """Validate, parse and upload a collection of JUnitXML results files.
+
+    Files are validated in a process pool. ZigZag parses each file again on the upload threads: the parsed results hold
+    lxml trees and API clients which cannot be sent between processes.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        int: The exit code.
+    """
+
+    backend, error = _prepare_backend(_CommandLineConfig(args))
+    if error:
+        print(error)
+        return 1
+
+    files = _find_results_files(args.paths)
+    if not files:
+        print('No JUnitXML results files found!')
+        return 1
+
+    process_pool = Pool(args.processes)
+    try:
+        validated = process_pool.map(_validate_results_file, files)
+    finally:
+        process_pool.close()
+        process_pool.join()
+
+    exit_code = 0
+    valid_files = []
+    for file_path, testcases, error in validated:
+        if error:
+            print("Skipping invalid results file '{}': {}".format(file_path, error))
+            exit_code = 1
+        else:
+            valid_files.append(file_path)
+
+    thread_pool = ThreadPool(args.max_connections)
+    try:
+        uploads = thread_pool.map(lambda f: _upload_results_file(f, backend, args), valid_files)
+    finally:
+        thread_pool.close()
+        thread_pool.join()
+
+    print('\nSummary:')
+    for file_path, job_id, messages in uploads:
+        if job_id is None:
+            exit_code = 1
+            print("{}: FAILED ({})".format(file_path, messages[-1]))
+        else:
+            print("{}: Queue Job ID: {}".format(file_path, job_id))
+    print("\nUploaded {} of {} results files.".format(sum(1 for u in uploads if u[1] is not None), len(files)))
+
+    return exit_code
+
+
+def _diff(args):
+    """Compare the results of two sessions keyed by 'test_id' and print the differences.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        int: The exit code. (1 if there are new failures)
+    """
+
+    try:
+        base = index_results(args.base)
+        head = index_results(args.head)
+    except (IOError, OSError, etree.XMLSyntaxError) as e:
+        print("Failed to read results: {}".format(e))
+        return 2
+
+    diff = diff_results(base, head, duration_ratio=args.duration_ratio, min_duration_change=args.min_duration_change)
+
+    for title, keys in (('New failures', diff.new_failures),
+                        ('Fixed', diff.fixed),
+                        ('Missing', diff.missing),
+                        ('New', diff.new)):
+        if keys:
+            print("{} ({}):".format(title, len(keys)))
+            for key in keys:
+                print("  {}".format(key))
+    for title, changes in (('Slower', diff.slower), ('Faster', diff.faster)):
+        if changes:
+            print("{} ({}):".format(title, len(changes)))
+            for key, before, after in changes:
+                print("  {}: {:.3f}s -> {:.3f}s".format(key, before, after))
+
+    print("\nCompared {} tests with {} tests: {} new failures, {} fixed, {} missing, {} new, {} slower, {} faster."
+          .format(len(base), len(head), len(diff.new_failures), len(diff.fixed), len(diff.missing), len(diff.new),
+                  len(diff.slower), len(diff.faster)))
+
+    return 1 if diff.new_failures else 0
+
+
+def _merge(args):
+    """Merge the results of several sessions into one results file with a single result per test.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        int: The exit code.
+    """
+
+    files = [f for f in _find_results_files(args.paths) if os.path.abspath(f) != os.path.abspath(args.output)]
+    if not files:
+        print('No JUnitXML results files found!')
+        return 1
+    if args.order == 'mtime':
+        files.sort(key=os.path.getmtime)
+
+    try:
+        testcases, dropped = merge_results(files, args.output, args.strategy)
+    except (IOError, OSError, etree.XMLSyntaxError) as e:
+        print("Failed to merge results: {}".format(e))
+        return 1
+
+    print("Merged {} results files into '{}': {} testcases ({} duplicates dropped)".format(
+        len(files), args.output, testcases, dropped))
+
+    return 0
+
+
+def _serve_stub(args):
+    """Run a local stub upload server until interrupted.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        int: The exit code.
+    """
+
+    server = StubUploadServer(args.host, args.port, record=False, save_dir=args.save_dir)
+    print("Stub upload server listening on {} (use '--zigzag-backend=http --zigzag-upload-url={}')"
+          .format(server.url, server.url))
+    sys.stdout.flush()
+    try:
+        server.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print("Received {} uploads ({} bytes)".format(server.received, server.bytes_received))
+
+    return 0
+
+
+def _benchmark(args):
+    """Measure the serialization and upload throughput and latency of a results file against a local stub server.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        int: The exit code.
+    """
+
+    if not os.path.isfile(args.path):
+        print("No such results file: '{}'".format(args.path))
+        return 1
+    size = os.path.getsize(args.path)
+
+    serialize_times = []
+    for _ in range(args.iterations):
+        start = time.time()
+        etree.tostring(etree.parse(args.path))
+        serialize_times.append(time.time() - start)
+
+    server = StubUploadServer(record=False)
+    try:
+        backend = HttpBackend({'zigzag-upload-url': server.url}.get)
+        backend.prepare()
+
+        def upload(_):
+            start = time.time()
+            backend.upload(args.path)
+            return time.time() - start
+
+        thread_pool = ThreadPool(args.concurrency)
+        start = time.time()
+        try:
+            upload_times = thread_pool.map(upload, range(args.iterations))
+        finally:
+            thread_pool.close()
+            thread_pool.join()
+        elapsed = time.time() - start
+    finally:
+        server.stop()
+
+    print("Results file: {} ({} bytes)".format(args.path, size))
+    for title, durations, total in (('Serialization', serialize_times, sum(serialize_times)),
+                                    ('Upload', upload_times, elapsed)):
+        durations = sorted(durations)
+        print("{}: {} iterations, {:.1f} files/s, {:.2f} MB/s, p50={:.2f}ms p90={:.2f}ms p99={:.2f}ms max={:.2f}ms"
+              .format(title, len(durations), len(durations) / total, len(durations) * size / total / 1e6,
+                      *[percentile(durations, p) * 1000 for p in (50, 90, 99)] + [durations[-1] * 1000]))
+
+    return 0
+
+
+def _build_parser():
+    """Build the argument parser for the console script.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+
+    parser = argparse.ArgumentParser(prog='pytest-zigzag', description='Tools for pytest-zigzag JUnitXML results.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    upload = subparsers.add_parser('upload', help='Upload a directory or glob of JUnitXML results files with ZigZag.')
+    upload.add_argument('paths', nargs='+', help='JUnitXML results files, directories or glob patterns.')
+    upload.add_argument('--pytest-zigzag-config', help='The path to a json config file.')
+    upload.add_argument('-c', '--inifile', help='A pytest ini file to read the pytest-zigzag config path from.')
+    upload.add_argument('--zigzag-backend', help="The upload backend: 'zigzag' (default), 'directory', 'http' or an "
+                                                 "installed backend.")
+    upload.add_argument('--zigzag-upload-dir', help="The destination directory of the 'directory' upload backend.")
+    upload.add_argument('--zigzag-upload-url', help="The endpoint URL of the 'http' upload backend.")
+    upload.add_argument('--zigzag-upload-compress', action='store_true',
+                        help="Gzip compress the request body of the 'http' upload backend on the fly.")
+    upload.add_argument('--processes', type=int, default=None,
+                        help='The number of worker processes used for validation. (Default: CPU count)')
+    upload.add_argument('--max-connections', type=int, default=4,
+                        help='The maximum number of concurrent uploads. (Default: 4)')
+    upload.add_argument('--retries', type=int, default=0, help='The number of retries per upload. (Default: 0)')
+    upload.add_argument('--backoff', type=float, default=1.0, help='The base backoff delay in seconds. (Default: 1)')
+    upload.add_argument('--timeout', type=float, default=None, help='The number of seconds allowed per attempt.')
+    upload.add_argument('--deadline', type=float, default=None, help='The number of seconds allowed per file.')
+    upload.set_defaults(func=_upload)
+
+    diff = subparsers.add_parser('diff', help='Compare the results of two sessions keyed by test_id.')
+    diff.add_argument('base', help='The earlier JUnitXML results file or checkpoint journal. (*.jsonl)')
+    diff.add_argument('head', help='The later JUnitXML results file or checkpoint journal. (*.jsonl)')
+    diff.add_argument('--duration-ratio', type=float, default=0.5,
+                      help='The relative change in duration reported as significant. (Default: 0.5)')
+    diff.add_argument('--min-duration-change', type=float, default=1.0,
+                      help='The change in seconds below which duration changes are ignored. (Default: 1)')
+    diff.set_defaults(func=_diff)
+
+    merge = subparsers.add_parser('merge', help='Merge the results of several sessions into one results file.')
+    merge.add_argument('output', help='The merged JUnitXML results file to write.')
+    merge.add_argument('paths', nargs='+', help='JUnitXML results files, directories or glob patterns.')
+    merge.add_argument('--strategy', choices=MERGE_STRATEGIES, default='last',
+                       help="Keep the 'last' or the 'worst' result of tests run by several sessions. (Default: last)")
+    merge.add_argument('--order', choices=('name', 'mtime'), default='mtime',
+                       help="Order the sessions by file 'name' or modification time. (Default: mtime)")
+    merge.set_defaults(func=_merge)
+
+    serve_stub = subparsers.add_parser('serve-stub', help='Run a local stub upload server for the http backend.')
+    serve_stub.add_argument('--host', default='127.0.0.1', help='The address to listen on. (Default: 127.0.0.1)')
+    serve_stub.add_argument('--port', type=int, default=8080, help='The port to listen on. (Default: 8080)')
+    serve_stub.add_argument('--save-dir', help='A directory to save every uploaded results file to.')
+    serve_stub.set_defaults(func=_serve_stub)
+
+    benchmark = subparsers.add_parser('benchmark',
+                                      help='Measure serialization and upload performance against a local stub server.')
+    benchmark.add_argument('path', help='A JUnitXML results file.')
+    benchmark.add_argument('--iterations', type=int, default=20, help='The number of uploads. (Default: 20)')
+    benchmark.add_argument('--concurrency', type=int, default=4, help='The number of concurrent uploads. (Default: 4)')
+    benchmark.set_defaults(func=_benchmark)
+
+    return parser
+
+
+# ======================================================================================================================
+# Main
+# ======================================================================================================================
+def main(argv=None):
+    """Run the pytest-zigzag console script.
+
+    Args:
+        argv (list(str)): The command line arguments. (Default: sys.argv[1:])
+
+    Returns:
+        int: The exit code.
+    """
+
+    args = _build_parser().parse_args(argv)
+
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
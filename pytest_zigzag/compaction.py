@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""Shrink JUnitXML results by capping captured output and storing identical tracebacks once."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import re
+import hashlib
+from lxml import etree
+from pytest_zigzag.junit_xml import iter_suite, make_property, write_suite
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+CAPTURED_STREAMS = ('Captured stdout', 'Captured stderr', 'Captured log')
+TRACEBACK_PROPERTY_PREFIX = 'traceback.'
+TRACEBACK_ELEMENTS = ('failure', 'error')
+HASH_LENGTH = 12
+# The line pytest prints between the entries of a traceback.
+ENTRY_SEPARATOR = re.compile(r'\n(?:_ ){10,}_? *\n')
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def truncate_text(text, max_bytes):
+    """Truncate text to a size budget keeping its beginning and its end.
+
+    Args:
+        text (str): The text.
+        max_bytes (int): The maximum size of the UTF-8 encoded text.
+
+    Returns:
+        str: The text unchanged if it fits, otherwise its head and tail around a note of how much was removed.
+    """
+
+    encoded = text.encode('utf-8')
+    if len(encoded) <= max_bytes:
+        return text
+
+    half = max_bytes // 2
+    head = encoded[:half].decode('utf-8', 'ignore')
+    tail = encoded[len(encoded) - half:].decode('utf-8', 'ignore')
+
+    removed = len(encoded) - len(head.encode('utf-8')) - len(tail.encode('utf-8'))
+
+    return u'{}\n[... {} bytes truncated by pytest-zigzag ...]\n{}'.format(head, removed, tail)
+
+
+def cap_captured_output(report, max_bytes):
+    """Cap the captured stdout, stderr and log output of a test report.
+
+    The sections of each stream (e.g. 'Captured stdout setup' and 'Captured stdout call') are joined and truncated to
+    'max_bytes' when they are larger than that.
+
+    Args:
+        report (_pytest.runner.TestReport): The report. (Modified in-place)
+        max_bytes (int): The maximum size of each captured stream in bytes.
+    """
+
+    for stream in CAPTURED_STREAMS:
+        indices = [i for i, (title, _) in enumerate(report.sections) if title.startswith(stream)]
+        if not indices:
+            continue
+        content = u''.join(report.sections[i][1] for i in indices)
+        if len(content) <= max_bytes // 4 or len(content.encode('utf-8')) <= max_bytes:  # avoid encoding small output
+            continue
+        capped = (report.sections[indices[-1]][0], truncate_text(content, max_bytes))
+        report.sections = [capped if i == indices[0] else section
+                           for i, section in enumerate(report.sections) if i == indices[0] or i not in indices]
+
+
+def split_traceback(text):
+    """Split a pytest traceback into its first entry and the rest.
+
+    The first entry is the frame of the test itself, which differs between tests (e.g. in their parameters) even when
+    the rest of the traceback, such as a call into a shared service that is down, is identical.
+
+    Args:
+        text (str): The traceback body.
+
+    Returns:
+        tuple: (str: The first entry including the separator line, str: The rest) The first entry is empty when the
+            traceback has a single entry.
+    """
+
+    match = ENTRY_SEPARATOR.search(text)
+    if match is None:
+        return '', text
+
+    return text[:match.end()], text[match.end():]
+
+
+def traceback_hash(text):
+    """Get the short hash which identifies a traceback body.
+
+    Args:
+        text (str): The traceback body.
+
+    Returns:
+        str: The hash.
+    """
+
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:HASH_LENGTH]
+
+
+def dedupe_tracebacks(junit_file_path):
+    """Rewrite a JUnitXML results file so that traceback bodies shared by several testcases are stored once.
+
+    Tracebacks are compared without their first entry (see 'split_traceback'). Each shared body is stored in a
+    'traceback.<hash>' testsuite property. The 'failure' and 'error' elements which contained it keep their message and
+    first entry and refer to the property for the rest, and their testcase gets a 'traceback_hash' property. The file
+    is streamed twice so memory is bounded by the size of the shared bodies.
+
+    Args:
+        junit_file_path (str): The path to a JUnitXML results file.
+
+    Returns:
+        tuple: (int: The number of shared tracebacks, int: The number of references to them)
+    """
+
+    def tracebacks(testcase):
+        return [child for child in testcase if child.tag in TRACEBACK_ELEMENTS and child.text]
+
+    counts = {}
+    bodies = {}
+    suite = iter_suite(junit_file_path)
+    next(suite)
+    for element in suite:
+        if element.tag == 'testcase':
+            for child in tracebacks(element):
+                body = split_traceback(child.text)[1]
+                digest = traceback_hash(body)
+                counts[digest] = counts.get(digest, 0) + 1
+                if counts[digest] == 2:
+                    bodies[digest] = body
+    if not bodies:
+        return 0, 0
+
+    def deduped():
+        suite = iter_suite(junit_file_path)
+        next(suite)
+        properties = None
+        for element in suite:
+            if properties is None:
+                properties = element if element.tag == 'properties' else etree.Element('properties')
+                for digest in sorted(bodies):
+                    properties.append(make_property('{}{}'.format(TRACEBACK_PROPERTY_PREFIX, digest), bodies[digest]))
+                yield properties
+                if element is properties:
+                    continue
+            if element.tag == 'testcase':
+                for child in tracebacks(element):
+                    first_entry, body = split_traceback(child.text)
+                    digest = traceback_hash(body)
+                    if digest in bodies:
+                        child.text = "{}[Identical to the '{}{}' testsuite property]".format(
+                            first_entry, TRACEBACK_PROPERTY_PREFIX, digest)
+                        testcase_properties = element.find('properties')
+                        if testcase_properties is None:
+                            testcase_properties = etree.Element('properties')
+                            element.insert(0, testcase_properties)
+                        testcase_properties.append(make_property('traceback_hash', digest))
+            yield element
+
+    suite = iter_suite(junit_file_path)
+    attribs = dict(next(suite).attrib)
+    suite.close()
+    write_suite(junit_file_path, attribs, deduped())
+
+    return len(bodies), sum(counts[digest] for digest in bodies)
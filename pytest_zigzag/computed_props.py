@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+"""Compute global properties from commands and files concurrently and cache them on disk."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import io
+import os
+import re
+import sys
+import json
+import time
+import signal
+import hashlib
+import threading
+import subprocess
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+CACHE_KEY = 'zigzag/computed_props'
+DEFAULT_TIMEOUT = 10.0
+MAX_THREADS = 8
+MAX_FILE_BYTES = 1024 * 1024
+KILL_GRACE = 1.0  # seconds to wait for the output pipe to close after a timeout
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _kill_process_group(process):
+    """Kill a process and every process it started in its process group.
+
+    Args:
+        process (subprocess.Popen): A process started as the leader of its own process group.
+    """
+
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:  # Windows
+            process.kill()
+    except OSError:
+        pass  # it just exited
+
+
+def _run_command(command, timeout):
+    """Run a command and capture its output.
+
+    The command runs in its own process group so that a timeout kills the processes a shell command starts as well,
+    since any of them may hold its output pipe open.
+
+    Args:
+        command (str or list(str)): A shell command line or an argument list which is executed without a shell.
+        timeout (float): The number of seconds the command may run before it is killed.
+
+    Returns:
+        str: The standard output of the command.
+
+    Raises:
+        RuntimeError: The command failed or timed out.
+    """
+
+    if sys.version_info[0] >= 3:
+        new_group = {'start_new_session': True}  # unlike 'preexec_fn' this is safe to use from the thread pool
+    else:  # Python 2
+        new_group = {'preexec_fn': getattr(os, 'setsid', None)}
+    try:
+        process = subprocess.Popen(command, shell=not isinstance(command, list), stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE, **new_group)
+    except OSError as e:
+        raise RuntimeError(str(e))
+
+    output = []
+    reader = threading.Thread(target=lambda: output.append(process.communicate()[0]), name='zigzag-computed-prop')
+    reader.daemon = True
+    reader.start()
+    reader.join(timeout)
+
+    if reader.is_alive():
+        _kill_process_group(process)
+        reader.join(KILL_GRACE)  # a process which left the group may keep the pipe open, so stop waiting for it
+        raise RuntimeError('timed out after {}s'.format(timeout))
+    if process.returncode != 0:
+        raise RuntimeError('exited with {}'.format(process.returncode))
+
+    return output[0].decode('utf-8', 'replace')
+
+
+def _read_file(path):
+    """Read the beginning of a text file.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        str: Up to the first 'MAX_FILE_BYTES' of the file.
+
+    Raises:
+        RuntimeError: The file cannot be read.
+    """
+
+    try:
+        with io.open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read(MAX_FILE_BYTES)
+    except (IOError, OSError) as e:
+        raise RuntimeError(str(e))
+
+
+def _cache_key(name, source):
+    """Get the key a computed property is cached under, which changes whenever its source definition does.
+
+    Args:
+        name (str): The property name.
+        source (dict): The source definition.
+
+    Returns:
+        str: The key.
+    """
+
+    return hashlib.sha1(json.dumps([name, source], sort_keys=True).encode('utf-8')).hexdigest()
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def compute_property(source):
+    """Compute the value of a property from its source.
+
+    Args:
+        source (dict): The source definition with either a 'command' or a 'file' key and optionally a 'pattern' (a
+            regular expression whose first group, or whole match, becomes the value) and a 'timeout' in seconds.
+
+    Returns:
+        str: The value.
+
+    Raises:
+        RuntimeError: The value cannot be computed.
+    """
+
+    if 'command' in source:
+        text = _run_command(source['command'], float(source.get('timeout', DEFAULT_TIMEOUT)))
+    else:
+        text = _read_file(source['file'])
+
+    pattern = source.get('pattern')
+    if pattern:
+        try:
+            match = re.search(pattern, text, re.MULTILINE)
+        except re.error as e:
+            raise RuntimeError("invalid pattern '{}': {}".format(pattern, e))
+        if match is None:
+            raise RuntimeError("no match for the pattern '{}'".format(pattern))
+        return match.group(1) if match.groups() else match.group(0)
+
+    return text.strip()
+
+
+def compute_properties(sources, cache=None, now=None):
+    """Compute properties concurrently in a thread pool, reusing values cached by earlier sessions.
+
+    A value is cached when its source has a 'ttl' in seconds. When a value cannot be computed the 'default' of its
+    source is used if there is one.
+
+    Args:
+        sources (dict): Source definitions by property name.
+        cache (_pytest.cacheprovider.Cache): The pytest cache. (Optional)
+        now (float): The current time in seconds since the epoch. (Default: now)
+
+    Returns:
+        tuple: (OrderedDict: Values by property name, list(tuple): (str: The property name, str: The error) tuples)
+    """
+
+    now = time.time() if now is None else now
+    cached = cache.get(CACHE_KEY, {}) if cache is not None else {}
+    values = OrderedDict()
+    missing = []
+
+    for name in sorted(sources):
+        entry = cached.get(_cache_key(name, sources[name]))
+        if entry is not None and entry['expires'] > now:
+            values[name] = entry['value']
+        else:
+            missing.append(name)
+
+    def compute(name):
+        try:
+            return name, compute_property(sources[name]), None
+        except RuntimeError as e:
+            return name, None, str(e)
+
+    errors = []
+    if missing:
+        pool = ThreadPool(min(len(missing), MAX_THREADS))
+        try:
+            results = pool.map(compute, missing)
+        finally:
+            pool.close()
+            pool.join()
+
+        for name, value, error in results:
+            source = sources[name]
+            if error is not None:
+                errors.append((name, error))
+                if 'default' in source:
+                    values[name] = source['default']
+                continue
+            values[name] = value
+            if source.get('ttl'):
+                cached[_cache_key(name, source)] = {'value': value, 'expires': now + float(source['ttl'])}
+
+        if cache is not None:
+            cache.set(CACHE_KEY, {k: v for k, v in cached.items() if v['expires'] > now})
+
+    return OrderedDict((name, values[name]) for name in sorted(values)), errors
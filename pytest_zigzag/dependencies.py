@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+"""Skip the tests that depend on a failed test, declared with the 'depends_on' mark."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import pytest
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+DEPENDS_ON_MARK = 'depends_on'
+DEPENDENCY_FAILED = 'dependency_failed'
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class DependencyGraph(object):
+    """The dependencies declared between the collected tests with the 'depends_on' mark.
+
+    A 'depends_on' target is the node ID, the name or the 'test_id' of a test, or the name or node ID of the class it
+    belongs to. The mark may decorate a test or a class (every test in the class depends on the targets). A bare test or
+    class name refers to the tests with that name in the module of the dependent test or, if there are none, to the
+    tests with that name in the only other module that has them. The targets of each test are resolved once at
+    collection so that checking a test before it runs only looks up the matched tests in the set of failed tests.
+    Targets that match no collected test (e.g. deselected tests) are ignored.
+    """
+
+    def __init__(self, items, steps_mark):
+        """Create a DependencyGraph object.
+
+        Args:
+            items (list(_pytest.nodes.Item)): List of item objects.
+            steps_mark (str): The mark of test case with steps classes. (Steps of a class form a single node)
+        """
+
+        self.failed = set()
+        self.ambiguous = []  # (node ID of the dependent, target, modules with a match)
+        self._targets = {}
+        exact = {}
+        names = {}
+        groups = {}
+
+        for item in items:
+            groups[item.nodeid] = _item_group(item, steps_mark)
+            exact_keys, name_keys = _item_keys(item)
+            for key in exact_keys:
+                exact.setdefault(key, []).append(item.nodeid)
+            for key in name_keys:
+                names.setdefault(key, {}).setdefault(_item_module(item), []).append(item.nodeid)
+
+        self._edges = {}
+        for item in items:
+            targets = tuple(arg for marker in item.iter_markers(DEPENDS_ON_MARK) for arg in marker.args)
+            if not targets:
+                continue
+            group = groups[item.nodeid]
+            resolved = self._targets[item.nodeid] = []
+            for target in targets:
+                matches = list(exact.get(target, ()))
+                by_module = names.get(target, {})
+                if _item_module(item) in by_module:
+                    matches.extend(by_module[_item_module(item)])
+                elif len(by_module) == 1:
+                    matches.extend(next(iter(by_module.values())))
+                elif by_module:
+                    self.ambiguous.append((item.nodeid, target, sorted(by_module)))
+                resolved.append((target, matches))
+                # a step depending on its own class is already covered by the fail-fast of its class
+                self._edges.setdefault(group, set()).update({groups[n] for n in matches} - {group})
+
+    def find_cycle(self):
+        """Find a cycle of dependencies.
+
+        Returns:
+            list(str): The node IDs forming the cycle with the first repeated at the end or None if there is no cycle.
+        """
+
+        done = set()
+        for start in sorted(self._edges):
+            if start in done:
+                continue
+            path = [start]
+            on_path = {start}
+            stack = [iter(sorted(self._edges.get(start, ())))]
+            while stack:
+                following = next(stack[-1], None)
+                if following is None:
+                    stack.pop()
+                    done.add(path[-1])
+                    on_path.discard(path.pop())
+                elif following in on_path:
+                    return path[path.index(following):] + [following]
+                elif following not in done:
+                    path.append(following)
+                    on_path.add(following)
+                    stack.append(iter(sorted(self._edges.get(following, ()))))
+
+        return None
+
+    def record_failure(self, item):
+        """Record that a test failed (or was skipped because one of its own dependencies failed).
+
+        Args:
+            item (_pytest.nodes.Item): An item object.
+        """
+
+        self.failed.add(item.nodeid)
+
+    def failed_dependency(self, item):
+        """Find a failed dependency of a test.
+
+        Args:
+            item (_pytest.nodes.Item): An item object.
+
+        Returns:
+            tuple: (str: The 'depends_on' target, str: The node ID of the failed test) or None if no dependency failed.
+        """
+
+        for target, matches in self._targets.get(item.nodeid, ()):
+            for nodeid in matches:
+                if nodeid in self.failed:
+                    return target, nodeid
+
+        return None
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _item_keys(item):
+    """Get every 'depends_on' target that refers to a test.
+
+    Args:
+        item (_pytest.nodes.Item): An item object.
+
+    Returns:
+        tuple: (set(str): The node IDs and test IDs which refer to the test in every module, set(str): The names of the
+            test and its class which only refer to it unambiguously from its own module)
+    """
+
+    exact_keys = {item.nodeid}
+    exact_keys.update(arg for marker in item.iter_markers('test_id') for arg in marker.args)
+    name_keys = {item.name, getattr(item, 'originalname', None) or item.name}
+    test_class = item.getparent(pytest.Class)
+    if test_class is not None:
+        exact_keys.add(test_class.nodeid)
+        name_keys.add(test_class.name)
+
+    return exact_keys, name_keys
+
+
+def _item_module(item):
+    """Get the module a test belongs to.
+
+    Args:
+        item (_pytest.nodes.Item): An item object.
+
+    Returns:
+        str: The node ID of the module.
+    """
+
+    return item.nodeid.split('::', 1)[0]
+
+
+def _item_group(item, steps_mark):
+    """Get the node of the dependency graph a test belongs to.
+
+    Args:
+        item (_pytest.nodes.Item): An item object.
+        steps_mark (str): The mark of test case with steps classes.
+
+    Returns:
+        str: The node ID of the test case with steps class of the test or the node ID of the test.
+    """
+
+    test_class = item.getparent(pytest.Class) if steps_mark in item.keywords else None
+
+    return test_class.nodeid if test_class is not None else item.nodeid
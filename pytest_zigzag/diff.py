@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""Compare the results of two pytest-zigzag sessions keyed by 'test_id'."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+from collections import namedtuple
+from pytest_zigzag.checkpoint import load_journal
+from pytest_zigzag.results import iter_testcases
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# Outcomes ranked from best to worst so that the outcome of a test case with steps is the worst outcome of its steps.
+OUTCOME_RANKS = {'passed': 0, 'skipped': 1, 'failed': 2, 'error': 3}
+FAILING_OUTCOMES = ('failed', 'error')
+
+Result = namedtuple('Result', ['outcome', 'time'])
+DiffResult = namedtuple('DiffResult', ['new_failures', 'fixed', 'missing', 'new', 'slower', 'faster'])
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _iter_journal(file_path):
+    """Get the results of a checkpoint journal as (key, outcome, time) tuples.
+
+    Args:
+        file_path (str): The path to a checkpoint journal.
+
+    Yields:
+        tuple: (str: The test ID or the qualified test name if missing, str: The outcome, float: The duration)
+
+    Raises:
+        IOError: The journal does not exist.
+    """
+
+    if not os.path.isfile(file_path):  # 'load_journal' treats a missing journal as empty
+        raise IOError("No such checkpoint journal: '{}'".format(file_path))
+    for record in load_journal(file_path).values():
+        test_id = dict(record['properties']).get('test_id')
+        yield (test_id or '{}.{}'.format(record['classname'], record['name']),
+               record['outcome'],
+               record['time'])
+
+
+def _iter_junit_xml(file_path):
+    """Stream the testcases of a JUnitXML results file as (key, outcome, time) tuples.
+
+    Args:
+        file_path (str): The path to a JUnitXML results file.
+
+    Yields:
+        tuple: (str: The test ID or the qualified test name if missing, str: The outcome, float: The duration)
+    """
+
+    for testcase in iter_testcases(file_path):
+        test_id = dict(testcase.properties).get('test_id')
+        yield (test_id or '{}.{}'.format(testcase.classname, testcase.name),
+               testcase.outcome,
+               testcase.time)
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def index_results(file_path):
+    """Stream a results file into a hash index of test results keyed by 'test_id'.
+
+    The steps of a test case with steps share the 'test_id' of their class so they are aggregated into a single result
+    with the worst outcome and the total duration. Only the compact per test result is kept in memory.
+
+    Args:
+        file_path (str): The path to a JUnitXML results file or a checkpoint journal. (*.jsonl)
+
+    Returns:
+        dict(str, Result): The results keyed by test ID.
+    """
+
+    results = {}
+    for key, outcome, duration in (_iter_journal if file_path.endswith('.jsonl') else _iter_junit_xml)(file_path):
+        previous = results.get(key)
+        if previous is not None:
+            if OUTCOME_RANKS[previous.outcome] > OUTCOME_RANKS[outcome]:
+                outcome = previous.outcome
+            duration += previous.time
+        results[key] = Result(outcome, duration)
+
+    return results
+
+
+def diff_results(base, head, duration_ratio=0.5, min_duration_change=1.0):
+    """Compare two indexes of test results.
+
+    Args:
+        base (dict(str, Result)): The results of the earlier session as returned by 'index_results'.
+        head (dict(str, Result)): The results of the later session as returned by 'index_results'.
+        duration_ratio (float): The relative change in duration considered significant.
+        min_duration_change (float): The absolute change in seconds below which duration changes are ignored.
+
+    Returns:
+        DiffResult: Sorted lists of test IDs for new failures, fixed, missing and new tests plus lists of
+            (test ID, base duration, head duration) tuples for significantly slower and faster tests.
+    """
+
+    new_failures = []
+    fixed = []
+    slower = []
+    faster = []
+
+    for key, result in head.items():
+        previous = base.get(key)
+        if previous is None:
+            continue
+        failing = result.outcome in FAILING_OUTCOMES
+        was_failing = previous.outcome in FAILING_OUTCOMES
+        if failing and not was_failing:
+            new_failures.append(key)
+        elif was_failing and result.outcome == 'passed':
+            fixed.append(key)
+
+        change = result.time - previous.time
+        if abs(change) >= min_duration_change and abs(change) >= duration_ratio * previous.time:
+            (slower if change > 0 else faster).append((key, previous.time, result.time))
+
+    return DiffResult(new_failures=sorted(new_failures),
+                      fixed=sorted(fixed),
+                      missing=sorted(k for k in base if k not in head),
+                      new=sorted(k for k in head if k not in base),
+                      slower=sorted(slower, key=lambda d: d[1] - d[2]),
+                      faster=sorted(faster, key=lambda d: d[2] - d[1]))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""Measure the cost of each stage of an upload without sending anything."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class StageProfiler(object):
+    """Accumulate the wall clock time of named stages and track the peak memory use while they run.
+
+    Peak memory is measured with 'tracemalloc' (memory allocated by Python while profiling) when it is available and
+    falls back to the peak resident set size of the process.
+    """
+
+    def __init__(self, trace_memory=True):
+        """Create a StageProfiler object.
+
+        Args:
+            trace_memory (bool): Trace memory allocations until 'stop' is called. (Slows down allocations)
+        """
+
+        self.durations = OrderedDict()
+        self.timeline = []
+        self._traced = trace_memory and tracemalloc is not None and not tracemalloc.is_tracing()
+        if self._traced:
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage. The time of stages which run several times is summed in 'durations' and each run is
+        recorded as a (name, start, end) tuple in 'timeline'.
+
+        Args:
+            name (str): The name of the stage.
+        """
+
+        start = time.time()
+        try:
+            yield
+        finally:
+            end = time.time()
+            self.durations[name] = self.durations.get(name, 0.0) + end - start
+            self.timeline.append((name, start, end))
+
+    @property
+    def peak_memory(self):
+        """tuple: (int: The peak memory use in bytes or None if unknown, str: How it was measured)"""
+
+        if self._traced:
+            return tracemalloc.get_traced_memory()[1], 'traced'
+        if resource is not None:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, 'max RSS'
+
+        return None, 'unknown'
+
+    def stop(self):
+        """Stop tracing memory allocations."""
+
+        if self._traced:
+            tracemalloc.stop()
+            self._traced = False
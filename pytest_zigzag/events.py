@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import json
+import stat
+import time
+import errno
+import socket
+import threading
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+UNIX_SOCKET_PREFIX = 'unix:'
+FIFO_READER_WAIT = 2.0  # seconds to wait for a reader to open a named pipe
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class _SocketSink(object):
+    """A file like wrapper around a connected Unix domain socket."""
+
+    def __init__(self, path):
+        """Connect to a Unix domain socket.
+
+        Args:
+            path (str): The path to the socket.
+        """
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(path)
+
+    def write(self, data):
+        """Send data over the socket.
+
+        Args:
+            data (bytes): The data to send.
+        """
+
+        self._socket.sendall(data)
+
+    def flush(self):
+        """Sockets are unbuffered."""
+
+    def close(self):
+        """Close the socket."""
+
+        self._socket.close()
+
+
+class EventStream(object):
+    """Write JSON events, one per line, to a local sink from a background thread.
+
+    The sink is a Unix domain socket (when the target starts with 'unix:'), a named pipe (when the target is an existing
+    FIFO) or otherwise an append-only file. Emitting an event never blocks: when the buffer is full the event is
+    dropped and counted instead. Events which cannot be serialized are counted as 'invalid' and skipped.
+    """
+
+    def __init__(self, target, buffer_size=10000):
+        """Create an EventStream object and start the background writer.
+
+        Args:
+            target (str): The sink to write events to.
+            buffer_size (int): The maximum number of events waiting to be written.
+        """
+
+        self._target = target
+        self._queue = queue.Queue(maxsize=buffer_size)
+        self._closed = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.invalid = 0
+        self.error = None
+
+        self._thread = threading.Thread(target=self._run, name='zigzag-event-stream')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _open_fifo(self):
+        """Open a named pipe for writing without blocking on a missing reader.
+
+        The pipe is opened with 'O_NONBLOCK' which fails while nobody reads it, so the open is retried for up to
+        'FIFO_READER_WAIT' seconds or until the stream is closed. Writes block as usual once the pipe is open.
+
+        Returns:
+            file: The pipe opened in binary mode.
+
+        Raises:
+            IOError: No reader opened the pipe in time.
+        """
+
+        deadline = time.time() + FIFO_READER_WAIT
+        while True:
+            try:
+                fd = os.open(self._target, os.O_WRONLY | os.O_NONBLOCK)
+                break
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+                if self._closed.is_set() or time.time() >= deadline:
+                    raise IOError("No reader opened the named pipe '{}'".format(self._target))
+                time.sleep(0.05)
+
+        fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) & ~os.O_NONBLOCK)
+
+        return os.fdopen(fd, 'wb')
+
+    def _open(self):
+        """Open the sink for writing.
+
+        Returns:
+            object: A file like object opened in binary mode.
+        """
+
+        if self._target.startswith(UNIX_SOCKET_PREFIX):
+            return _SocketSink(self._target[len(UNIX_SOCKET_PREFIX):])
+        if os.path.exists(self._target) and stat.S_ISFIFO(os.stat(self._target).st_mode):
+            return self._open_fifo()
+
+        return open(self._target, 'ab')
+
+    def _run(self):
+        """Write queued events to the sink until the stream is closed and the queue is drained."""
+
+        try:
+            sink = self._open()
+        except (IOError, OSError) as e:
+            self.error = str(e)
+            return
+
+        try:
+            while not (self._closed.is_set() and self._queue.empty()):
+                try:
+                    event = self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                try:
+                    line = json.dumps(event, sort_keys=True) + '\n'
+                except (TypeError, ValueError):
+                    self.invalid += 1
+                    continue
+                sink.write(line.encode('utf-8'))
+                self.written += 1
+                if self._queue.empty():
+                    sink.flush()
+        except (IOError, OSError) as e:
+            self.error = str(e)
+        finally:
+            try:
+                sink.close()
+            except (IOError, OSError):
+                pass
+
+    def emit(self, event):
+        """Queue an event for writing without blocking.
+
+        Args:
+            event (dict): A JSON serializable event.
+
+        Returns:
+            bool: True if the event was queued or False if it was dropped.
+        """
+
+        if self.error is not None:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        return True
+
+    def close(self, timeout=5.0):
+        """Stop accepting events and wait for the queued events to be written.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait for the writer.
+        """
+
+        self._closed.set()
+        self._thread.join(timeout)
+
+        # anything still queued will never be written
+        self.dropped += self._queue.qsize()
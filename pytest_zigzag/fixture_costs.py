@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""Attribute the wall time of fixture setup and teardown to the tests that triggered it."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import time
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class FixtureCosts(object):
+    """Record the setup and teardown time of each fixture instance.
+
+    The cost of a fixture is attributed to the test which was running when the fixture was set up or torn down, so a
+    session scoped fixture is charged to the first test that requested it and to the test after which it was finalized.
+    """
+
+    def __init__(self):
+        """Create a FixtureCosts object."""
+
+        self.current_item = None
+        self.totals = {}  # (argname, scope): [setup seconds, teardown seconds, setups]
+        self._teardown_starts = {}
+
+    def _record(self, fixturedef, index, seconds):
+        """Add the cost of a fixture to the current test and to the totals.
+
+        Args:
+            fixturedef (_pytest.fixtures.FixtureDef): The fixture definition.
+            index (int): 0 for setup and 1 for teardown.
+            seconds (float): The wall time.
+        """
+
+        total = self.totals.setdefault((fixturedef.argname, fixturedef.scope), [0.0, 0.0, 0])
+        total[index] += seconds
+        if index == 0:
+            total[2] += 1
+
+        item = self.current_item
+        if item is not None:
+            if not hasattr(item, '_zigzag_fixture_costs'):
+                item._zigzag_fixture_costs = ({}, {})
+            costs = item._zigzag_fixture_costs[index]
+            costs[fixturedef.argname] = costs.get(fixturedef.argname, 0.0) + seconds
+
+    def record_setup(self, fixturedef, seconds):
+        """Record the setup time of a fixture and start watching for its teardown.
+
+        Args:
+            fixturedef (_pytest.fixtures.FixtureDef): The fixture definition.
+            seconds (float): The wall time of the setup.
+        """
+
+        self._record(fixturedef, 0, seconds)
+        # finalizers run last in first out so this one runs before the teardown of the fixture itself
+        fixturedef.addfinalizer(lambda: self._teardown_starts.__setitem__(id(fixturedef), time.time()))
+
+    def record_teardown(self, fixturedef):
+        """Record the teardown time of a fixture once it has been finalized.
+
+        Args:
+            fixturedef (_pytest.fixtures.FixtureDef): The fixture definition.
+        """
+
+        start = self._teardown_starts.pop(id(fixturedef), None)
+        if start is not None:
+            self._record(fixturedef, 1, time.time() - start)
+
+    def ranking(self, limit=10):
+        """Rank the fixtures by their total setup and teardown time.
+
+        Args:
+            limit (int): The maximum number of fixtures.
+
+        Returns:
+            list(tuple): (str: The fixture name, str: The scope, float: The setup seconds, float: The teardown seconds,
+                int: The number of setups) tuples with the most expensive first.
+        """
+
+        ranked = sorted(self.totals.items(), key=lambda t: (-(t[1][0] + t[1][1]), t[0]))
+
+        return [(name, scope, setup, teardown, count) for (name, scope), (setup, teardown, count) in ranked[:limit]]
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def format_costs(costs):
+    """Format the fixture costs of a test as a compact property value.
+
+    Args:
+        costs (dict): The seconds spent per fixture name.
+
+    Returns:
+        str: The costs with the most expensive first. (e.g. 'keystone_client=1.250,server=0.040') Fixtures which took
+            less than a millisecond are left out.
+    """
+
+    ranked = sorted(costs.items(), key=lambda t: (-t[1], t[0]))
+
+    return ','.join('{}={:.3f}'.format(name, seconds) for name, seconds in ranked if seconds >= 0.0005)
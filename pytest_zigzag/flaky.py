@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""Detect flaky tests from a local history of outcomes keyed by 'test_id'."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import sqlite3
+from pytest_zigzag.junit_xml import OUTCOME_CODES
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# The history of a test is a short string of outcome codes (e.g. 'PPFPP') ranked here from best to worst.
+OUTCOME_RANKS = {'P': 0, 'S': 1, 'F': 2, 'E': 3}
+QUARANTINE_MODES = ('exclude', 'only')
+MIN_RUNS = 2  # a flip rate needs at least two outcomes which were not skipped
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def report_outcome(report):
+    """Get the outcome code for the report of a single test phase.
+
+    Args:
+        report (_pytest.runner.TestReport): A test report.
+
+    Returns:
+        str: An outcome code.
+    """
+
+    if report.failed:
+        return OUTCOME_CODES['failed' if report.when == 'call' else 'error']
+
+    return OUTCOME_CODES['skipped' if report.skipped else 'passed']
+
+
+def flip_rate(outcomes):
+    """Calculate how often a test flipped between passing and failing. Skipped runs are ignored.
+
+    Args:
+        outcomes (str): A history of outcome codes, oldest first.
+
+    Returns:
+        float: The number of flips divided by the number of opportunities to flip or None if there are too few runs.
+    """
+
+    results = [o == 'P' for o in outcomes if o != 'S']
+    if len(results) < MIN_RUNS:
+        return None
+
+    return sum(1 for a, b in zip(results, results[1:]) if a != b) / float(len(results) - 1)
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class OutcomeHistory(object):
+    """A history of the most recent outcomes of each test stored in a local SQLite database.
+
+    The history is read once when the session starts and the outcomes of the session are appended in a single
+    transaction when it finishes.
+    """
+
+    def __init__(self, path, window=30):
+        """Create an OutcomeHistory object.
+
+        Args:
+            path (str): The path to the SQLite database. (Created if missing)
+            window (int): The number of most recent outcomes kept per test.
+        """
+
+        self._path = path
+        self._window = max(MIN_RUNS, window)
+        self._session = {}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        connection = sqlite3.connect(path)
+        try:
+            with connection:
+                connection.execute('CREATE TABLE IF NOT EXISTS history (test_id TEXT PRIMARY KEY, outcomes TEXT)')
+            self.outcomes = dict(connection.execute('SELECT test_id, outcomes FROM history'))
+        finally:
+            connection.close()
+
+    def flip_rate(self, test_id):
+        """Get the flip rate of a test from the history recorded before this session.
+
+        Args:
+            test_id (str): The test ID.
+
+        Returns:
+            float: The flip rate or None if there are too few runs.
+        """
+
+        return flip_rate(self.outcomes.get(test_id, ''))
+
+    def record(self, test_id, outcome):
+        """Record an outcome for the current session. A test ID shared by several tests (e.g. test steps) or reported
+        for several phases keeps its worst outcome.
+
+        Args:
+            test_id (str): The test ID.
+            outcome (str): An outcome code.
+        """
+
+        previous = self._session.get(test_id)
+        if previous is None or OUTCOME_RANKS[outcome] > OUTCOME_RANKS[previous]:
+            self._session[test_id] = outcome
+
+    def save(self):
+        """Append the outcomes of the current session to the history in a single transaction.
+
+        The outcomes are appended to the rows as they are stored when the transaction runs rather than to the history
+        read when the session started, so sessions which share the database and finish concurrently keep each other's
+        outcomes.
+        """
+
+        if not self._session:
+            return
+
+        appended = [(outcome, -self._window, test_id) for test_id, outcome in self._session.items()]
+        connection = sqlite3.connect(self._path)
+        try:
+            with connection:
+                connection.executemany("INSERT OR IGNORE INTO history (test_id, outcomes) VALUES (?, '')",
+                                       [(test_id,) for test_id in self._session])
+                connection.executemany('UPDATE history SET outcomes = substr(outcomes || ?, ?) WHERE test_id = ?',
+                                       appended)
+                self.outcomes.update(connection.execute('SELECT test_id, outcomes FROM history'))
+        finally:
+            connection.close()
+        self._session = {}
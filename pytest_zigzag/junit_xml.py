@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""Streaming helpers for reading and writing JUnitXML results files with bounded memory."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+from lxml import etree
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# Map the outcome child elements of a 'testcase' to an outcome and the 'testsuite' attribute that counts it.
+OUTCOME_ELEMENTS = {'failure': ('failed', 'failures'), 'error': ('error', 'errors'), 'skipped': ('skipped', 'skips')}
+COUNT_ATTRIBUTES = ('tests', 'failures', 'errors', 'skips')
+try:
+    STRING_TYPES = (basestring,)  # noqa: F821
+except NameError:  # Python 3
+    STRING_TYPES = (str,)
+# Single character codes for outcomes where many of them are packed into a string. (e.g. 'PPFS')
+OUTCOME_CODES = {'passed': 'P', 'skipped': 'S', 'failed': 'F', 'error': 'E'}
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _text(value):
+    """Convert an attribute value to a string, passing strings through unchanged so unicode survives on Python 2.
+
+    Args:
+        value (object): The value.
+
+    Returns:
+        str: The value as a string.
+    """
+
+    return value if isinstance(value, STRING_TYPES) else u'{}'.format(value)
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def testcase_outcome(testcase):
+    """Determine the outcome of a 'testcase' element.
+
+    Args:
+        testcase (lxml.etree._Element): A 'testcase' element.
+
+    Returns:
+        str: One of 'passed', 'failed', 'error' or 'skipped'.
+    """
+
+    for child in testcase:
+        if child.tag in OUTCOME_ELEMENTS:
+            return OUTCOME_ELEMENTS[child.tag][0]
+
+    return 'passed'
+
+
+def testcase_properties(testcase):
+    """Get the properties of a 'testcase' element.
+
+    Args:
+        testcase (lxml.etree._Element): A 'testcase' element.
+
+    Returns:
+        list(tuple): A list of (name, value) tuples in document order.
+    """
+
+    return [(p.get('name'), p.get('value')) for p in testcase.iterfind('./properties/property')]
+
+
+def property_tuples(properties):
+    """Get the properties of a 'properties' element.
+
+    Args:
+        properties (lxml.etree._Element): A 'properties' element.
+
+    Returns:
+        list(tuple): A list of (name, value) tuples in document order.
+    """
+
+    return [(p.get('name'), p.get('value')) for p in properties.iterfind('./property')]
+
+
+def count_outcomes(testcases):
+    """Count the outcomes of 'testcase' elements the way the 'testsuite' attributes do.
+
+    Args:
+        testcases (iterable(lxml.etree._Element)): The 'testcase' elements to count.
+
+    Returns:
+        dict: The 'tests', 'failures', 'errors' and 'skips' counts.
+    """
+
+    counts = dict.fromkeys(COUNT_ATTRIBUTES, 0)
+    for testcase in testcases:
+        counts['tests'] += 1
+        for child in testcase:
+            if child.tag in OUTCOME_ELEMENTS:
+                counts[OUTCOME_ELEMENTS[child.tag][1]] += 1
+                break
+
+    return counts
+
+
+def iter_suite(file_path):
+    """Stream a JUnitXML results file one top level element at a time.
+
+    The root 'testsuite' element is yielded first (only its attributes are reliable at that point) followed by each of
+    its children in document order. Every child is cleared once the consumer asks for the next one, so consumers must
+    copy anything they want to keep.
+
+    Args:
+        file_path (str): The path to a JUnitXML results file.
+
+    Yields:
+        lxml.etree._Element: The root element followed by each of its children.
+
+    Raises:
+        lxml.etree.XMLSyntaxError: The file does not contain well-formed XML.
+    """
+
+    root = None
+    depth = 0
+
+    for event, element in etree.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+                yield root
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth == 1:
+            yield element
+            element.clear()
+            while element.getprevious() is not None:
+                del root[0]
+
+
+def write_suite(file_path, attribs, children):
+    """Atomically write a JUnitXML results file while streaming its top level elements.
+
+    Args:
+        file_path (str): The destination path.
+        attribs (dict): The attributes of the 'testsuite' root element.
+        children (iterable(lxml.etree._Element)): The children of the root element in document order.
+    """
+
+    temp_path = '{}.zigzag.tmp'.format(file_path)
+    with etree.xmlfile(temp_path, encoding='utf-8') as xf:
+        xf.write_declaration()
+        with xf.element('testsuite', {k: _text(v) for k, v in attribs.items()}):
+            for child in children:
+                xf.write(child)
+    os.rename(temp_path, file_path)
+
+
+def add_to_counts(attribs, counts):
+    """Add outcome counts to the attributes of a 'testsuite' element.
+
+    Args:
+        attribs (dict): The attributes of a 'testsuite' element.
+        counts (dict): The counts to add as returned by 'count_outcomes'.
+
+    Returns:
+        dict: A new dictionary of attributes.
+    """
+
+    attribs = dict(attribs)
+    for name in COUNT_ATTRIBUTES:
+        attribs[name] = str(int(attribs.get(name, 0)) + counts[name])
+
+    return attribs
+
+
+def make_property(name, value):
+    """Create a 'property' element.
+
+    Args:
+        name (str): The property name.
+        value (str): The property value.
+
+    Returns:
+        lxml.etree._Element: A 'property' element.
+    """
+
+    return etree.Element('property', name=_text(name), value=_text(value))
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""Merge the JUnitXML results of several sessions into a single deduplicated results file."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from lxml import etree
+from pytest_zigzag.diff import OUTCOME_RANKS
+from pytest_zigzag.junit_xml import (COUNT_ATTRIBUTES, OUTCOME_ELEMENTS, iter_suite, make_property, property_tuples,
+                                     testcase_outcome, testcase_properties, write_suite)
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+MERGE_STRATEGIES = ('last', 'worst')
+MERGED_FILES_PROPERTY = 'zigzag_merged_files'
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _testcase_key(testcase):
+    """Get the key which identifies the same test in different sessions.
+
+    The steps of a test case with steps class share a 'test_id' so the testcase name is part of the key.
+
+    Args:
+        testcase (lxml.etree._Element): A 'testcase' element.
+
+    Returns:
+        str: The test ID and name or the qualified test name if the test ID is missing.
+    """
+
+    test_id = dict(testcase_properties(testcase)).get('test_id')
+    if test_id:
+        return '{}::{}'.format(test_id, testcase.get('name'))
+
+    return '{}.{}'.format(testcase.get('classname'), testcase.get('name'))
+
+
+def _select_testcases(file_paths, strategy):
+    """Stream the results files once to pick the result kept for every test and reconcile the global properties.
+
+    Args:
+        file_paths (list(str)): The paths of the results files in session order.
+        strategy (str): 'last' keeps the result of the latest session and 'worst' keeps the worst result, or the
+            result of the latest session among equally bad results.
+
+    Returns:
+        tuple: (dict: The attributes of the merged 'testsuite' element, OrderedDict: The global properties, set: The
+            (file index, testcase position) of the kept testcases, int: The number of testcases read)
+    """
+
+    winners = {}
+    properties = OrderedDict()
+    attribs = {}
+    suite_time = 0.0
+    merged_files = 0
+    read = 0
+
+    for index, file_path in enumerate(file_paths):
+        suite = iter_suite(file_path)
+        root = next(suite)
+        if index == 0:
+            attribs = dict(root.attrib)
+        suite_time += float(root.get('time') or 0)
+        file_properties = {}
+        position = 0
+        for element in suite:
+            if element.tag == 'properties':
+                file_properties = OrderedDict(property_tuples(element))
+            elif element.tag == 'testcase':
+                key = _testcase_key(element)
+                outcome = testcase_outcome(element)
+                kept = winners.get(key)
+                # 'worst' keeps the later session on a tie so the details of the equal outcome are the most recent
+                if kept is None or strategy == 'last' or OUTCOME_RANKS[outcome] >= OUTCOME_RANKS[kept[2]]:
+                    winners[key] = (index, position, outcome)
+                position += 1
+        read += position
+        merged_files += int(file_properties.pop(MERGED_FILES_PROPERTY, 1))
+        properties.update(file_properties)  # the latest session wins when values differ
+
+    properties[MERGED_FILES_PROPERTY] = merged_files
+    counts = dict.fromkeys(COUNT_ATTRIBUTES, 0)
+    counts['tests'] = len(winners)
+    count_names = dict(OUTCOME_ELEMENTS.values())
+    for _, _, outcome in winners.values():
+        if outcome in count_names:
+            counts[count_names[outcome]] += 1
+    attribs.update({name: str(count) for name, count in counts.items()})
+    attribs['time'] = '{:.3f}'.format(suite_time)
+
+    return attribs, properties, {(index, position) for index, position, _ in winners.values()}, read
+
+
+@contextmanager
+def _locked(lock_path):
+    """Hold an exclusive lock on a file so that concurrent sessions merge one at a time. (No-op without 'fcntl')
+
+    Args:
+        lock_path (str): The path to the lock file.
+    """
+
+    with open(lock_path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def merge_results(file_paths, output_path, strategy='last'):
+    """Stream several JUnitXML results files into one results file with a single result per test.
+
+    Testcases are matched by 'test_id' and name (see '_testcase_key') and kept in session order. Global properties are
+    combined with the value of the latest session winning and a 'zigzag_merged_files' property counts the merged
+    sessions. Each file is streamed twice so memory is bounded by the number of unique tests.
+
+    Args:
+        file_paths (list(str)): The paths of the results files in session order.
+        output_path (str): The path of the merged results file. (May be one of 'file_paths')
+        strategy (str): 'last' keeps the result of the latest session and 'worst' keeps the worst result.
+
+    Returns:
+        tuple: (int: The number of testcases kept, int: The number of duplicate testcases dropped)
+
+    Raises:
+        ValueError: Unknown merge strategy.
+    """
+
+    if strategy not in MERGE_STRATEGIES:
+        raise ValueError("Unknown merge strategy '{}'! Available strategies: {}".format(
+            strategy, ', '.join(MERGE_STRATEGIES)))
+
+    attribs, properties, kept, read = _select_testcases(file_paths, strategy)
+
+    def merged():
+        properties_element = etree.Element('properties')
+        for name, value in properties.items():
+            properties_element.append(make_property(name, value))
+        yield properties_element
+        for index, file_path in enumerate(file_paths):
+            suite = iter_suite(file_path)
+            next(suite)
+            position = 0
+            for element in suite:
+                if element.tag == 'testcase':
+                    if (index, position) in kept:
+                        yield element
+                    position += 1
+
+    write_suite(output_path, attribs, merged())
+
+    return len(kept), read - len(kept)
+
+
+def merge_into(target_path, file_path, strategy='last'):
+    """Merge a results file into an accumulated results file shared by several sessions.
+
+    Sessions that finish at the same time take turns through an exclusive lock on '<target_path>.lock'.
+
+    Args:
+        target_path (str): The path of the accumulated results file. (Created if missing)
+        file_path (str): The path of the results file of the session.
+        strategy (str): 'last' keeps the result of the latest session and 'worst' keeps the worst result.
+
+    Returns:
+        tuple: (int: The number of testcases in the accumulated results, int: The number of duplicate testcases dropped)
+    """
+
+    with _locked('{}.lock'.format(target_path)):
+        file_paths = [target_path, file_path] if os.path.isfile(target_path) else [file_path]
+
+        return merge_results(file_paths, target_path, strategy)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+"""Session and upload metrics written in the Prometheus textfile format or as JSON."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+METRIC_PREFIX = 'zigzag_'
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class SessionMetrics(object):
+    """Collect the test outcomes and durations of a session and the timings of its upload.
+
+    Upload attempts may be recorded concurrently from several threads.
+    """
+
+    def __init__(self):
+        """Create a SessionMetrics object."""
+
+        self.start = time.time()
+        self.outcomes = OrderedDict((outcome, 0) for outcome in ('passed', 'failed', 'error', 'skipped'))
+        self.test_seconds = 0.0
+        self.stages = OrderedDict()
+        self.upload_succeeded = None
+        self.attempts = 0
+        self.failed_attempts = 0
+        self.request_seconds = 0.0
+        self.max_request_seconds = 0.0
+        self.bytes_sent = 0
+        self.documents = 0
+        self.parse_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_report(self, report):
+        """Record the outcome and duration of a single test phase.
+
+        Args:
+            report (_pytest.runner.TestReport): A test report.
+        """
+
+        self.test_seconds += report.duration
+        if report.when == 'call' or (report.when == 'setup' and not report.passed):
+            outcome = 'skipped' if report.skipped else 'passed' if report.passed else \
+                'failed' if report.when == 'call' else 'error'
+            self.outcomes[outcome] += 1
+        elif report.when == 'teardown' and report.failed:
+            self.outcomes['error'] += 1
+
+    def record_attempt(self, seconds, size, succeeded):
+        """Record a single upload request.
+
+        Args:
+            seconds (float): The duration of the request.
+            size (int): The number of bytes sent.
+            succeeded (bool): Whether the request succeeded.
+        """
+
+        with self._lock:
+            self.attempts += 1
+            self.failed_attempts += 0 if succeeded else 1
+            self.request_seconds += seconds
+            self.max_request_seconds = max(self.max_request_seconds, seconds)
+            self.bytes_sent += size
+
+    def record_parse(self, seconds):
+        """Record the time spent parsing an upload document into the backend's payload.
+
+        Args:
+            seconds (float): The duration.
+        """
+
+        with self._lock:
+            self.parse_seconds += seconds
+
+    def record_upload(self, stages, succeeded):
+        """Record the duration of each stage of the upload and its result.
+
+        Args:
+            stages (dict): The seconds spent in each stage. (e.g. {'config': 0.01, 'upload': 2.5})
+            succeeded (bool): Whether the results were uploaded.
+        """
+
+        self.stages.update(stages)
+        self.upload_succeeded = succeeded
+
+    def samples(self):
+        """Get the metric samples.
+
+        Returns:
+            list(tuple): (str: The metric name, str: The type, str: The help text, list(tuple): The (dict: labels,
+                float: value) samples) tuples.
+        """
+
+        metrics = [
+            ('session_duration_seconds', 'gauge', 'The wall time of the pytest session.',
+             [({}, time.time() - self.start)]),
+            ('session_tests', 'gauge', 'The number of tests by outcome.',
+             [({'outcome': outcome}, count) for outcome, count in self.outcomes.items()]),
+            ('session_test_duration_seconds', 'gauge', 'The sum of the setup, call and teardown times of all tests.',
+             [({}, self.test_seconds)]),
+        ]
+        if self.upload_succeeded is not None:
+            metrics.extend([
+                ('upload_stage_duration_seconds', 'gauge', 'The wall time of each stage of the upload.',
+                 [({'stage': stage}, seconds) for stage, seconds in self.stages.items()]),
+                ('upload_parse_duration_seconds', 'gauge', 'The time spent building the payload of the backend.',
+                 [({}, self.parse_seconds)]),
+                ('upload_requests', 'gauge', 'The number of upload requests by result.',
+                 [({'result': 'success'}, self.attempts - self.failed_attempts),
+                  ({'result': 'failure'}, self.failed_attempts)]),
+                ('upload_retries', 'gauge', 'The number of upload requests beyond the first one per document.',
+                 [({}, max(0, self.attempts - self.documents))]),
+                ('upload_request_duration_seconds_sum', 'gauge', 'The total duration of the upload requests.',
+                 [({}, self.request_seconds)]),
+                ('upload_request_duration_seconds_max', 'gauge', 'The duration of the slowest upload request.',
+                 [({}, self.max_request_seconds)]),
+                ('upload_sent_bytes', 'gauge', 'The number of bytes sent by all upload requests.',
+                 [({}, self.bytes_sent)]),
+                ('upload_documents', 'gauge', 'The number of documents uploaded. (More than one when chunked)',
+                 [({}, self.documents)]),
+                ('upload_success', 'gauge', '1 if the results were uploaded, 0 otherwise.',
+                 [({}, int(self.upload_succeeded))]),
+            ])
+        metrics.append(('metrics_timestamp_seconds', 'gauge', 'When these metrics were written.',
+                        [({}, time.time())]))
+
+        return [(METRIC_PREFIX + name, kind, help_text, values) for name, kind, help_text, values in metrics]
+
+    def write_textfile(self, path):
+        """Atomically write the metrics in the Prometheus text exposition format. (For the node exporter textfile
+        collector)
+
+        Args:
+            path (str): The destination path. (Should end with '.prom')
+        """
+
+        lines = []
+        for name, kind, help_text, values in self.samples():
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for labels, value in values:
+                label_text = ','.join('{}="{}"'.format(k, v) for k, v in sorted(labels.items()))
+                lines.append('{}{} {}'.format(name, '{{{}}}'.format(label_text) if label_text else '',
+                                              _format_value(value)))
+
+        _write_atomically(path, '\n'.join(lines) + '\n')
+
+    def write_json(self, path):
+        """Atomically write the metrics as a JSON object mapping each metric name to its value, or to an object of
+        values by label value for labelled metrics.
+
+        Args:
+            path (str): The destination path.
+        """
+
+        document = OrderedDict()
+        for name, _, _, values in self.samples():
+            if len(values) == 1 and not values[0][0]:
+                document[name] = values[0][1]
+            else:
+                document[name] = OrderedDict((list(labels.values())[0], value) for labels, value in values)
+
+        _write_atomically(path, json.dumps(document, indent=2) + '\n')
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _format_value(value):
+    """Format a sample value for the Prometheus text format.
+
+    Args:
+        value (float): The value.
+
+    Returns:
+        str: The formatted value.
+    """
+
+    return str(value) if isinstance(value, int) else '{:.6f}'.format(value)
+
+
+def _write_atomically(path, text):
+    """Write a file so that readers never see it partially written.
+
+    Args:
+        path (str): The destination path.
+        text (str): The content.
+    """
+
+    temp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temp_path, 'w') as f:
+        f.write(text)
+    os.rename(temp_path, path)
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""Skip the rest of a module (or of a mark) once consecutive tests fail in the same way, such as when a shared
+endpoint goes down mid-run.
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import re
+from collections import OrderedDict
+from pytest_zigzag.compaction import traceback_hash
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+OUTAGE = 'outage'
+# Parts of an exception message which differ between tests failing for the same reason.
+VOLATILE_PATTERNS = (
+    (re.compile(r'0x[0-9a-fA-F]+'), '0x?'),
+    (re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'), '<uuid>'),
+    (re.compile(r'\d+'), 'N'),
+)
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class OutageBreaker(object):
+    """Trip for a group of tests once a number of consecutive tests in the group fail with the same signature, so that
+    the rest of the group is skipped instead of each test waiting for its own timeout.
+
+    Tests are grouped by the first argument of a mark (e.g. '@pytest.mark.service("nova")') when a mark is chosen and
+    the test has it, and otherwise by module. A passing test resets the count of its group.
+    """
+
+    def __init__(self, threshold, group_mark=None):
+        """Create an OutageBreaker object.
+
+        Args:
+            threshold (int): The number of consecutive failures with the same signature that trips the breaker.
+            group_mark (str): The name of the mark which groups tests. (Optional)
+        """
+
+        self.threshold = threshold
+        self.group_mark = group_mark
+        self.tripped = OrderedDict()
+        self._streaks = {}
+
+    def group(self, item):
+        """Get the group of a test.
+
+        Args:
+            item (_pytest.nodes.Item): An item object.
+
+        Returns:
+            str: The group.
+        """
+
+        if self.group_mark:
+            marker = item.get_closest_marker(self.group_mark)
+            if marker is not None and marker.args:
+                return '{}({})'.format(self.group_mark, marker.args[0])
+
+        return item.nodeid.split('::')[0]
+
+    def check(self, item):
+        """Find out whether the breaker tripped for the group of a test and count the test as skipped if it did.
+
+        Args:
+            item (_pytest.nodes.Item): An item object.
+
+        Returns:
+            dict: The 'group', 'signature', 'description' and 'skipped' count of the tripped breaker or None.
+        """
+
+        outage = self.tripped.get(self.group(item))
+        if outage is not None:
+            outage['skipped'] += 1
+
+        return outage
+
+    def record(self, item, report, excinfo):
+        """Record the outcome of a test phase.
+
+        Args:
+            item (_pytest.nodes.Item): An item object.
+            report (_pytest.runner.TestReport): The report for the test phase.
+            excinfo (_pytest._code.code.ExceptionInfo): The exception raised by the test phase or None.
+        """
+
+        group = self.group(item)
+        if group in self.tripped:
+            return
+        if report.passed:
+            if report.when == 'call':
+                self._streaks.pop(group, None)
+            return
+        if not report.failed or excinfo is None or report.when == 'teardown':
+            return
+
+        description = failure_description(excinfo)
+        signature = traceback_hash(failure_signature(excinfo))
+        last_signature, count = self._streaks.get(group, (None, 0))
+        count = count + 1 if signature == last_signature else 1
+        self._streaks[group] = (signature, count)
+        if count >= self.threshold:
+            self.tripped[group] = {'group': group, 'signature': signature, 'description': description, 'skipped': 0}
+            del self._streaks[group]
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def failure_description(excinfo):
+    """Describe a failure in one line.
+
+    Args:
+        excinfo (_pytest._code.code.ExceptionInfo): The exception info.
+
+    Returns:
+        str: The first line of the exception. (e.g. "ConnectionError: [Errno 111] Connection refused")
+    """
+
+    return excinfo.exconly().strip().split('\n')[0]
+
+
+def failure_signature(excinfo):
+    """Build the normalized signature of a failure which is the same for tests that fail for the same reason.
+
+    The signature is the exception type and message with addresses, UUIDs and numbers masked, and the function where
+    the exception was raised.
+
+    Args:
+        excinfo (_pytest._code.code.ExceptionInfo): The exception info.
+
+    Returns:
+        str: The signature.
+    """
+
+    message = failure_description(excinfo)
+    for pattern, replacement in VOLATILE_PATTERNS:
+        message = pattern.sub(replacement, message)
+    entry = excinfo.traceback[-1] if excinfo.traceback else None
+    origin = '{}:{}'.format(entry.path, entry.name) if entry is not None else ''
+
+    return '{} @ {}'.format(message, origin)
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+
+"""A reader for JUnitXML results files produced by pytest-zigzag."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+from lxml import etree
+from collections import namedtuple
+from pytest_zigzag.junit_xml import iter_suite, property_tuples, testcase_outcome, testcase_properties
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+Testcase = namedtuple('Testcase', ['name', 'classname', 'time', 'outcome', 'attribs', 'properties'])
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def make_testcase(element):
+    """Build a compact Testcase record from a 'testcase' element.
+
+    Args:
+        element (lxml.etree._Element): A 'testcase' element.
+
+    Returns:
+        Testcase: A record of the testcase without its captured output or failure text.
+    """
+
+    return Testcase(name=element.get('name'),
+                    classname=element.get('classname'),
+                    time=float(element.get('time') or 0),
+                    outcome=testcase_outcome(element),
+                    attribs=dict(element.attrib),
+                    properties=tuple(testcase_properties(element)))
+
+
+def iter_testcases(xml_file_path):
+    """Stream the testcases of a JUnitXML results file as compact records with bounded memory.
+
+    Args:
+        xml_file_path (str): A file path to a JUnitXML file.
+
+    Yields:
+        Testcase: A record for each 'testcase' element in document order.
+    """
+
+    suite = iter_suite(xml_file_path)
+    next(suite)
+    for element in suite:
+        if element.tag == 'testcase':
+            yield make_testcase(element)
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class ResultsReader(object):
+    """Read a JUnitXML results file produced by pytest-zigzag.
+
+    The file is parsed once with iterparse into compact testcase records which are indexed by testcase name, 'test_id'
+    and 'jira', so lookups are O(1) no matter how many testcases the file contains. Suite attributes and properties are
+    read lazily from the start of the file and the full document is only parsed if 'xml_doc' is requested.
+    """
+
+    def __init__(self, xml_file_path):
+        """Create a ResultsReader object.
+
+        Args:
+            xml_file_path (str): A file path to a JUnitXML file created using the pytest-zigzag plug-in.
+        """
+
+        self._xml_file_path = xml_file_path
+        self._xml_doc = None
+
+        self._testsuite_props = None
+        self._testsuite_attribs = None
+
+        self._testcases = None
+        self._by_name = None
+        self._by_test_id = None
+        self._by_jira = None
+
+    def _read_header(self):
+        """Read the testsuite attributes and properties which precede the first testcase."""
+
+        self._testsuite_props = {}
+        suite = iter_suite(self._xml_file_path)
+        self._testsuite_attribs = dict(next(suite).attrib)
+        for element in suite:
+            if element.tag != 'properties':
+                break
+            self._testsuite_props.update(property_tuples(element))
+        suite.close()
+
+    def _build_indexes(self):
+        """Parse the file once and index the testcases by name, 'test_id' and 'jira'."""
+
+        self._testcases = []
+        self._by_name = {}
+        self._by_test_id = {}
+        self._by_jira = {}
+
+        for testcase in iter_testcases(self._xml_file_path):
+            self._testcases.append(testcase)
+            self._by_name.setdefault(testcase.name, []).append(testcase)
+            for name, value in testcase.properties:
+                if name == 'test_id':
+                    self._by_test_id.setdefault(value, []).append(testcase)
+                elif name == 'jira':
+                    self._by_jira.setdefault(value, []).append(testcase)
+
+    @property
+    def testsuite_props(self):
+        """dict: A dictionary of properties on the testsuite root element."""
+
+        if self._testsuite_props is None:
+            self._read_header()
+
+        return self._testsuite_props
+
+    @property
+    def testsuite_attribs(self):
+        """dict: A dictionary of attributes on the testsuite root element."""
+
+        if self._testsuite_attribs is None:
+            self._read_header()
+
+        return self._testsuite_attribs
+
+    @property
+    def xml_doc(self):
+        """lxml.etree.Element: Raw etree doc at the testsuite root element. (Parses the entire file into memory)"""
+
+        if self._xml_doc is None:
+            self._xml_doc = etree.parse(self._xml_file_path).getroot()
+
+        return self._xml_doc
+
+    @property
+    def testcases(self):
+        """list(Testcase): All the testcase records in document order."""
+
+        if self._testcases is None:
+            self._build_indexes()
+
+        return self._testcases
+
+    def get_testcases(self, testcase_name):
+        """Retrieve the testcase records with a specified name.
+
+        Args:
+            testcase_name (str): The name of the desired testcase.
+
+        Returns:
+            list(Testcase): The matching testcase records.
+        """
+
+        if self._by_name is None:
+            self._build_indexes()
+
+        return self._by_name.get(testcase_name, [])
+
+    def get_testcases_by_test_id(self, test_id):
+        """Retrieve the testcase records with a specified 'test_id' property.
+
+        Args:
+            test_id (str): The desired 'test_id'.
+
+        Returns:
+            list(Testcase): The matching testcase records. (Test steps share the 'test_id' of their class)
+        """
+
+        if self._by_test_id is None:
+            self._build_indexes()
+
+        return self._by_test_id.get(test_id, [])
+
+    def get_testcases_by_jira(self, jira):
+        """Retrieve the testcase records with a specified 'jira' property.
+
+        Args:
+            jira (str): The desired Jira ID.
+
+        Returns:
+            list(Testcase): The matching testcase records.
+        """
+
+        if self._by_jira is None:
+            self._build_indexes()
+
+        return self._by_jira.get(jira, [])
+
+    def get_testcase_property(self, testcase_name, property_name):
+        """Retrieve all the properties for a specified testcase.
+
+        Args:
+            testcase_name (str): The name of the desired testcase from which to retrieve properties.
+            property_name (str): The name of the desired property.
+
+        Returns:
+            list: A list of values for the specified property name.
+        """
+
+        return [value
+                for testcase in self.get_testcases(testcase_name)
+                for name, value in testcase.properties
+                if name == property_name]
+
+    def get_testcase_properties(self, testcase_name):
+        """Retrieve all the properties for a specified testcase.
+
+        Note: if there are multiple properties with the same name only one of the values will be returned.
+
+        Args:
+            testcase_name (str): The name of the desired testcase from which to retrieve properties.
+
+        Returns:
+            dict: A dictionary of properties on the specified testcase element.
+        """
+
+        return {name: value for testcase in self.get_testcases(testcase_name) for name, value in testcase.properties}
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import hashlib
+import pytest
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class StepProgress(object):
+    """Track the progress of 'test_case_with_steps' classes in the pytest cache so that a rerun can continue a class
+    from the step that failed instead of starting again from the first step.
+    """
+
+    CACHE_KEY = 'zigzag/step_progress'
+
+    def __init__(self, cache):
+        """Create a StepProgress object.
+
+        Args:
+            cache (_pytest.cacheprovider.Cache): The pytest cache used to persist progress.
+        """
+
+        self._cache = cache
+        self._saved = cache.get(self.CACHE_KEY, {})
+        self._digests = {}
+        self._progress = {}
+        self.resumed_classes = 0
+
+    def _file_digest(self, fspath):
+        """Calculate (and memoize) a digest of a test file so that progress is discarded once the file changes.
+
+        Args:
+            fspath (py.path.local): The path to the test file.
+
+        Returns:
+            str: The hex digest of the file contents.
+        """
+
+        key = str(fspath)
+        if key not in self._digests:
+            self._digests[key] = hashlib.sha1(fspath.read_binary()).hexdigest()
+
+        return self._digests[key]
+
+    def deselect_passed_steps(self, config, items, steps_mark):
+        """Deselect the steps which passed in a previous run of a step class which then failed, and mark the remaining
+        steps of the class as resumed.
+
+        Args:
+            config (_pytest.config.Config): The pytest config object
+            items (list(_pytest.nodes.Item)): List of item objects. (Modified in-place)
+            steps_mark (str): The name of the mark which designates a class as a test case with steps.
+        """
+
+        remaining = []
+        deselected = []
+        resumed = {}
+
+        for item in items:
+            test_class = item.getparent(pytest.Class) if item.get_closest_marker(steps_mark) else None
+            if test_class is None:  # not a step or a marked function outside a class
+                remaining.append(item)
+                continue
+
+            class_nodeid = test_class.nodeid
+            saved = self._saved.get(class_nodeid)
+            if saved and saved['digest'] == self._file_digest(item.fspath) and item.nodeid in saved['passed']:
+                deselected.append(item)
+                resumed.setdefault(class_nodeid, []).append(item.nodeid)
+                continue
+
+            if class_nodeid in resumed:
+                item.user_properties.append(('resumed_after_step', resumed[class_nodeid][-1].split('::')[-1]))
+                item.user_properties.append(('resumed_steps_deselected', str(len(resumed[class_nodeid]))))
+            remaining.append(item)
+
+        for class_nodeid, passed in resumed.items():
+            self._progress[class_nodeid] = {'passed': list(passed), 'failed': False}
+        self.resumed_classes = len(resumed)
+
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = remaining
+
+    def record(self, item, report):
+        """Record the outcome of a single phase of a step.
+
+        Args:
+            item (_pytest.nodes.Item): An item object belonging to a step class. (Ignored without a class)
+            report (_pytest.runner.TestReport): The report for the test phase.
+        """
+
+        test_class = item.getparent(pytest.Class)
+        if test_class is None:
+            return
+
+        progress = self._progress.setdefault(test_class.nodeid, {'passed': [], 'failed': False})
+        progress.setdefault('digest', self._file_digest(item.fspath))
+
+        if report.failed:
+            progress['failed'] = True
+        elif report.when == 'call' and report.passed and not progress['failed']:
+            progress['passed'].append(item.nodeid)
+
+    def save(self):
+        """Persist the progress of step classes which failed and forget the classes which completed successfully."""
+
+        for class_nodeid, progress in self._progress.items():
+            if progress['failed'] and 'digest' in progress:
+                self._saved[class_nodeid] = {'digest': progress['digest'], 'passed': progress['passed']}
+            elif not progress['failed'] and 'digest' in progress:
+                self._saved.pop(class_nodeid, None)
+
+        self._cache.set(self.CACHE_KEY, self._saved)
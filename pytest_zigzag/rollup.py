@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+"""Roll up the steps of 'test_case_with_steps' classes into a single 'testcase' element per class."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import copy
+from lxml import etree
+from pytest_zigzag.junit_xml import (count_outcomes, iter_suite, make_property, testcase_outcome, testcase_properties,
+                                     write_suite, COUNT_ATTRIBUTES, OUTCOME_CODES, OUTCOME_ELEMENTS)
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# Properties which differ from step to step. They are replaced by the packed step properties on the rolled up record.
+PER_STEP_PROPERTIES = ('start_time', 'end_time', 'test_step')
+# Properties which describe a single step. They are kept for each step that has them as '<name>.<step name>' and the
+# value of the step which decides the outcome of the class is also kept as '<name>'.
+STEP_SPECIFIC_PROPERTIES = ('skip_reason', 'outage_signature', 'fixture_setup', 'fixture_teardown')
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _step_class(testcase):
+    """Get the class name of a 'testcase' element if it is a test step.
+
+    Args:
+        testcase (lxml.etree._Element): A top level element of a JUnitXML results file.
+
+    Returns:
+        str: The class name or None if the element is not a test step.
+    """
+
+    if testcase.tag != 'testcase':
+        return None
+    for prop in testcase.iterfind('./properties/property'):
+        if prop.get('name') == 'test_step':
+            return testcase.get('classname') if prop.get('value') == 'true' else None
+
+    return None
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def iter_step_groups(suite):
+    """Group the consecutive test steps of the same class while streaming the children of a results file.
+
+    Args:
+        suite (generator): The children of the root element as yielded by 'iter_suite'.
+
+    Yields:
+        list(lxml.etree._Element): The copied steps of a class or a single element which is not a test step.
+    """
+
+    group = []
+    for child in suite:
+        classname = _step_class(child)
+        if group and classname != group[0].get('classname'):
+            yield group
+            group = []
+        if classname is None:
+            yield [child]
+        else:
+            group.append(copy.deepcopy(child))  # the streamed element is cleared once the next one is read
+    if group:
+        yield group
+
+
+def rollup_step_class(steps):
+    """Build a single 'testcase' element for a 'test_case_with_steps' class from the elements of its steps.
+
+    Args:
+        steps (list(lxml.etree._Element)): The 'testcase' elements of the steps in execution order.
+
+    Returns:
+        lxml.etree._Element: A 'testcase' element with the total duration, the packed step outcomes and durations,
+            the properties of every step and the outcome of the first failing step.
+    """
+
+    first = steps[0]
+    module, _, class_name = first.get('classname').rpartition('.')
+    outcomes = [testcase_outcome(step) for step in steps]
+    durations = [float(step.get('time') or 0) for step in steps]
+
+    testcase = etree.Element('testcase', classname=module, name=class_name, time='{:.3f}'.format(sum(durations)))
+    for name in ('file', 'line'):
+        if first.get(name) is not None:
+            testcase.set(name, first.get(name))
+
+    failed = next((i for i, o in enumerate(outcomes) if o in ('failed', 'error')), None)
+    source = steps[failed] if failed is not None else first  # the step which decides the outcome of the class
+
+    # the union of the properties of the steps where the first step with a property decides its values
+    properties = etree.SubElement(testcase, 'properties')
+    step_properties = [testcase_properties(step) for step in steps]
+    names = set()
+    seen = set()
+    for props in step_properties:
+        new_names = set()
+        for name, value in props:
+            if name in PER_STEP_PROPERTIES or name in STEP_SPECIFIC_PROPERTIES or name in names:
+                continue
+            new_names.add(name)
+            if (name, value) not in seen:
+                seen.add((name, value))
+                properties.append(make_property(name, value))
+        names.update(new_names)
+    for name in STEP_SPECIFIC_PROPERTIES:
+        value = dict(testcase_properties(source)).get(name)
+        if value is not None:
+            properties.append(make_property(name, value))
+        for step, props in zip(steps, step_properties):
+            value = dict(props).get(name)
+            if value is not None:
+                properties.append(make_property('{}.{}'.format(name, step.get('name')), value))
+    for name, step in (('start_time', first), ('end_time', steps[-1])):
+        value = dict(testcase_properties(step)).get(name)
+        if value is not None:
+            properties.append(make_property(name, value))
+    properties.append(make_property('test_step', 'false'))
+    properties.append(make_property('steps', len(steps)))
+    properties.append(make_property('step_names', ','.join(step.get('name') for step in steps)))
+    properties.append(make_property('step_outcomes', ''.join(OUTCOME_CODES[o] for o in outcomes)))
+    properties.append(make_property('step_durations', ','.join('{:.3f}'.format(d) for d in durations)))
+
+    if failed is not None:
+        properties.append(make_property('first_failed_step', source.get('name')))
+    elif not all(o == 'skipped' for o in outcomes):
+        return testcase
+
+    for child in source:
+        if child.tag in OUTCOME_ELEMENTS or child.tag in ('system-out', 'system-err'):
+            testcase.append(copy.deepcopy(child))
+
+    return testcase
+
+
+def rollup_steps(junit_file_path):
+    """Rewrite a JUnitXML results file so that each 'test_case_with_steps' class is a single 'testcase' element.
+
+    The file is streamed twice, once to count the outcomes of the rolled up records and once to write them, so memory
+    is bounded by the size of the largest step class.
+
+    Args:
+        junit_file_path (str): The path to a JUnitXML results file.
+
+    Returns:
+        tuple: (int: The number of step classes, int: The number of steps rolled up)
+    """
+
+    def rolled_up(stats):
+        suite = iter_suite(junit_file_path)
+        next(suite)
+        for group in iter_step_groups(suite):
+            if _step_class(group[0]):
+                stats[0] += 1
+                stats[1] += len(group)
+                yield rollup_step_class(group)
+            else:
+                yield group[0]
+
+    stats = [0, 0]
+    counts = count_outcomes(t for t in rolled_up(stats) if t.tag == 'testcase')
+    if stats[0]:
+        suite = iter_suite(junit_file_path)
+        attribs = dict(next(suite).attrib)
+        suite.close()
+        attribs.update((name, str(counts[name])) for name in COUNT_ATTRIBUTES)
+        write_suite(junit_file_path, attribs, rolled_up([0, 0]))
+
+    return tuple(stats)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""A lightweight local HTTP server that stands in for an upload endpoint."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import json
+import time
+import zlib
+import threading
+try:
+    from socketserver import ThreadingMixIn
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:  # Python 2
+    from SocketServer import ThreadingMixIn
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class StubUploadServer(object):
+    """A local HTTP server that stands in for an upload endpoint and injects failures and delays.
+
+    Each POST request consumes the next scripted response. A scripted response is a tuple of (status, delay) where
+    'status' is the HTTP status code to reply with and 'delay' is the number of seconds to wait before replying. Once
+    the script is exhausted every request succeeds immediately. Successful responses are JSON objects with the job ID
+    of the upload. (e.g. {"id": 3})
+
+    Request bodies may be chunked and gzip compressed. They are read block by block and only kept in memory when
+    recording, so the server can receive very large uploads. 'bytes_received' counts the bytes on the wire.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, record=True, save_dir=None):
+        """Create and start a StubUploadServer.
+
+        Args:
+            host (str): The address to listen on.
+            port (int): The port to listen on. (Default: a random free port)
+            record (bool): Keep the body and path of every request in 'requests' and 'paths'. (Disable for long running
+                servers)
+            save_dir (str): A directory to write the body of every request to. (Optional)
+        """
+
+        self.script = []
+        self.requests = []
+        self.paths = []
+        self.received = 0
+        self.bytes_received = 0
+        self._job_id = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _iter_body(self):
+                if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                    while True:
+                        size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                        if size == 0:
+                            while self.rfile.readline().strip():
+                                pass  # skip the trailer
+                            return
+                        yield self.rfile.read(size)
+                        self.rfile.readline()
+                else:
+                    remaining = int(self.headers.get('Content-Length', 0))
+                    while remaining > 0:
+                        block = self.rfile.read(min(remaining, 65536))
+                        if not block:
+                            return
+                        remaining -= len(block)
+                        yield block
+
+            def do_POST(self):
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) \
+                    if self.headers.get('Content-Encoding') == 'gzip' else None
+                blocks = []
+                size = 0
+                temp_path = os.path.join(save_dir, '.upload-{}.tmp'.format(id(self))) if save_dir else None
+                save_file = open(temp_path, 'wb') if temp_path else None
+                try:
+                    for block in self._iter_body():
+                        size += len(block)
+                        if record or save_file:
+                            block = decompressor.decompress(block) if decompressor else block
+                            if record:
+                                blocks.append(block)
+                            if save_file:
+                                save_file.write(block)
+                finally:
+                    if save_file:
+                        save_file.close()
+
+                with stub._lock:
+                    status, delay = stub.script.pop(0) if stub.script else (200, 0)
+                    stub.received += 1
+                    stub.bytes_received += size
+                    if record:
+                        stub.requests.append(b''.join(blocks))
+                        stub.paths.append(self.path)
+                time.sleep(delay)
+                with stub._lock:  # job IDs are assigned in the order responses are sent
+                    stub._job_id += 1
+                    job_id = stub._job_id
+                if temp_path:
+                    os.rename(temp_path, os.path.join(save_dir, 'upload-{}.xml'.format(job_id)))
+                payload = json.dumps({'id': job_id}).encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (IOError, OSError):
+                    pass  # the client gave up waiting
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        self._server = Server((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def url(self):
+        """str: The URL of the stub server."""
+
+        host, port = self._server.server_address[:2]
+
+        return 'http://{}:{}/'.format(host, port)
+
+    def wait(self):
+        """Block until the server is stopped or the process is interrupted."""
+
+        while self._thread.is_alive():
+            self._thread.join(1)  # a timeout keeps the main thread responsive to KeyboardInterrupt
+
+    def stop(self):
+        """Shutdown the stub server."""
+
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+"""Trace spans for the session, collection, tests and the upload exported as OTLP JSON."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import time
+import socket
+import binascii
+from pytest_zigzag.events import EventStream
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+SCOPE_NAME = 'pytest-zigzag'
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Span(object):
+    """A unit of work in a trace. Attributes and the status may be changed until the span is ended."""
+
+    def __init__(self, name, trace_id, parent=None, attributes=None, start=None):
+        """Create a Span object.
+
+        Args:
+            name (str): The name of the span.
+            trace_id (str): The hex encoded ID of the trace.
+            parent (Span): The parent span. (Optional)
+            attributes (dict): Attribute values by key. (Optional)
+            start (float): The start time in seconds since the epoch. (Default: now)
+        """
+
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _random_id(8)
+        self.parent_id = parent.span_id if parent is not None else ''
+        self.attributes = dict(attributes or {})
+        self.start = start if start is not None else time.time()
+        self.end = None
+        self.error = None
+
+    def to_otlp(self):
+        """Convert the span to its OTLP JSON form.
+
+        Returns:
+            dict: The span.
+        """
+
+        status = {'code': STATUS_CODE_OK}
+        if self.error is not None:
+            status = {'code': STATUS_CODE_ERROR, 'message': self.error}
+
+        return {'traceId': self.trace_id,
+                'spanId': self.span_id,
+                'parentSpanId': self.parent_id,
+                'name': self.name,
+                'kind': SPAN_KIND_INTERNAL,
+                'startTimeUnixNano': str(int(self.start * 1e9)),
+                'endTimeUnixNano': str(int(self.end * 1e9)),
+                'attributes': _otlp_attributes(self.attributes),
+                'status': status}
+
+
+class Tracer(object):
+    """Create the spans of a single trace and export them in batches to an OTLP JSON file.
+
+    Each line of the file is an OTLP 'ExportTraceServiceRequest' holding a batch of ended spans, which is the format
+    written by the OpenTelemetry collector file exporter. Batches are written by a background 'EventStream' so ending a
+    span never blocks on the disk.
+    """
+
+    def __init__(self, path, batch_size=512, resource=None, buffer_size=10000):
+        """Create a Tracer object and start the background writer.
+
+        Args:
+            path (str): The OTLP JSON file to append to.
+            batch_size (int): The number of ended spans written per line.
+            resource (dict): Additional resource attribute values by key. (Optional)
+            buffer_size (int): The maximum number of batches waiting to be written.
+        """
+
+        self.trace_id = _random_id(16)
+        self.exported = 0
+        self.dropped_spans = 0
+        self._batch_size = batch_size
+        self._pending = []
+        self._queued = []  # the number of spans in each batch accepted by the writer in queue order
+        self._resource = {'service.name': SCOPE_NAME, 'host.name': socket.gethostname(), 'process.pid': os.getpid()}
+        self._resource.update(resource or {})
+        self._stream = EventStream(path, buffer_size)
+
+    @property
+    def error(self):
+        """str: The error that stopped the writer or None."""
+
+        return self._stream.error
+
+    @property
+    def dropped(self):
+        """int: The number of batches that could not be written."""
+
+        return self._stream.dropped
+
+    def start_span(self, name, parent=None, attributes=None, start=None):
+        """Start a span.
+
+        Args:
+            name (str): The name of the span.
+            parent (Span): The parent span. (Optional)
+            attributes (dict): Attribute values by key. (Optional)
+            start (float): The start time in seconds since the epoch. (Default: now)
+
+        Returns:
+            Span: The span.
+        """
+
+        return Span(name, self.trace_id, parent, attributes, start)
+
+    def end_span(self, span, end=None):
+        """End a span and queue it for export.
+
+        Args:
+            span (Span): The span.
+            end (float): The end time in seconds since the epoch. (Default: now)
+        """
+
+        span.end = end if end is not None else time.time()
+        self._pending.append(span.to_otlp())
+        if len(self._pending) >= self._batch_size:
+            self._flush()
+
+    def record_span(self, name, parent, start, end, attributes=None, error=None):
+        """Export a span which already finished.
+
+        Args:
+            name (str): The name of the span.
+            parent (Span): The parent span.
+            start (float): The start time in seconds since the epoch.
+            end (float): The end time in seconds since the epoch.
+            attributes (dict): Attribute values by key. (Optional)
+            error (str): A description of the error if the work failed. (Optional)
+        """
+
+        span = self.start_span(name, parent, attributes, start)
+        span.error = error
+        self.end_span(span, end)
+
+    def _flush(self):
+        """Queue the pending spans as a single export request."""
+
+        if not self._pending:
+            return
+        accepted = self._stream.emit({'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes(self._resource)},
+            'scopeSpans': [{'scope': {'name': SCOPE_NAME}, 'spans': self._pending}],
+        }]})
+        if accepted:
+            self._queued.append(len(self._pending))
+        else:
+            self.dropped_spans += len(self._pending)
+        self._pending = []
+
+    def close(self, timeout=5.0):
+        """Export the pending spans, wait for the writer to finish and count the spans which were actually written.
+
+        The writer handles the batches in queue order so the first 'written' batches are the exported ones and the spans
+        of the batches it did not get to are counted as dropped.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait for the writer.
+        """
+
+        self._flush()
+        self._stream.close(timeout)
+        written = self._stream.written
+        self.exported = sum(self._queued[:written])
+        self.dropped_spans += sum(self._queued[written:])
+        self._queued = []
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _random_id(size):
+    """Generate a random hex encoded ID.
+
+    Args:
+        size (int): The size of the ID in bytes.
+
+    Returns:
+        str: The ID.
+    """
+
+    return binascii.hexlify(os.urandom(size)).decode('ascii')
+
+
+def _otlp_value(value):
+    """Convert an attribute value to its OTLP JSON form.
+
+    Args:
+        value (object): A str, bool, int, float or a list of them.
+
+    Returns:
+        dict: The typed value.
+    """
+
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    if isinstance(value, (list, tuple)):
+        return {'arrayValue': {'values': [_otlp_value(v) for v in value]}}
+
+    return {'stringValue': str(value)}
+
+
+def _otlp_attributes(attributes):
+    """Convert attributes to their OTLP JSON form, leaving out empty values.
+
+    Args:
+        attributes (dict): Attribute values by key.
+
+    Returns:
+        list(dict): The key value pairs.
+    """
+
+    return [{'key': key, 'value': _otlp_value(value)}
+            for key, value in sorted(attributes.items()) if value is not None]
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import time
+import random
+import threading
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class UploadTimeoutError(RuntimeError):
+    """Raised when a single upload attempt does not complete within its allotted time."""
+
+
+class CircuitBreaker(object):
+    """Track consecutive upload failures so that retries stop once an endpoint is clearly down.
+
+    The breaker state is persisted in the pytest cache (when available) so that consecutive sessions on the same runner
+    share it. While the breaker is open only a single probe attempt is made per session (no retries) until the cooldown
+    has elapsed.
+    """
+
+    CACHE_KEY = 'zigzag/upload_circuit_breaker'
+
+    def __init__(self, threshold, cooldown, cache=None):
+        """Create a CircuitBreaker object.
+
+        Args:
+            threshold (int): The number of consecutive failed attempts which opens the breaker. (0 disables)
+            cooldown (float): The number of seconds the breaker stays open before retries are allowed again.
+            cache (_pytest.cacheprovider.Cache): The pytest cache used to persist state. (Optional)
+        """
+
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._cache = cache
+        self._lock = threading.Lock()  # shared by concurrent uploads
+        self._state = {'failures': 0, 'opened_at': None}
+
+        if cache is not None:
+            self._state.update(cache.get(self.CACHE_KEY, {}))
+
+    @property
+    def failures(self):
+        """int: The number of consecutive failed attempts."""
+
+        return self._state['failures']
+
+    @property
+    def is_open(self):
+        """bool: True if the breaker has tripped and the cooldown has not elapsed yet."""
+
+        opened_at = self._state['opened_at']
+
+        return bool(self._threshold) and opened_at is not None and time.time() - opened_at < self._cooldown
+
+    def record_success(self):
+        """Close the breaker after a successful attempt."""
+
+        with self._lock:
+            self._state = {'failures': 0, 'opened_at': None}
+            self._save()
+
+    def record_failure(self):
+        """Count a failed attempt and open the breaker once the threshold is reached."""
+
+        with self._lock:
+            self._state['failures'] += 1
+            if self._threshold and self._state['failures'] >= self._threshold:
+                self._state['opened_at'] = time.time()
+            self._save()
+
+    def _save(self):
+        """Persist the breaker state to the pytest cache."""
+
+        if self._cache is not None:
+            self._cache.set(self.CACHE_KEY, self._state)
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _call_with_timeout(func, timeout):
+    """Call a function in a daemon thread and wait at most 'timeout' seconds for it to return.
+
+    A hung call is abandoned (the daemon thread will not block interpreter exit) so that a stalled endpoint cannot hold
+    the session open. The abandoned call keeps running and may still reach the endpoint.
+
+    Args:
+        func (callable): A function that takes no arguments.
+        timeout (float): Seconds to wait for the call to complete. (None waits forever)
+
+    Returns:
+        object: The return value of 'func'.
+
+    Raises:
+        UploadTimeoutError: The call did not complete in time.
+    """
+
+    if timeout is None:
+        return func()
+
+    result = {}
+
+    def target():
+        try:
+            result['value'] = func()
+        except Exception as e:  # re-raised in the calling thread
+            result['error'] = e
+
+    thread = threading.Thread(target=target, name='zigzag-upload')
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout)
+
+    if thread.is_alive():
+        raise UploadTimeoutError("Upload attempt timed out after {:.2f}s".format(timeout))
+    if 'error' in result:
+        raise result['error']
+
+    return result['value']
+
+
+def _backoff_delay(attempt, backoff, backoff_max, jitter):
+    """Calculate an exponential backoff delay with random jitter.
+
+    Args:
+        attempt (int): The number of the attempt which just failed. (1 based)
+        backoff (float): The base delay in seconds.
+        backoff_max (float): The maximum delay in seconds.
+        jitter (float): The fraction of the delay that is randomized. (0.0 - 1.0)
+
+    Returns:
+        float: The number of seconds to wait before the next attempt.
+    """
+
+    delay = min(backoff_max, backoff * (2 ** (attempt - 1)))
+
+    return random.uniform(delay * (1 - jitter), delay)
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def upload_with_retries(upload,
+                        messages,
+                        retries=0,
+                        backoff=1.0,
+                        backoff_max=30.0,
+                        jitter=0.5,
+                        attempt_timeout=None,
+                        deadline=None,
+                        breaker=None,
+                        idempotent=False,
+                        sleep=time.sleep):
+    """Call an upload function until it succeeds or the retry policy is exhausted.
+
+    An attempt which times out is abandoned while it may still be sending the upload, so it is only retried when the
+    upload is idempotent. Otherwise a retry could queue the same results twice.
+
+    Args:
+        upload (callable): A function that takes no arguments and returns the queue job ID.
+        messages (list(str)): A list of messages to which the latency of each attempt is appended.
+        retries (int): The number of retries after the first attempt.
+        backoff (float): The base backoff delay in seconds between attempts.
+        backoff_max (float): The maximum backoff delay in seconds.
+        jitter (float): The fraction of each backoff delay that is randomized. (0.0 - 1.0)
+        attempt_timeout (float): Seconds allowed for a single attempt. (None for no limit)
+        deadline (float): Seconds allowed for all attempts including backoff. (None for no limit)
+        breaker (CircuitBreaker): A circuit breaker for skipping retries against a failing endpoint. (Optional)
+        idempotent (bool): True if repeating an upload which already reached the endpoint is harmless.
+        sleep (callable): The function used to wait between attempts.
+
+    Returns:
+        object: The value returned by the upload function.
+
+    Raises:
+        RuntimeError: Every attempt failed or the deadline was reached.
+    """
+
+    start = time.time()
+    max_attempts = retries + 1
+
+    if breaker is not None and breaker.is_open:
+        messages.append("ZigZag upload circuit breaker is open after {} consecutive failures, "
+                        "making a single attempt".format(breaker.failures))
+        max_attempts = 1
+
+    attempt = 0
+    while True:
+        attempt += 1
+        timeout = attempt_timeout
+        if deadline is not None:
+            remaining = deadline - (time.time() - start)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        attempt_start = time.time()
+        try:
+            result = _call_with_timeout(upload, timeout)
+        except Exception as e:
+            latency = time.time() - attempt_start
+            messages.append("ZigZag upload attempt {} failed after {:.3f}s".format(attempt, latency))
+            if breaker is not None:
+                breaker.record_failure()
+
+            if attempt >= max_attempts:
+                raise RuntimeError("Giving up after {} attempt(s): {}".format(attempt, str(e)))
+            if isinstance(e, UploadTimeoutError) and not idempotent:
+                raise RuntimeError("Not retrying after attempt {} because the timed out upload may still complete: "
+                                   "{}".format(attempt, str(e)))
+            if breaker is not None and breaker.is_open:
+                raise RuntimeError("Circuit breaker opened after {} consecutive failures: {}".format(breaker.failures,
+                                                                                                     str(e)))
+
+            delay = _backoff_delay(attempt, backoff, backoff_max, jitter)
+            if deadline is not None and time.time() - start + delay >= deadline:
+                raise RuntimeError("Upload deadline of {}s reached after {} attempt(s): {}".format(deadline,
+                                                                                                   attempt,
+                                                                                                   str(e)))
+            sleep(delay)
+        else:
+            latency = time.time() - attempt_start
+            messages.append("ZigZag upload attempt {} succeeded in {:.3f}s".format(attempt, latency))
+            if breaker is not None:
+                breaker.record_success()
+
+            return result
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+"""Build reduced upload documents from a JUnitXML results file according to an upload policy."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import copy
+import math
+from lxml import etree
+from pytest_zigzag.junit_xml import (count_outcomes, iter_suite, make_property, property_tuples, testcase_outcome,
+                                     testcase_properties, write_suite, COUNT_ATTRIBUTES)
+from pytest_zigzag.rollup import iter_step_groups
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+UPLOAD_POLICIES = ('all', 'failures')
+PERCENTILES = (50, 90, 99)
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _read_header(junit_file_path):
+    """Read the attributes of the root element and the global properties of a JUnitXML results file.
+
+    Args:
+        junit_file_path (str): The path to a JUnitXML results file.
+
+    Returns:
+        tuple: (dict: The 'testsuite' attributes, list(tuple): The global properties as (name, value) tuples)
+    """
+
+    suite = iter_suite(junit_file_path)
+    attribs = dict(next(suite).attrib)
+    first = next(suite, None)
+    global_properties = property_tuples(first) if first is not None and first.tag == 'properties' else []
+    suite.close()
+
+    return attribs, global_properties
+
+
+def _make_properties(global_properties, *extra):
+    """Create the global 'properties' element of an upload document.
+
+    Args:
+        global_properties (list(tuple)): The global properties of the full results file as (name, value) tuples.
+        *extra (tuple): Additional (name, value) properties.
+
+    Returns:
+        lxml.etree._Element: A 'properties' element.
+    """
+
+    properties = etree.Element('properties')
+    for name, value in list(global_properties) + list(extra):
+        properties.append(make_property(name, value))
+
+    return properties
+
+
+def _group_key(testcase, group_by):
+    """Get the summary group of a 'testcase' element.
+
+    Args:
+        testcase (lxml.etree._Element): A 'testcase' element.
+        group_by (str): 'module' to group by test file or the name of a testcase property. (e.g. 'jira')
+
+    Returns:
+        str: The group name.
+    """
+
+    if group_by == 'module':
+        return testcase.get('file') or testcase.get('classname', '').rpartition('.')[0] or testcase.get('classname')
+
+    return dict(testcase_properties(testcase)).get(group_by, 'none')
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def percentile(durations, percent):
+    """Get a percentile of a sorted list of durations using the nearest rank method.
+
+    Args:
+        durations (list(float)): Sorted durations.
+        percent (int): The percentile from 1 to 100.
+
+    Returns:
+        float: The duration at the percentile.
+    """
+
+    return durations[max(0, int(math.ceil(percent / 100.0 * len(durations))) - 1)]
+
+
+def summarize_durations(durations):
+    """Summarize the durations of a group of passing tests.
+
+    Args:
+        durations (list(float)): The durations in seconds.
+
+    Returns:
+        str: A compact summary. (e.g. 'count=3 total=0.300 p50=0.100 p90=0.100 p99=0.100 max=0.100')
+    """
+
+    durations = sorted(durations)
+    fields = ['count={}'.format(len(durations)), 'total={:.3f}'.format(sum(durations))]
+    fields.extend('p{}={:.3f}'.format(p, percentile(durations, p)) for p in PERCENTILES)
+    fields.append('max={:.3f}'.format(durations[-1]))
+
+    return ' '.join(fields)
+
+
+def write_failures_only(junit_file_path, upload_file_path, group_by='module'):
+    """Write an upload document with the failed, errored and skipped tests in full and the passing tests summarized as
+    'testsuite' properties.
+
+    Test case with steps classes which did not pass are included with all their steps so they are complete. The full
+    results file is streamed twice, once to count and summarize and once to write, so memory is bounded by the number
+    of passing tests. (One float each)
+
+    Args:
+        junit_file_path (str): The path to the full JUnitXML results file. (Unchanged)
+        upload_file_path (str): The path to write the upload document to.
+        group_by (str): 'module' to summarize the passing tests per test file or the name of a testcase property.
+
+    Returns:
+        tuple: (int: The number of testcases included, int: The number of passing testcases summarized)
+    """
+
+    def included(durations=None):
+        suite = iter_suite(junit_file_path)
+        next(suite)
+        for group in iter_step_groups(suite):
+            if group[0].tag != 'testcase':
+                continue
+            if any(testcase_outcome(t) != 'passed' for t in group):
+                for testcase in group:
+                    yield testcase
+            elif durations is not None:
+                for testcase in group:
+                    durations.setdefault(_group_key(testcase, group_by), []).append(float(testcase.get('time') or 0))
+
+    durations = {}
+    counts = count_outcomes(included(durations))
+    passed = sum(len(d) for d in durations.values())
+
+    attribs, global_properties = _read_header(junit_file_path)
+    attribs.update((name, str(counts[name])) for name in COUNT_ATTRIBUTES)
+
+    def children():
+        yield _make_properties(global_properties,
+                               ('zigzag_upload_policy', 'failures'),
+                               ('passed_tests_summarized', passed),
+                               *[('passed_summary.{}'.format(group), summarize_durations(durations[group]))
+                                 for group in sorted(durations)])
+        for testcase in included():
+            yield testcase
+
+    write_suite(upload_file_path, attribs, children())
+
+    return counts['tests'], passed
+
+
+def split_results(junit_file_path, max_bytes):
+    """Split a JUnitXML results file into valid JUnitXML documents of at most 'max_bytes' each.
+
+    Files are split at testcase boundaries and a test case with steps class is never split. (A single testcase or class
+    larger than the budget gets a document of its own) The global properties are repeated in every document along with
+    a 'zigzag_chunk' property. (e.g. '2/3') The results file is streamed twice, once to measure and once to write, so
+    memory is bounded by the size of a single document.
+
+    Args:
+        junit_file_path (str): The path to a JUnitXML results file. (Unchanged)
+        max_bytes (int): The maximum size of each document in bytes.
+
+    Returns:
+        list(str): The paths of the documents written next to the results file or an empty list if the file already
+            fits the budget.
+    """
+
+    def groups():
+        suite = iter_suite(junit_file_path)
+        next(suite)
+        for group in iter_step_groups(suite):
+            if group[0].tag == 'testcase':
+                yield group
+
+    attribs, global_properties = _read_header(junit_file_path)
+    overhead = len(etree.tostring(_make_properties(global_properties, ('zigzag_chunk', '000/000')))) + \
+        len(etree.tostring(etree.Element('testsuite', {k: str(v) for k, v in attribs.items()}))) + 64
+
+    chunk_sizes = []  # the number of groups in each chunk
+    size = overhead
+    for group in groups():
+        group_size = sum(len(etree.tostring(t, with_tail=False)) for t in group)
+        if not chunk_sizes or (size + group_size > max_bytes and size > overhead):
+            chunk_sizes.append(0)
+            size = overhead
+        chunk_sizes[-1] += 1
+        size += group_size
+    if len(chunk_sizes) < 2:
+        return []
+
+    paths = []
+    stream = groups()
+    for index, count in enumerate(chunk_sizes, 1):
+        testcases = [copy.deepcopy(t) for _ in range(count) for t in next(stream)]
+        chunk_attribs = dict(attribs, time='{:.3f}'.format(sum(float(t.get('time') or 0) for t in testcases)))
+        chunk_attribs.update((name, str(n)) for name, n in count_outcomes(testcases).items())
+        path = '{}.chunk{}.xml'.format(junit_file_path, index)
+        write_suite(path,
+                    chunk_attribs,
+                    [_make_properties(global_properties, ('zigzag_chunk', '{}/{}'.format(index, len(chunk_sizes))))] +
+                    testcases)
+        paths.append(path)
+
+    return paths
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import hashlib
+import threading
+from lxml import etree
+from collections import namedtuple
+from pkg_resources import resource_string
+from pytest_zigzag.junit_xml import iter_suite
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+ValidationResult = namedtuple('ValidationResult', ['testcases', 'invalid'])
+CACHE_KEY_PREFIX = 'zigzag/validation/'
+_XMLSCHEMA = None
+_XSD_DIGEST = None
+_XMLSCHEMA_LOCK = threading.Lock()
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _get_xmlschema():
+    """Compile the JUnitXML schema shipped with ZigZag once per process.
+
+    Returns:
+        tuple: (lxml.etree.XMLSchema: The compiled schema, str: A digest of the XSD contents)
+    """
+
+    global _XMLSCHEMA, _XSD_DIGEST
+
+    with _XMLSCHEMA_LOCK:
+        if _XMLSCHEMA is None:
+            xsd = resource_string('zigzag', 'data/junit.xsd')
+            _XMLSCHEMA = etree.XMLSchema(etree.fromstring(xsd))
+            _XSD_DIGEST = hashlib.sha1(xsd).hexdigest()
+
+    return _XMLSCHEMA, _XSD_DIGEST
+
+
+def _file_digest(file_path):
+    """Calculate a digest of a file without reading it into memory all at once.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        str: The hex digest of the file contents.
+    """
+
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _validate(file_path, xmlschema):
+    """Validate a JUnitXML results file one top level element at a time so memory use stays bounded.
+
+    Args:
+        file_path (str): The path to a JUnitXML results file.
+        xmlschema (lxml.etree.XMLSchema): The compiled JUnitXML schema.
+
+    Returns:
+        ValidationResult: The number of testcases and the names of the invalid testcases.
+    """
+
+    testcases = 0
+    invalid = []
+    suite = iter_suite(file_path)
+
+    try:
+        root = next(suite)
+        for element in suite:
+            if element.tag == 'testcase':
+                testcases += 1
+                if not xmlschema.validate(element):
+                    invalid.append(element.get('name', '<unnamed testcase>'))
+            elif not xmlschema.validate(element):
+                invalid.append('<{}>'.format(element.tag))
+    except etree.XMLSyntaxError as e:
+        return ValidationResult(testcases, invalid + ['<malformed XML: {}>'.format(str(e))])
+
+    if root.tag != 'testsuite' or not xmlschema.validate(etree.Element(root.tag, dict(root.attrib))):
+        invalid.insert(0, '<{}>'.format(root.tag))
+
+    return ValidationResult(testcases, invalid)
+
+
+# ======================================================================================================================
+# Functions: Public
+# ======================================================================================================================
+def validate_results_file(file_path, cache=None):
+    """Validate a JUnitXML results file against the JUnitXML schema used by ZigZag.
+
+    The schema is compiled once per process. Compiled schemas cannot be persisted, so when a cache is supplied the
+    verdict is cached on disk instead, keyed by file path and invalidated when the file contents or the schema change.
+
+    Args:
+        file_path (str): The path to a JUnitXML results file.
+        cache (_pytest.cacheprovider.Cache): The pytest cache used to persist verdicts. (Optional)
+
+    Returns:
+        ValidationResult: The number of testcases and the names of the invalid testcases. (Empty if valid)
+
+    Raises:
+        IOError: The results file could not be read.
+    """
+
+    xmlschema, xsd_digest = _get_xmlschema()
+
+    if cache is None:
+        return _validate(file_path, xmlschema)
+
+    cache_key = CACHE_KEY_PREFIX + hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:16]
+    digests = [xsd_digest, _file_digest(file_path)]
+    cached = cache.get(cache_key, None)
+    if cached is not None and cached[:2] == digests:
+        return ValidationResult(*cached[2:])
+
+    result = _validate(file_path, xmlschema)
+    cache.set(cache_key, digests + list(result))
+
+    return result
@@ -18,6 +18,9 @@ entry_points = {
     'pytest11': [
         'zigzag=pytest_zigzag',
     ],
+    'console_scripts': [
+        'pytest-zigzag=pytest_zigzag.cli:main',
+    ],
 }
 
 setup(
@@ -4,85 +4,17 @@
 # Imports
 # ======================================================================================================================
 import pytest
-from lxml import etree
+from pytest_zigzag.results import ResultsReader
+from pytest_zigzag.stub_server import StubUploadServer
 pytest_plugins = ['pytester']
 
 
 # ======================================================================================================================
 # Classes
 # ======================================================================================================================
-class JunitXml(object):
+class JunitXml(ResultsReader):
     """A helper class for obtaining elements from JUnitXML result files produced by pytest-zigzag."""
 
-    def __init__(self, xml_file_path):
-        """Create a JunitXML class object.
-
-        Args:
-            xml_file_path (str): A file path to a JUnitXML file created using the pytest-zigzag plug-in.
-        """
-
-        self._xml_file_path = xml_file_path
-        self._xml_doc = etree.parse(xml_file_path).getroot()
-
-        self._testsuite_props = None
-        self._testsuite_attribs = None
-
-    @property
-    def testsuite_props(self):
-        """dict: A dictionary of properties on the testsuite root element."""
-
-        if not self._testsuite_props:
-            self._testsuite_props = {p.attrib['name']: p.attrib['value']
-                                     for p in self._xml_doc.findall('./properties/property')}
-
-        return self._testsuite_props
-
-    @property
-    def testsuite_attribs(self):
-        """dict: A dictionary of attributes on the testsuite root element."""
-
-        if not self._testsuite_attribs:
-            self._testsuite_attribs = dict(self._xml_doc.attrib)
-
-        return self._testsuite_attribs
-
-    @property
-    def xml_doc(self):
-        """lxml.etree.Element: Raw etree doc at the testsuite root element."""
-
-        return self._xml_doc
-
-    def get_testcase_property(self, testcase_name, property_name):
-        """Retrieve all the properties for a specified testcase.
-
-        Args:
-            testcase_name (str): The name of the desired testcase from which to retrieve properties.
-            property_name (str): The name of the desired property.
-
-        Returns:
-            list: A list of values for the specified property name.
-        """
-
-        xpath = "./testcase/[@name='{}']/properties/property/[@name='{}']".format(testcase_name, property_name)
-
-        return [p.attrib['value'] for p in self._xml_doc.findall(xpath)]
-
-    def get_testcase_properties(self, testcase_name):
-        """Retrieve all the properties for a specified testcase.
-
-        Note: if there are multiple properties with the same name only one of the values will be returned.
-
-        Args:
-            testcase_name (str): The name of the desired testcase from which to retrieve properties.
-
-        Returns:
-            dict: A dictionary of properties on the specified testcase element.
-        """
-
-        xpath = "./testcase/[@name='{}']/properties/property".format(testcase_name)
-
-        return {p.attrib['name']: p.attrib['value'] for p in self._xml_doc.findall(xpath)}
-
 
 # ======================================================================================================================
 # Helpers
@@ -192,6 +124,15 @@ def merge_dicts(*args):
 # ======================================================================================================================
 # Fixtures
 # ======================================================================================================================
+@pytest.fixture(scope='function')
+def stub_upload_server():
+    """A local HTTP upload endpoint which can be scripted to inject failures and delays."""
+
+    server = StubUploadServer()
+    yield server
+    server.stop()
+
+
 @pytest.fixture(scope='session')
 def testsuite_attribs_exp():
     """A common set of testsuite attributes shared across many test cases."""
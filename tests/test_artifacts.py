@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for the content-addressed artifact store for attachments."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import hashlib
+import pytest
+from tests.conftest import run_and_parse
+from pytest_zigzag.artifacts import ArtifactStore
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def attaching_tests(testdir):
+    """Three tests attaching two distinct logs."""
+
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.parametrize('n', range(2))
+        def test_same_log(zigzag_attach, n):
+            zigzag_attach('service.log', 'service is down\\n' * 1000)
+        def test_other_log(zigzag_attach):
+            zigzag_attach('config.json', b'{"debug": true}')
+    """)
+
+    return testdir
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+@pytest.mark.parametrize('compress', [False, True])
+def test_artifact_store(tmpdir, compress):
+    """Verify that identical content is stored once under its digest and read back unchanged."""
+
+    # Setup
+    store = ArtifactStore(str(tmpdir.join('store')), compress=compress)
+    data = b'x' * 10000
+
+    # Test
+    digest = store.put(data)
+
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert store.put(data) == digest
+    assert store.get(digest) == data
+    assert store.path(digest).endswith(digest + ('.gz' if compress else ''))
+    assert (os.path.getsize(store.path(digest)) < 1000) == compress
+    assert len(tmpdir.join('store').listdir()) == 1
+    with pytest.raises(KeyError):
+        store.get('0' * 64)
+
+
+def test_attachments_are_properties(attaching_tests, simple_test_config):
+    """Verify that attachments are recorded as digest and size properties and stored once."""
+
+    # Setup
+    store_dir = attaching_tests.tmpdir.join('artifacts')
+
+    # Test
+    junit_xml, _ = run_and_parse(attaching_tests, 0, ["--pytest-zigzag-config={}".format(simple_test_config),
+                                                      "--zigzag-artifact-dir={}".format(store_dir)])
+
+    log_digest = hashlib.sha256(b'service is down\n' * 1000).hexdigest()
+    assert junit_xml.get_testcase_property('test_same_log[0]', 'attachment.service.log') == \
+        ['{} 16000'.format(log_digest)]
+    assert junit_xml.get_testcase_property('test_same_log[1]', 'attachment.service.log') == \
+        ['{} 16000'.format(log_digest)]
+    assert junit_xml.get_testcase_property('test_other_log', 'attachment.config.json')[0].endswith(' 15')
+    assert len([p for p in store_dir.visit() if p.isfile()]) == 2
+
+
+def test_blobs_are_sent_once(attaching_tests, simple_test_config, stub_upload_server):
+    """Verify that each unique blob is uploaded once to a destination, even across sessions."""
+
+    # Setup
+    args = ["--junitxml={}".format(attaching_tests.tmpdir.join('junit.xml')),
+            "--pytest-zigzag-config={}".format(simple_test_config),
+            "--zigzag",
+            "--zigzag-backend=http",
+            "--zigzag-upload-url={}".format(stub_upload_server.url),
+            "--zigzag-artifact-dir={}".format(attaching_tests.tmpdir.join('artifacts')),
+            "--zigzag-artifact-compress"]
+
+    # Test
+    first = attaching_tests.runpytest(*args)
+    second = attaching_tests.runpytest(*args)
+
+    assert 'Uploaded 2 attachment blobs (0 already sent)' in first.outlines
+    assert 'Uploaded 0 attachment blobs (2 already sent)' in second.outlines
+    blob_paths = sorted(p for p in stub_upload_server.paths if p.startswith('/blobs/'))
+    assert len(blob_paths) == 2
+    assert all(p.endswith('.gz') for p in blob_paths)
+    assert len(stub_upload_server.paths) == 4  # two results files and two blobs
+
+
+def test_backend_without_attachments(attaching_tests, simple_test_config, mocker):
+    """Verify that the blobs are kept locally when the backend does not support attachments."""
+
+    # Setup
+    mocker.patch('zigzag.zigzag.ZigZag.parse', return_value=None)
+    mocker.patch('zigzag.zigzag.ZigZag.upload_test_results', return_value=5)
+    mocker.patch.dict('os.environ', {'QTEST_API_TOKEN': 'validtoken'})
+
+    # Test
+    result = attaching_tests.runpytest("--junitxml={}".format(attaching_tests.tmpdir.join('junit.xml')),
+                                       "--pytest-zigzag-config={}".format(simple_test_config),
+                                       "--zigzag")
+
+    assert 'Queue Job ID: 5' in result.outlines
+    result.stdout.fnmatch_lines(["The 'zigzag' backend does not support attachments: 2 attachment blobs were kept "
+                                 "in *"])
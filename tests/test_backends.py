@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for the pluggable upload backends and the offline upload benchmark."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import pytest
+from tests.conftest import JunitXml
+from pytest_zigzag.backends import available_backends, create_backend, load_backend, DirectoryBackend, HttpBackend
+from pytest_zigzag.cli import main
+from pytest_zigzag.stub_server import StubUploadServer
+
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+RESULTS_XML = """<?xml version="1.0" encoding="utf-8"?>
+<testsuite errors="0" failures="0" name="pytest" skips="0" tests="1" time="0.010">
+  <properties><property name="BUILD_URL" value="None"/></properties>
+  <testcase classname="test_one" file="test_one.py" line="1" name="test_one" time="0.001">
+    <properties><property name="test_id" value="one"/></properties>
+  </testcase>
+</testsuite>
+"""
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def results_file(tmpdir):
+    """A valid JUnitXML results file."""
+
+    path = tmpdir.join('results.xml')
+    path.write(RESULTS_XML)
+
+    return str(path)
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_load_backend():
+    """Verify that the built-in backends are found by name and that unknown backends are rejected."""
+
+    # Test
+    assert load_backend('directory') is DirectoryBackend
+    assert available_backends()[:3] == ['zigzag', 'directory', 'http']
+    assert create_backend({}.get).name == 'zigzag'
+
+    with pytest.raises(ValueError) as e:
+        load_backend('carrier-pigeon')
+    assert "Unknown upload backend 'carrier-pigeon'! Available backends: zigzag, directory, http" in str(e.value)
+
+
+def test_directory_backend(results_file, tmpdir):
+    """Verify that the directory backend copies every upload into the destination directory."""
+
+    # Setup
+    upload_dir = tmpdir.join('uploads')
+    backend = create_backend({'zigzag-backend': 'directory', 'zigzag-upload-dir': str(upload_dir)}.get)
+    backend.prepare()
+
+    # Test
+    first = backend.upload(results_file)
+    second = backend.upload(results_file)
+
+    assert first != second
+    assert sorted(p.basename for p in upload_dir.listdir()) == sorted(map(os.path.basename, (first, second)))
+    assert upload_dir.join(os.path.basename(first)).read() == RESULTS_XML
+
+
+def test_http_backend(results_file, stub_upload_server, mocker):
+    """Verify that the http backend posts the results file with the bearer token and returns the job ID."""
+
+    # Setup
+    mocker.patch.dict('os.environ', {'ZIGZAG_UPLOAD_TOKEN': 'secret'})
+    backend = HttpBackend({'zigzag-upload-url': stub_upload_server.url}.get)
+    backend.prepare()
+
+    # Test
+    assert backend.upload(results_file) == 1
+    assert stub_upload_server.requests == [RESULTS_XML.encode('utf-8')]
+
+
+def test_http_backend_compress(results_file, stub_upload_server):
+    """Verify that the http backend gzip compresses the request body on the fly when asked to."""
+
+    # Setup
+    backend = HttpBackend({'zigzag-upload-url': stub_upload_server.url, 'zigzag-upload-compress': True}.get)
+    backend.prepare()
+
+    # Test
+    assert backend.upload(results_file) == 1
+    assert stub_upload_server.requests == [RESULTS_XML.encode('utf-8')]  # decompressed by the stub server
+    assert stub_upload_server.bytes_received < len(RESULTS_XML)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_http_backend_streams_from_disk(tmpdir, compress):
+    """Verify that the peak memory use of an http upload does not grow with the size of the results file."""
+
+    # Setup
+    tracemalloc = pytest.importorskip('tracemalloc')
+    path = tmpdir.join('large.xml')
+    testcase = RESULTS_XML.splitlines()[3:6]
+    with path.open('w') as f:
+        f.write('\n'.join(RESULTS_XML.splitlines()[:3]))
+        for n in range(100000):
+            f.write('\n'.join(testcase).replace('test_one', 'test_{}'.format(n)))
+        f.write('</testsuite>\n')
+    size = path.size()
+    server = StubUploadServer(record=False)
+    backend = HttpBackend({'zigzag-upload-url': server.url, 'zigzag-upload-compress': compress}.get)
+    backend.prepare()
+
+    # Test
+    tracemalloc.start()
+    try:
+        backend.upload(str(path))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        server.stop()
+
+    assert size > 16 * 1024 * 1024
+    assert peak < 2 * 1024 * 1024
+    assert server.received == 1
+    if compress:
+        assert server.bytes_received < size / 10
+    else:
+        assert server.bytes_received == size
+
+
+def test_backend_requires_settings():
+    """Verify that the backends refuse to start without their settings."""
+
+    # Test
+    with pytest.raises(ValueError) as e:
+        HttpBackend({}.get).prepare()
+    assert "requires the 'zigzag-upload-url' option" in str(e.value)
+
+
+def test_directory_backend_inside_pytest(testdir, single_decorated_test_function, simple_test_config):
+    """Verify that the plug-in uploads with the backend selected on the command line without a qTest API token."""
+
+    # Setup
+    testdir.makepyfile(single_decorated_test_function.format(mark_type='test_id',
+                                                             mark_arg='123e4567-e89b-12d3-a456-426655440000',
+                                                             test_name='test_uuid'))
+    upload_dir = testdir.tmpdir.join('uploads')
+
+    # Test
+    result = testdir.runpytest("--junitxml={}".format(testdir.tmpdir.join('junit.xml')),
+                               "--pytest-zigzag-config={}".format(simple_test_config),
+                               "--zigzag",
+                               "--zigzag-backend=directory",
+                               "--zigzag-upload-dir={}".format(upload_dir))
+
+    assert 'ZigZag upload was successful!' in result.outlines
+    uploaded = upload_dir.listdir()
+    assert len(uploaded) == 1
+    assert 'Queue Job ID: {}'.format(uploaded[0]) in result.outlines
+    assert JunitXml(str(uploaded[0])).testcases[0].name == 'test_uuid'
+
+
+def test_cli_upload_http(results_file, stub_upload_server, capsys):
+    """Verify that the console script uploads with the http backend."""
+
+    # Test
+    assert main(['upload', results_file, '--zigzag-backend', 'http', '--zigzag-upload-url', stub_upload_server.url,
+                 '--processes', '1']) == 0
+
+    assert 'Queue Job ID: 1' in capsys.readouterr()[0]
+    assert len(stub_upload_server.requests) == 1
+
+
+def test_cli_benchmark(results_file, capsys):
+    """Verify that the benchmark reports serialization and upload throughput and latency."""
+
+    # Test
+    assert main(['benchmark', results_file, '--iterations', '5', '--concurrency', '2']) == 0
+
+    out = capsys.readouterr()[0]
+    assert 'Serialization: 5 iterations, ' in out
+    assert 'Upload: 5 iterations, ' in out
+    assert ' p99=' in out
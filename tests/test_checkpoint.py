@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for crash-safe checkpointing and resuming of aborted sessions."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import json
+import pytest
+from tests.conftest import run_and_parse, JunitXml
+from pytest_zigzag.checkpoint import load_journal
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def crashing_tests(testdir):
+    """Three tests where the second one kills the test runner while a 'crash_flag' file exists and the third one
+    fails.
+    """
+
+    testdir.makepyfile("""
+        import os
+        import pytest
+        @pytest.mark.test_id('id_one')
+        @pytest.mark.jira('ASC-1')
+        def test_one():
+            pass
+        @pytest.mark.test_id('id_two')
+        def test_two():
+            if os.path.exists('crash_flag'):
+                os._exit(1)
+        @pytest.mark.test_id('id_three')
+        def test_three():
+            assert False, 'broken'
+    """)
+    testdir.tmpdir.join('crash_flag').write('')
+    testdir.makeini('[pytest]')  # pin the rootdir so node IDs match in and out of process
+
+    return testdir
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_journal_records(testdir, properly_decorated_test_function, simple_test_config):
+    """Verify that every finished test is appended to the journal along with the properties added by the plug-in."""
+
+    # Setup
+    testdir.makepyfile(properly_decorated_test_function.format(test_name='test_journal', test_id='journal_id',
+                                                               jira_id='ASC-123'))
+    journal_path = testdir.tmpdir.join('journal.jsonl')
+    args = ["--pytest-zigzag-config", simple_test_config, "--zigzag-checkpoint", str(journal_path)]
+
+    # Test
+    run_and_parse(testdir, 0, args)
+    records = [json.loads(line) for line in journal_path.readlines()]
+
+    assert len(records) == 1
+    assert records[0]['outcome'] == 'passed'
+    assert records[0]['name'] == 'test_journal'
+    assert dict(records[0]['properties'])['test_id'] == 'journal_id'
+    assert dict(records[0]['properties'])['jira'] == 'ASC-123'
+    assert 'start_time' in dict(records[0]['properties'])
+
+
+def test_resume_after_crash(crashing_tests, simple_test_config):
+    """Verify that a session killed part way through can be resumed and the results merged into one JUnitXML."""
+
+    # Setup
+    testdir = crashing_tests
+    journal_path = testdir.tmpdir.join('journal.jsonl')
+    result_path = testdir.tmpdir.join('junit.xml')
+    args = ["--junitxml={}".format(result_path), "--pytest-zigzag-config={}".format(simple_test_config),
+            "--zigzag-checkpoint={}".format(journal_path)]
+
+    # Test
+    testdir.runpytest_subprocess(*args)
+    assert not result_path.exists()
+    assert list(load_journal(str(journal_path))) == ['test_resume_after_crash.py::test_one']
+
+    testdir.tmpdir.join('crash_flag').remove()
+    result = testdir.runpytest(*(args + ['--zigzag-resume']))
+    result.assert_outcomes(passed=1, failed=1)
+    assert 'Merged 1 results from the checkpoint journal' in result.outlines
+
+    junit_xml = JunitXml(str(result_path))
+    assert junit_xml.testsuite_props['resumed_tests'] == '1'
+    assert junit_xml.testsuite_attribs['tests'] == '3'
+    assert junit_xml.testsuite_attribs['failures'] == '1'
+    assert junit_xml.get_testcase_properties('test_one')['test_id'] == 'id_one'
+    assert junit_xml.get_testcase_properties('test_one')['jira'] == 'ASC-1'
+    assert junit_xml.get_testcase_properties('test_two')['test_id'] == 'id_two'
+    assert len(load_journal(str(journal_path))) == 3
+
+
+def test_resume_merges_failures(crashing_tests, simple_test_config):
+    """Verify that failed results from the journal keep their failure when merged."""
+
+    # Setup
+    testdir = crashing_tests
+    testdir.tmpdir.join('crash_flag').remove()
+    result_path = testdir.tmpdir.join('junit.xml')
+    args = ["--junitxml={}".format(result_path), "--pytest-zigzag-config={}".format(simple_test_config),
+            "--zigzag-checkpoint={}".format(testdir.tmpdir.join('journal.jsonl'))]
+
+    # Test
+    testdir.runpytest(*args)
+    result = testdir.runpytest(*(args + ['--zigzag-resume']))
+    result.assert_outcomes()
+
+    junit_xml = JunitXml(str(result_path))
+    assert junit_xml.testsuite_attribs['tests'] == '3'
+    assert junit_xml.testsuite_attribs['failures'] == '1'
+    failure = junit_xml.xml_doc.find("./testcase[@name='test_three']/failure")
+    assert 'broken' in failure.get('message')
+
+
+def test_truncated_journal(tmpdir):
+    """Verify that a partially written last record is ignored when loading a journal."""
+
+    # Setup
+    journal_path = tmpdir.join('journal.jsonl')
+    journal_path.write('{"nodeid": "test_a.py::test_one", "outcome": "passed"}\n{"nodeid": "test_a.py::te')
+
+    # Test
+    assert list(load_journal(str(journal_path))) == ['test_a.py::test_one']
+
+
+def test_resume_keeps_step_classes_together(testdir, simple_test_config):
+    """Verify that the resumed steps of a test case with steps class are merged next to the steps which ran after the
+    resume so that the class is rolled up into a single testcase."""
+
+    # Setup
+    testdir.makepyfile("""
+        import os
+        import pytest
+        @pytest.mark.test_id('steps_id')
+        @pytest.mark.test_case_with_steps
+        class TestSteps(object):
+            def test_step_one(self):
+                pass
+            def test_step_two(self):
+                if os.path.exists('crash_flag'):
+                    os._exit(1)
+            def test_step_three(self):
+                pass
+        @pytest.mark.test_id('after_id')
+        def test_after():
+            pass
+    """)
+    testdir.tmpdir.join('crash_flag').write('')
+    testdir.makeini('[pytest]')
+    result_path = testdir.tmpdir.join('junit.xml')
+    args = ["--junitxml={}".format(result_path), "--pytest-zigzag-config={}".format(simple_test_config),
+            "--zigzag-checkpoint={}".format(testdir.tmpdir.join('journal.jsonl'))]
+
+    # Test
+    testdir.runpytest_subprocess(*args)
+    testdir.tmpdir.join('crash_flag').remove()
+    testdir.runpytest(*(args + ['--zigzag-resume', '--zigzag-rollup-steps']))
+
+    junit_xml = JunitXml(str(result_path))
+    assert [t.name for t in junit_xml.testcases] == ['TestSteps', 'test_after']
+    assert junit_xml.get_testcase_properties('TestSteps')['step_names'] == \
+        'test_step_one,test_step_two,test_step_three'
+    assert junit_xml.testsuite_attribs['tests'] == '2'
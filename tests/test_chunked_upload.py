@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for splitting uploads into chunks which fit a payload size budget."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import time
+import itertools
+import threading
+import pytest
+import pytest_zigzag.backends
+from tests.conftest import JunitXml
+from pytest_zigzag.upload_policy import split_results
+from pytest_zigzag.validation import validate_results_file
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def many_tests(testdir):
+    """Twenty regular tests with a test case with steps class in the middle."""
+
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.parametrize('n', range(10))
+        @pytest.mark.test_id('before_id')
+        @pytest.mark.jira('ASC-1')
+        def test_before(n):
+            pass
+        @pytest.mark.test_id('steps_id')
+        @pytest.mark.jira('ASC-2')
+        @pytest.mark.test_case_with_steps
+        class TestSteps(object):
+            def test_step_one(self):
+                pass
+            def test_step_two(self):
+                pass
+            def test_step_three(self):
+                pass
+        @pytest.mark.parametrize('n', range(10))
+        @pytest.mark.test_id('after_id')
+        @pytest.mark.jira('ASC-3')
+        def test_after(n):
+            pass
+    """)
+
+    return testdir
+
+
+@pytest.fixture(scope='function')
+def captured_chunks(testdir, mocker):
+    """Mock ZigZag and keep a copy of every results file handed to it for upload."""
+
+    uploaded = []
+    job_ids = itertools.count(1)
+    lock = threading.Lock()
+
+    def zigzag(junit_file_path, pytest_zigzag_config, token):
+        with lock:
+            job_id = next(job_ids)
+            uploaded.append(str(testdir.tmpdir.join('uploaded{}.xml'.format(job_id))))
+            with open(junit_file_path, 'rb') as source, open(uploaded[-1], 'wb') as copy:
+                copy.write(source.read())
+        return mocker.Mock(upload_test_results=mocker.Mock(return_value=job_id))
+
+    mocker.patch('pytest_zigzag.backends.ZigZag', side_effect=zigzag)
+    mocker.patch.dict('os.environ', {'QTEST_API_TOKEN': 'validtoken'})
+
+    return uploaded
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_split_results(many_tests, simple_test_config):
+    """Verify that the chunks are valid, fit the budget, repeat the global properties and keep step classes whole."""
+
+    # Setup
+    result_path = many_tests.tmpdir.join('junit.xml')
+    many_tests.runpytest("--junitxml={}".format(result_path), "--pytest-zigzag-config={}".format(simple_test_config))
+    max_bytes = 4000
+
+    # Test
+    chunks = split_results(str(result_path), max_bytes)
+
+    assert len(chunks) > 2
+    names = []
+    for index, chunk in enumerate(chunks, 1):
+        assert os.path.getsize(chunk) <= max_bytes
+        assert validate_results_file(chunk).invalid == []
+        junit_xml = JunitXml(chunk)
+        assert junit_xml.testsuite_props['zigzag_chunk'] == '{}/{}'.format(index, len(chunks))
+        assert 'BUILD_URL' in junit_xml.testsuite_props
+        assert junit_xml.testsuite_attribs['tests'] == str(len(junit_xml.testcases))
+        steps = [t.name for t in junit_xml.testcases if t.name.startswith('test_step')]
+        assert steps in ([], ['test_step_one', 'test_step_two', 'test_step_three'])
+        names.extend(t.name for t in junit_xml.testcases)
+
+    assert names == [t.name for t in JunitXml(str(result_path)).testcases]
+
+
+def test_split_not_needed(many_tests, simple_test_config):
+    """Verify that a results file which fits the budget is not split."""
+
+    # Setup
+    result_path = many_tests.tmpdir.join('junit.xml')
+    many_tests.runpytest("--junitxml={}".format(result_path), "--pytest-zigzag-config={}".format(simple_test_config))
+
+    # Test
+    assert split_results(str(result_path), 10 ** 6) == []
+
+
+def test_chunked_upload(many_tests, captured_chunks, simple_test_config):
+    """Verify that the chunks are uploaded, every job ID is reported and the chunks are removed afterwards."""
+
+    # Setup
+    result_path = many_tests.tmpdir.join('junit.xml')
+
+    # Test
+    result = many_tests.runpytest("--junitxml={}".format(result_path),
+                                  "--pytest-zigzag-config={}".format(simple_test_config),
+                                  "--zigzag",
+                                  "--zigzag-max-payload-bytes=4000",
+                                  "--zigzag-upload-connections=2")
+
+    count = len(captured_chunks)
+    assert count > 2
+    assert 'Split the upload into {} chunks of at most 4000 bytes'.format(count) in result.outlines
+    assert 'ZigZag upload was successful!' in result.outlines
+    job_ids = next(line for line in result.outlines if line.startswith('Queue Job IDs: '))[len('Queue Job IDs: '):]
+    assert sorted(int(job_id) for job_id in job_ids.split(', ')) == list(range(1, count + 1))
+    assert not [p for p in many_tests.tmpdir.listdir() if '.chunk' in p.basename]
+    assert sum(len(JunitXml(p).testcases) for p in captured_chunks) == 23
+
+
+def test_chunk_upload_failure(many_tests, captured_chunks, simple_test_config, mocker):
+    """Verify that a failed chunk fails the upload while the job IDs of the other chunks are still reported."""
+
+    # Setup
+    original = pytest_zigzag.backends.ZigZag.side_effect
+
+    def zigzag(junit_file_path, pytest_zigzag_config, token):
+        if junit_file_path.endswith('.chunk2.xml'):
+            raise RuntimeError('Payload rejected')
+        return original(junit_file_path, pytest_zigzag_config, token)
+
+    mocker.patch('pytest_zigzag.backends.ZigZag', side_effect=zigzag)
+
+    # Test
+    result = many_tests.runpytest("--junitxml={}".format(many_tests.tmpdir.join('junit.xml')),
+                                  "--pytest-zigzag-config={}".format(simple_test_config),
+                                  "--zigzag",
+                                  "--zigzag-max-payload-bytes=4000")
+
+    assert 'The ZigZag upload was not successful' in result.outlines
+    result.stdout.fnmatch_lines(['Queue Job IDs of the uploaded chunks: *', '*1 of * chunk uploads failed: *'])
+
+
+def test_chunked_upload_deadline(many_tests, captured_chunks, simple_test_config, mocker):
+    """Verify that the upload deadline limits the upload of all chunks together rather than each chunk."""
+
+    # Setup
+    original = pytest_zigzag.backends.ZigZag.side_effect
+
+    def zigzag(junit_file_path, pytest_zigzag_config, token):
+        zz = original(junit_file_path, pytest_zigzag_config, token)
+        job_id = zz.upload_test_results.return_value
+        zz.upload_test_results.side_effect = lambda: time.sleep(0.5) or job_id
+        return zz
+
+    mocker.patch('pytest_zigzag.backends.ZigZag', side_effect=zigzag)
+
+    # Test
+    result = many_tests.runpytest("--junitxml={}".format(many_tests.tmpdir.join('junit.xml')),
+                                  "--pytest-zigzag-config={}".format(simple_test_config),
+                                  "--zigzag",
+                                  "--zigzag-max-payload-bytes=4000",
+                                  "--zigzag-upload-connections=1",
+                                  "--zigzag-upload-deadline=1.2")
+
+    assert len(captured_chunks) > 2  # more than the deadline allows one at a time
+    assert 'The ZigZag upload was not successful' in result.outlines
+    result.stdout.fnmatch_lines(['Queue Job IDs of the uploaded chunks: 1, 2', '*chunk uploads failed: *'])
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for the 'pytest-zigzag diff' console script."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import json
+import pytest
+from pytest_zigzag.cli import main
+from pytest_zigzag.diff import diff_results, index_results
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+SUITE_XML = """<?xml version="1.0" encoding="utf-8"?>
+<testsuite errors="0" failures="0" name="pytest" skips="0" tests="0" time="0">
+{}
+</testsuite>
+"""
+TESTCASE_XML = """  <testcase classname="test_a" name="{name}" time="{time}">
+    <properties><property name="test_id" value="{test_id}"/></properties>{outcome}
+  </testcase>"""
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _write_results(path, testcases):
+    """Write a JUnitXML results file.
+
+    Args:
+        path (py.path.local): The destination path.
+        testcases (list(tuple)): A list of (name, test_id, time, outcome) tuples where outcome is 'passed' or the tag
+            of an outcome element.
+    """
+
+    path.write(SUITE_XML.format('\n'.join(
+        TESTCASE_XML.format(name=name, test_id=test_id, time=time,
+                            outcome='' if outcome == 'passed' else '<{} message="x"/>'.format(outcome))
+        for name, test_id, time, outcome in testcases)))
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def two_runs(tmpdir):
+    """Two JUnitXML results files from consecutive runs."""
+
+    base = tmpdir.join('base.xml')
+    head = tmpdir.join('head.xml')
+    _write_results(base, [('test_stable', 'stable_id', 1.0, 'passed'),
+                          ('test_breaks', 'breaks_id', 1.0, 'passed'),
+                          ('test_fixed', 'fixed_id', 1.0, 'failure'),
+                          ('test_removed', 'removed_id', 1.0, 'passed'),
+                          ('test_slow', 'slow_id', 2.0, 'passed'),
+                          ('test_step_one', 'steps_id', 1.0, 'passed'),
+                          ('test_step_two', 'steps_id', 1.0, 'passed')])
+    _write_results(head, [('test_stable', 'stable_id', 1.2, 'passed'),
+                          ('test_breaks', 'breaks_id', 1.0, 'failure'),
+                          ('test_fixed', 'fixed_id', 1.0, 'passed'),
+                          ('test_added', 'added_id', 1.0, 'passed'),
+                          ('test_slow', 'slow_id', 10.0, 'passed'),
+                          ('test_step_one', 'steps_id', 1.0, 'passed'),
+                          ('test_step_two', 'steps_id', 1.0, 'error')])
+
+    return str(base), str(head)
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_diff_results(two_runs):
+    """Verify that results are joined by 'test_id' and the differences classified."""
+
+    # Test
+    diff = diff_results(index_results(two_runs[0]), index_results(two_runs[1]))
+
+    assert diff.new_failures == ['breaks_id', 'steps_id']
+    assert diff.fixed == ['fixed_id']
+    assert diff.missing == ['removed_id']
+    assert diff.new == ['added_id']
+    assert diff.slower == [('slow_id', 2.0, 10.0)]
+    assert diff.faster == []
+
+
+def test_index_steps_aggregated(two_runs):
+    """Verify that the steps of a test case with steps are aggregated into one result."""
+
+    # Test
+    result = index_results(two_runs[1])['steps_id']
+
+    assert result.outcome == 'error'
+    assert result.time == pytest.approx(2.0)
+
+
+def test_diff_journal(two_runs, tmpdir, capsys):
+    """Verify that a checkpoint journal can be compared with a JUnitXML results file from the command line."""
+
+    # Setup
+    journal = tmpdir.join('journal.jsonl')
+    journal.write(''.join(json.dumps({'nodeid': 'test_a.py::{}'.format(name), 'classname': 'test_a', 'name': name,
+                                      'time': 1.0, 'outcome': outcome, 'properties': [['test_id', test_id]]}) + '\n'
+                          for name, test_id, outcome in (('test_stable', 'stable_id', 'passed'),
+                                                         ('test_breaks', 'breaks_id', 'passed'),
+                                                         ('test_fixed', 'fixed_id', 'failed'),
+                                                         ('test_removed', 'removed_id', 'passed'),
+                                                         ('test_slow', 'slow_id', 'passed'),
+                                                         ('test_steps', 'steps_id', 'passed'))))
+
+    # Test
+    assert main(['diff', str(journal), two_runs[1]]) == 1
+
+    out = capsys.readouterr()[0]
+    assert 'New failures (2):\n  breaks_id\n  steps_id\n' in out
+    assert 'Slower (2):\n  slow_id: 1.000s -> 10.000s\n  steps_id: 1.000s -> 2.000s\n' in out
+    assert 'Compared 6 tests with 6 tests: 2 new failures, 1 fixed, 1 missing, 1 new, 2 slower, 0 faster.' in out
+
+
+def test_diff_no_new_failures(two_runs, capsys):
+    """Verify that the exit code is zero when nothing started failing."""
+
+    # Test
+    assert main(['diff', two_runs[1], two_runs[1]]) == 0
+    assert '0 new failures' in capsys.readouterr()[0]
+
+
+def test_diff_missing_journal(two_runs, tmpdir, capsys):
+    """Verify that a missing checkpoint journal is reported instead of being compared as an empty run."""
+
+    # Test
+    assert main(['diff', str(tmpdir.join('missing.jsonl')), two_runs[1]]) == 2
+    assert "Failed to read results: No such checkpoint journal: '" in capsys.readouterr()[0]
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for the bulk 'pytest-zigzag upload' console script."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import pytest
+from pytest_zigzag.cli import main
+
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+RESULTS_XML = """<?xml version="1.0" encoding="utf-8"?>
+<testsuite errors="0" failures="0" name="pytest" skips="0" tests="1" time="0.010">
+  <properties><property name="BUILD_URL" value="None"/></properties>
+  <testcase classname="test_{name}" file="test_{name}.py" line="1" name="test_{name}" time="0.001">
+    <properties><property name="test_id" value="{name}"/></properties>
+  </testcase>
+</testsuite>
+"""
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def results_dir(tmpdir):
+    """A directory containing three valid JUnitXML results files."""
+
+    results = tmpdir.mkdir('results')
+    for name in ('one', 'two', 'three'):
+        results.join('{}.xml'.format(name)).write(RESULTS_XML.format(name=name))
+
+    return results
+
+
+@pytest.fixture(scope='function')
+def mock_zigzag(mocker):
+    """Mock out the ZigZag parse and upload calls and provide a valid qTest API token."""
+
+    mocker.patch('zigzag.zigzag.ZigZag.parse', return_value=None)
+    mocker.patch.dict('os.environ', {'QTEST_API_TOKEN': 'validtoken'})
+
+    return mocker.patch('zigzag.zigzag.ZigZag.upload_test_results', side_effect=[101, 102, 103])
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_upload_directory(results_dir, mock_zigzag, simple_test_config, capsys):
+    """Verify that every results file in a directory is uploaded and summarized."""
+
+    # Test
+    assert main(['upload', str(results_dir), '--pytest-zigzag-config', simple_test_config,
+                 '--processes', '2', '--max-connections', '2']) == 0
+
+    out = capsys.readouterr()[0]
+    assert mock_zigzag.call_count == 3
+    assert 'Uploaded 3 of 3 results files.' in out
+    for job_id in (101, 102, 103):
+        assert 'Queue Job ID: {}'.format(job_id) in out
+
+
+def test_upload_glob_with_invalid_file(results_dir, mock_zigzag, simple_test_config, capsys):
+    """Verify that invalid results files are reported and skipped while the valid files are uploaded."""
+
+    # Setup
+    results_dir.join('bad.xml').write('<testsuite><testcase/></testsuite>')
+
+    # Test
+    assert main(['upload', str(results_dir.join('*.xml')), '--pytest-zigzag-config', simple_test_config]) == 1
+
+    out = capsys.readouterr()[0]
+    assert mock_zigzag.call_count == 3
+    assert "Skipping invalid results file '{}'".format(results_dir.join('bad.xml')) in out
+    assert 'Uploaded 3 of 4 results files.' in out
+
+
+def test_upload_config_from_ini(results_dir, mock_zigzag, simple_test_config, tmpdir, capsys):
+    """Verify that the pytest-zigzag config path is resolved from a pytest ini file like the plug-in does."""
+
+    # Setup
+    inifile = tmpdir.join('pytest.ini')
+    inifile.write('[pytest]\npytest-zigzag-config = {}\n'.format(simple_test_config))
+
+    # Test
+    assert main(['upload', str(results_dir), '-c', str(inifile)]) == 0
+    assert 'Uploaded 3 of 3 results files.' in capsys.readouterr()[0]
+
+
+def test_upload_config_from_setup_cfg(results_dir, mock_zigzag, simple_test_config, tmpdir, capsys):
+    """Verify that the '[tool:pytest]' section of an explicit setup.cfg is read like pytest does."""
+
+    # Setup
+    inifile = tmpdir.join('setup.cfg')
+    inifile.write('[tool:pytest]\npytest-zigzag-config = {}\n'.format(simple_test_config))
+
+    # Test
+    assert main(['upload', str(results_dir), '-c', str(inifile)]) == 0
+    assert 'Uploaded 3 of 3 results files.' in capsys.readouterr()[0]
+
+
+def test_upload_without_config(results_dir, mock_zigzag, tmpdir, capsys):
+    """Verify that a missing pytest-zigzag config is reported."""
+
+    # Setup
+    inifile = tmpdir.join('pytest.ini')
+    inifile.write('[pytest]\n')
+
+    # Test
+    assert main(['upload', str(results_dir), '-c', str(inifile)]) == 1
+    assert 'A pytest-zigzag config file must be specified' in capsys.readouterr()[0]
+    assert mock_zigzag.call_count == 0
+
+
+def test_upload_failure_reported(results_dir, mock_zigzag, simple_test_config, capsys):
+    """Verify that failed uploads are reported in the summary with a non-zero exit code."""
+
+    # Setup
+    mock_zigzag.side_effect = RuntimeError('The qTest API reported an error!')
+
+    # Test
+    assert main(['upload', str(results_dir), '--pytest-zigzag-config', simple_test_config]) == 1
+
+    out = capsys.readouterr()[0]
+    assert 'FAILED (Giving up after 1 attempt(s): The qTest API reported an error!)' in out
+    assert 'Uploaded 0 of 3 results files.' in out
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for capping captured output and deduplicating tracebacks."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+from lxml import etree
+from tests.conftest import run_and_parse
+from pytest_zigzag.compaction import truncate_text
+from pytest_zigzag.validation import validate_results_file
+
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+MASS_FAILURE = """
+    import pytest
+    def shared_service():
+        raise RuntimeError('keystone is down')
+    @pytest.mark.parametrize('n', range(3))
+    def test_service(n):
+        shared_service()
+    def test_other():
+        assert 1 == 2
+    def test_noisy():
+        print('x' * 100000)
+"""
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_cap_captured_output(testdir, simple_test_config):
+    """Verify that captured output is truncated to the cap while keeping its beginning and its end."""
+
+    # Setup
+    testdir.makepyfile(MASS_FAILURE)
+
+    # Test
+    junit_xml, _ = run_and_parse(testdir, 1, ["--pytest-zigzag-config={}".format(simple_test_config),
+                                              "--zigzag-max-output-bytes=1000"])
+
+    noisy = next(e for e in junit_xml.xml_doc.iter('testcase') if e.get('name') == 'test_noisy')
+    system_out = noisy.find('system-out').text
+    assert len(system_out) < 1100
+    assert '[... 99001 bytes truncated by pytest-zigzag ...]' in system_out
+
+
+def test_dedupe_tracebacks(testdir, simple_test_config):
+    """Verify that identical tracebacks are stored once at suite level and referenced by hash."""
+
+    # Setup
+    testdir.makepyfile(MASS_FAILURE)
+
+    # Test
+    junit_xml, result = run_and_parse(testdir, 1, ["--pytest-zigzag-config={}".format(simple_test_config),
+                                                   "--zigzag-dedupe-tracebacks"])
+
+    assert 'Stored 1 tracebacks shared by 3 testcases once' in result.outlines
+    shared = [(k, v) for k, v in junit_xml.testsuite_props.items() if k.startswith('traceback.')]
+    assert len(shared) == 1
+    digest = shared[0][0][len('traceback.'):]
+    assert shared[0][1].strip().startswith('def shared_service():')
+    assert "RuntimeError('keystone is down')" in shared[0][1]
+
+    failures = {t.get('name'): t.find('failure') for t in junit_xml.xml_doc.iter('testcase')}
+    for n in range(3):
+        name = 'test_service[{}]'.format(n)
+        assert junit_xml.get_testcase_property(name, 'traceback_hash') == [digest]
+        assert failures[name].text.startswith('n = {}'.format(n))  # the first entry is kept
+        assert failures[name].text.endswith("[Identical to the 'traceback.{}' testsuite property]".format(digest))
+        assert failures[name].get('message') == 'RuntimeError: keystone is down'
+    assert junit_xml.get_testcase_property('test_other', 'traceback_hash') == []
+    assert 'assert 1 == 2' in failures['test_other'].text
+    assert validate_results_file(str(testdir.tmpdir.join('junit.xml'))).invalid == []
+
+
+def test_truncate_text():
+    """Verify that truncation never splits a multi-byte character."""
+
+    # Test
+    truncated = truncate_text(u'é' * 100, 51)
+
+    assert truncated.startswith(u'é' * 12 + u'\n[... 152 bytes truncated by pytest-zigzag ...]\n')
+    assert etree.fromstring(u'<a>{}</a>'.format(truncated).encode('utf-8')) is not None
+
+
+def test_dedupe_keeps_unicode_properties(testdir, simple_test_config):
+    """Verify that non-ASCII property values survive rewriting the results file."""
+
+    # Setup
+    testdir.makepyfile("""
+        def test_owner(record_property):
+            record_property('owner', u'Jos\\u00e9')
+            assert False
+    """)
+
+    # Test
+    junit_xml, _ = run_and_parse(testdir, 1, ["--pytest-zigzag-config={}".format(simple_test_config),
+                                              "--zigzag-dedupe-tracebacks"])
+
+    assert junit_xml.get_testcase_property('test_owner', 'owner') == [u'José']
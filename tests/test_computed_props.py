@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for global properties computed from commands and files."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import sys
+import json
+import time
+import pytest
+from tests.conftest import run_and_parse
+from pytest_zigzag.computed_props import compute_properties
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def computed_config(testdir, single_decorated_test_function):
+    """A test and a config file with computed properties."""
+
+    testdir.makepyfile(single_decorated_test_function.format(mark_type='test_id', mark_arg='1', test_name='test_one'))
+    testdir.tmpdir.join('os-release').write('NAME="Ubuntu"\nVERSION_ID="16.04"\n')
+    counter = testdir.tmpdir.join('counter')
+    config = {
+        'pytest_zigzag_env_vars': {'BUILD_URL': None},
+        'pytest_zigzag_computed_props': {
+            'OS_VERSION': {'file': str(testdir.tmpdir.join('os-release')), 'pattern': '^VERSION_ID="?([^"]*)"?$'},
+            'RUN_COUNT': {'command': 'echo x >> "{0}" && wc -l < "{0}"'.format(counter), 'ttl': 3600},
+            'PYTHON': {'command': [sys.executable, '-c', 'import sys; print(sys.version_info[0])']},
+            'SLOW': {'command': [sys.executable, '-c', 'import time; time.sleep(30)'], 'timeout': 0.5,
+                     'default': 'unknown'},
+        },
+    }
+    config_path = testdir.tmpdir.join('config.json')
+    config_path.write(json.dumps(config))
+
+    return str(config_path)
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_computed_props(testdir, computed_config):
+    """Verify that computed properties are recorded, that a timed out command falls back to its default and that
+    cached values are reused by the next session."""
+
+    # Test
+    for _ in range(2):
+        junit_xml, result = run_and_parse(testdir, 0, ['--pytest-zigzag-config', computed_config])
+
+        assert junit_xml.testsuite_props['OS_VERSION'] == '16.04'
+        assert junit_xml.testsuite_props['RUN_COUNT'] == '1'  # the command only ran once
+        assert junit_xml.testsuite_props['PYTHON'] == str(sys.version_info[0])
+        assert junit_xml.testsuite_props['SLOW'] == 'unknown'
+        result.stdout.fnmatch_lines(["Failed to compute the 'SLOW' property: timed out after 0.5s"])
+
+
+def test_compute_properties_errors(tmpdir):
+    """Verify that failing sources are reported and left out without a default."""
+
+    # Test
+    values, errors = compute_properties({'MISSING': {'file': str(tmpdir.join('missing'))},
+                                         'FAILS': {'command': 'exit 3'},
+                                         'NO_MATCH': {'command': 'echo abc', 'pattern': 'x(y)'},
+                                         'BAD_PATTERN': {'command': 'echo abc', 'pattern': 'a(', 'default': 'none'}})
+
+    assert values == {'BAD_PATTERN': 'none'}
+    errors = dict(errors)
+    assert errors['BAD_PATTERN'].startswith("invalid pattern 'a(': ")
+    assert errors['FAILS'] == 'exited with 3'
+    assert errors['NO_MATCH'] == "no match for the pattern 'x(y)'"
+    assert 'No such file or directory' in errors['MISSING']
+
+
+@pytest.mark.parametrize('command', ['echo hi; sleep 8; echo done', 'sleep 8 & wait', 'sleep 8 | cat'])
+def test_timeout_kills_child_processes(command):
+    """Verify that a timed out shell command does not block until the processes it started exit."""
+
+    # Setup
+    start = time.time()
+
+    # Test
+    values, errors = compute_properties({'SLOW': {'command': command, 'timeout': 0.5, 'default': 'unknown'}})
+
+    assert time.time() - start < 2
+    assert values == {'SLOW': 'unknown'}
+    assert errors == [('SLOW', 'timed out after 0.5s')]
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for the 'depends_on' mark which skips the tests that depend on a failed test."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+from tests.conftest import run_and_parse
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_dependents_of_failed_class_are_skipped(testdir):
+    """Verify that tests depending on a failed class, directly or through another test, are skipped without setting
+    up their fixtures."""
+
+    # Setup
+    testdir.makepyfile("""
+        import pytest
+        SETUP = []
+        @pytest.fixture
+        def server():
+            SETUP.append('server')
+        @pytest.mark.test_id('network_id')
+        @pytest.mark.test_case_with_steps
+        class TestCreateNetwork(object):
+            def test_create(self):
+                pass
+            def test_verify(self):
+                assert False
+        @pytest.mark.depends_on('TestCreateNetwork')
+        class TestBootServer(object):
+            def test_boot(self, server):
+                pass
+        @pytest.mark.depends_on('test_boot')
+        def test_ssh(server):
+            pass
+        @pytest.mark.depends_on('network_id', 'test_unrelated')
+        def test_by_test_id():
+            pass
+        def test_unrelated():
+            pass
+        @pytest.mark.depends_on('test_unrelated')
+        def test_independent():
+            pass
+        def test_no_fixture_was_set_up():
+            assert SETUP == []
+    """)
+
+    # Test
+    junit_xml = run_and_parse(testdir, 1)[0]
+
+    for name in ('test_boot', 'test_ssh', 'test_by_test_id'):
+        assert junit_xml.get_testcase_property(name, 'skip_reason') == ['dependency_failed']
+        assert junit_xml.get_testcases(name)[0].outcome == 'skipped'
+    assert junit_xml.get_testcases('test_independent')[0].outcome == 'passed'
+    assert junit_xml.get_testcases('test_no_fixture_was_set_up')[0].outcome == 'passed'
+
+
+def test_dependency_cycle(testdir):
+    """Verify that a cycle of dependencies is reported at collection."""
+
+    # Setup
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.depends_on('test_two')
+        def test_one():
+            pass
+        @pytest.mark.depends_on('TestThree')
+        def test_two():
+            pass
+        @pytest.mark.depends_on('test_one')
+        class TestThree(object):
+            def test_three(self):
+                pass
+    """)
+
+    # Test
+    result = testdir.runpytest()
+
+    assert result.ret == 1
+    result.stdout.fnmatch_lines(["*The 'depends_on' marks form a cycle: *::TestThree::()::test_three -> *::test_one -> "
+                                 "*::test_two -> *::TestThree::()::test_three*"])
+
+
+def test_step_mark_outside_class(testdir):
+    """Verify that a test function marked as a test step without a class is its own node of the dependency graph."""
+
+    # Setup
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.test_case_with_steps
+        def test_lonely_step():
+            assert False
+        @pytest.mark.depends_on('test_lonely_step')
+        def test_dependent():
+            pass
+    """)
+
+    # Test
+    junit_xml = run_and_parse(testdir, 1)[0]
+
+    assert junit_xml.get_testcases('test_lonely_step')[0].outcome == 'failed'
+    assert junit_xml.get_testcase_property('test_dependent', 'skip_reason') == ['dependency_failed']
+
+
+def test_bare_names_prefer_own_module(testdir):
+    """Verify that a bare name refers to the tests of the dependent's own module before looking in other modules."""
+
+    # Setup
+    testdir.makepyfile(test_first="""
+        def test_create():
+            assert False
+        def test_unique():
+            assert False
+    """, test_second="""
+        import pytest
+        def test_create():
+            pass
+        @pytest.mark.depends_on('test_create')
+        def test_local():
+            pass
+        @pytest.mark.depends_on('test_unique')
+        def test_remote():
+            pass
+    """)
+
+    # Test
+    junit_xml = run_and_parse(testdir, 1)[0]
+
+    assert junit_xml.get_testcases('test_local')[0].outcome == 'passed'
+    assert junit_xml.get_testcase_property('test_remote', 'skip_reason') == ['dependency_failed']
+
+
+def test_ambiguous_bare_name(testdir):
+    """Verify that a bare name matching tests in several other modules is reported at collection."""
+
+    # Setup
+    testdir.makepyfile(test_first="""
+        def test_create():
+            pass
+    """, test_second="""
+        def test_create():
+            pass
+    """, test_third="""
+        import pytest
+        @pytest.mark.depends_on('test_create')
+        def test_dependent():
+            pass
+    """)
+
+    # Test
+    result = testdir.runpytest()
+
+    assert result.ret == 1
+    result.stdout.fnmatch_lines(["*The 'depends_on' target 'test_create' of 'test_third.py::test_dependent' matches "
+                                 "tests in several other modules: test_first.py, test_second.py*"])
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for dry run uploads which measure the payload build cost without sending anything."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import json
+import pytest
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def two_tests(testdir):
+    """A passing and a failing test."""
+
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.test_id('pass_id')
+        @pytest.mark.jira('ASC-1')
+        def test_pass():
+            pass
+        @pytest.mark.test_id('fail_id')
+        @pytest.mark.jira('ASC-2')
+        def test_fail():
+            assert False
+    """)
+
+    return testdir
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_dry_run(two_tests, simple_test_config, mocker):
+    """Verify that a dry run reports each stage, the payload size and the peak memory and writes the payload."""
+
+    # Setup
+    mocker.patch.dict('os.environ', {'QTEST_API_TOKEN': 'validtoken'})
+    upload = mocker.patch('zigzag.zigzag.ZigZag.upload_test_results')
+    payload_path = two_tests.tmpdir.join('payload.json')
+
+    # Test
+    result = two_tests.runpytest("--junitxml={}".format(two_tests.tmpdir.join('junit.xml')),
+                                 "--pytest-zigzag-config={}".format(simple_test_config),
+                                 "--zigzag-dry-run",
+                                 "--zigzag-dry-run-payload={}".format(payload_path))
+
+    assert not upload.called
+    result.stdout.fnmatch_lines(["ZigZag dry run with the 'zigzag' backend (nothing was sent):",
+                                 '  prepare: *s',
+                                 '  validate: *s',
+                                 '  build: *s',
+                                 '  parse: *s',
+                                 '  serialize: *s',
+                                 '  payload: {} bytes in 1 document(s)'.format(payload_path.size()),
+                                 '  peak memory: * MiB *',
+                                 '  payload written to: {}'.format(payload_path)])
+    payload = json.loads(payload_path.read())
+    assert sorted((log['name'], log['status']) for log in payload['test_logs']) == [('test_fail', 'FAILED'),
+                                                                                    ('test_pass', 'PASSED')]
+
+
+def test_dry_run_chunks(two_tests, simple_test_config, tmpdir):
+    """Verify that a dry run serializes every chunk with the directory backend without creating the destination."""
+
+    # Setup
+    upload_dir = tmpdir.join('uploads')
+
+    # Test
+    result = two_tests.runpytest("--junitxml={}".format(two_tests.tmpdir.join('junit.xml')),
+                                 "--pytest-zigzag-config={}".format(simple_test_config),
+                                 "--zigzag-dry-run",
+                                 "--zigzag-backend=directory",
+                                 "--zigzag-upload-dir={}".format(upload_dir),
+                                 "--zigzag-max-payload-bytes=1000")
+
+    result.stdout.fnmatch_lines(['  payload: * bytes in 2 document(s)'])
+    assert not upload_dir.check()
+
+
+def test_dry_run_without_token(two_tests, simple_test_config, mocker):
+    """Verify that a dry run fails at the token validation stage when there is no qTest API token."""
+
+    # Setup
+    mocker.patch.dict('os.environ', clear=True)
+
+    # Test
+    result = two_tests.runpytest("--junitxml={}".format(two_tests.tmpdir.join('junit.xml')),
+                                 "--pytest-zigzag-config={}".format(simple_test_config),
+                                 "--zigzag-dry-run")
+
+    assert 'The ZigZag dry run was not successful' in result.outlines
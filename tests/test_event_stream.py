@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for the live event stream of test results."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import json
+import time
+import socket
+import threading
+from tests.conftest import merge_dicts, run_and_parse
+from pytest_zigzag.events import EventStream
+
+
+# ======================================================================================================================
+# Helpers
+# ======================================================================================================================
+def _read_in_background(open_func):
+    """Read everything from a file like object in a background thread.
+
+    Args:
+        open_func (callable): A function that returns a file like object opened for reading in binary mode.
+
+    Returns:
+        tuple: (threading.Thread: The reader thread, list(bytes): The chunks read so far)
+    """
+
+    chunks = []
+
+    def target():
+        reader = open_func()
+        for chunk in iter(lambda: reader.read(4096), b''):
+            chunks.append(chunk)
+        reader.close()
+
+    thread = threading.Thread(target=target)
+    thread.daemon = True
+    thread.start()
+
+    return thread, chunks
+
+
+def _parse_events(data):
+    """Parse newline delimited JSON events.
+
+    Args:
+        data (bytes): The raw event stream.
+
+    Returns:
+        list(dict): The events.
+    """
+
+    return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_events_to_file(testdir, properly_decorated_test_class_with_steps, simple_test_config):
+    """Verify that one event per test phase is appended to a file along with session events."""
+
+    # Setup
+    test_steps = {'test_step_one': 'test_step_one',
+                  'test_step_two': 'test_step_two',
+                  'test_step_three': 'test_step_three'}
+    tc_props = {'test_name': 'TestCaseWithSteps', 'test_id': 'test_case_class_id', 'jira_id': 'ASC-123'}
+    testdir.makepyfile(properly_decorated_test_class_with_steps.format(**merge_dicts(test_steps, tc_props)))
+    events_path = testdir.tmpdir.join('events.jsonl')
+
+    args = ["--pytest-zigzag-config", simple_test_config, "--zigzag-event-stream", str(events_path)]
+    result = run_and_parse(testdir, 0, args)[1]
+
+    # Test
+    events = _parse_events(events_path.read_binary())
+    test_events = [e for e in events if e['event'] == 'test_report']
+
+    assert [e['event'] for e in events][:2] == ['session_start', 'collection_finish']
+    assert events[-1]['event'] == 'session_finish'
+    assert len(test_events) == 9
+    assert len(set(e['session'] for e in events)) == 1
+    assert set(e['when'] for e in test_events) == {'setup', 'call', 'teardown'}
+    for event in test_events:
+        assert event['test_id'] == 'test_case_class_id'
+        assert event['jira'] == ['ASC-123']
+        assert event['test_step'] is True
+        assert event['step_class'].endswith('::TestCaseWithSteps')
+        assert event['outcome'] == 'passed'
+    assert 'ZigZag event stream: 12 events written, 0 dropped' in result.outlines
+
+
+def test_events_to_unix_socket(testdir, properly_decorated_test_function, simple_test_config):
+    """Verify that events can be streamed to a Unix domain socket."""
+
+    # Setup
+    testdir.makepyfile(properly_decorated_test_function.format(test_name='test_socket', test_id='socket_id',
+                                                               jira_id='ASC-123'))
+    socket_path = str(testdir.tmpdir.join('events.sock'))
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+    reader, chunks = _read_in_background(lambda: server.accept()[0].makefile('rb'))
+
+    args = ["--pytest-zigzag-config", simple_test_config, "--zigzag-event-stream", 'unix:{}'.format(socket_path)]
+    run_and_parse(testdir, 0, args)
+    reader.join(5)
+    server.close()
+
+    # Test
+    events = _parse_events(b''.join(chunks))
+    assert len(events) == 6
+    assert [e['test_id'] for e in events if e['event'] == 'test_report'] == ['socket_id'] * 3
+
+
+def test_events_to_named_pipe(testdir, properly_decorated_test_function, simple_test_config):
+    """Verify that events can be streamed to a named pipe."""
+
+    # Setup
+    testdir.makepyfile(properly_decorated_test_function.format(test_name='test_pipe', test_id='pipe_id',
+                                                               jira_id='ASC-123'))
+    fifo_path = str(testdir.tmpdir.join('events.fifo'))
+    os.mkfifo(fifo_path)
+    reader, chunks = _read_in_background(lambda: open(fifo_path, 'rb'))
+
+    args = ["--pytest-zigzag-config", simple_test_config, "--zigzag-event-stream", fifo_path]
+    run_and_parse(testdir, 0, args)
+    reader.join(5)
+
+    # Test
+    events = _parse_events(b''.join(chunks))
+    assert [e['event'] for e in events] == ['session_start', 'collection_finish'] + ['test_report'] * 3 + \
+        ['session_finish']
+
+
+def test_full_buffer_drops_events(tmpdir):
+    """Verify that emitting never blocks and events are dropped and counted when the buffer is full."""
+
+    # Setup
+    fifo_path = str(tmpdir.join('events.fifo'))
+    os.mkfifo(fifo_path)  # nobody reads so the writer keeps waiting for a reader
+    event_stream = EventStream(fifo_path, buffer_size=2)
+
+    # Test
+    assert [event_stream.emit({'n': n}) for n in range(5)] == [True, True, False, False, False]
+    assert event_stream.dropped == 3
+
+    event_stream.close(timeout=0.1)
+    assert event_stream.written == 0
+    assert event_stream.dropped == 5
+
+
+def test_named_pipe_without_reader(tmpdir):
+    """Verify that a named pipe nobody reads is reported instead of stalling the writer."""
+
+    # Setup
+    fifo_path = str(tmpdir.join('events.fifo'))
+    os.mkfifo(fifo_path)
+    event_stream = EventStream(fifo_path)
+    event_stream.emit({'n': 1})
+
+    # Test
+    start = time.time()
+    event_stream.close()
+
+    assert time.time() - start < 1
+    assert event_stream.written == 0
+    assert event_stream.dropped == 1
+    assert event_stream.error == "No reader opened the named pipe '{}'".format(fifo_path)
+
+
+def test_unserializable_events_are_counted(tmpdir):
+    """Verify that an event which cannot be serialized is counted and does not stop the writer."""
+
+    # Setup
+    events_path = tmpdir.join('events.jsonl')
+    event_stream = EventStream(str(events_path))
+
+    # Test
+    event_stream.emit({'n': 1})
+    event_stream.emit({'n': object()})
+    event_stream.emit({'n': 3})
+    event_stream.close()
+
+    assert event_stream.invalid == 1
+    assert event_stream.written == 2
+    assert event_stream.error is None
+    assert [e['n'] for e in _parse_events(events_path.read_binary())] == [1, 3]
+
+
+def test_step_mark_outside_class(testdir):
+    """Verify that a test function marked as a test step without a class is reported without a step class."""
+
+    # Setup
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.test_case_with_steps
+        def test_lonely_step():
+            pass
+    """)
+    events_path = testdir.tmpdir.join('events.jsonl')
+
+    # Test
+    run_and_parse(testdir, 0)
+    run_and_parse(testdir, 0, ["--zigzag-event-stream", str(events_path)])
+
+    test_events = [e for e in _parse_events(events_path.read_binary()) if e['event'] == 'test_report']
+    assert len(test_events) == 3
+    assert all(e['step_class'] is None for e in test_events)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for attributing fixture setup and teardown costs to test cases."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+from tests.conftest import run_and_parse
+from pytest_zigzag.fixture_costs import format_costs
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_fixture_costs(testdir, simple_test_config):
+    """Verify that fixture costs are charged to the test that triggered them and ranked in the terminal summary."""
+
+    # Setup
+    testdir.makepyfile("""
+        import time
+        import pytest
+        @pytest.fixture(scope='session')
+        def server():
+            time.sleep(0.2)
+            yield 'server'
+            time.sleep(0.1)
+        @pytest.fixture
+        def client(server):
+            time.sleep(0.05)
+            return 'client'
+        def test_first(client):
+            pass
+        def test_second(client):
+            pass
+    """)
+
+    # Test
+    junit_xml, result = run_and_parse(testdir, 0, ["--pytest-zigzag-config={}".format(simple_test_config),
+                                                   "--zigzag-fixture-costs"])
+
+    first_setup = junit_xml.get_testcase_property('test_first', 'fixture_setup')[0]
+    assert [name.split('=')[0] for name in first_setup.split(',')] == ['server', 'client']
+    assert float(first_setup.split(',')[0].split('=')[1]) >= 0.2
+    assert junit_xml.get_testcase_property('test_second', 'fixture_setup')[0].startswith('client=')
+    assert junit_xml.get_testcase_property('test_second', 'fixture_teardown')[0].startswith('server=0.1')
+    assert junit_xml.get_testcase_property('test_first', 'fixture_teardown') == []
+    result.stdout.fnmatch_lines(['Most expensive fixtures (setup + teardown):',
+                                 '  server (session): 0.2*s setup + 0.1*s teardown over 1 setups',
+                                 '  client (function): 0.*s setup + 0.000s teardown over 2 setups'])
+
+
+def test_fixture_costs_disabled(testdir, simple_test_config):
+    """Verify that no fixture costs are recorded unless the user enabled them."""
+
+    # Setup
+    testdir.makepyfile("""
+        import pytest
+        @pytest.fixture
+        def client():
+            return 'client'
+        def test_first(client):
+            pass
+    """)
+
+    # Test
+    junit_xml, result = run_and_parse(testdir, 0, ["--pytest-zigzag-config={}".format(simple_test_config)])
+
+    assert junit_xml.get_testcase_property('test_first', 'fixture_setup') == []
+    assert 'Most expensive fixtures (setup + teardown):' not in result.outlines
+
+
+def test_format_costs():
+    """Verify that the costs are ordered by cost and negligible fixtures are left out."""
+
+    assert format_costs({'fast': 0.0001, 'slow': 2.5, 'medium': 0.25}) == 'slow=2.500,medium=0.250'
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for flaky test detection from the local outcome history."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import pytest
+from tests.conftest import run_and_parse
+from pytest_zigzag.flaky import flip_rate, OutcomeHistory
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def flapping_tests(testdir):
+    """A stable test and a test which alternates between failing and passing on every run."""
+
+    testdir.makepyfile("""
+        import os
+        import pytest
+        @pytest.mark.test_id('stable_id')
+        def test_stable():
+            pass
+        @pytest.mark.test_id('flapping_id')
+        def test_flapping():
+            runs = int(open('runs').read()) if os.path.exists('runs') else 0
+            open('runs', 'w').write(str(runs + 1))
+            assert runs % 2
+    """)
+
+    return testdir
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+@pytest.mark.parametrize('outcomes,expected', [
+    ('', None),
+    ('P', None),
+    ('PPPP', 0.0),
+    ('PFPF', 1.0),
+    ('PSSF', 1.0),
+    ('PPFF', 1.0 / 3),
+])
+def test_flip_rate(outcomes, expected):
+    """Verify that skipped runs are ignored and flips are counted between consecutive runs."""
+
+    assert flip_rate(outcomes) == expected
+
+
+def test_flip_rate_reported(flapping_tests, simple_test_config):
+    """Verify that the flip rate is recorded as a testcase property and flaky tests are listed in the summary."""
+
+    # Setup
+    testdir = flapping_tests
+    args = ["--pytest-zigzag-config", simple_test_config, "--zigzag-history={}".format(testdir.tmpdir.join('h.db'))]
+
+    # Test
+    run_and_parse(testdir, 1, args)
+    junit_xml = run_and_parse(testdir, 0, args)[0]
+    assert 'flip_rate' not in junit_xml.get_testcase_properties('test_flapping')  # a single run has no flip rate
+
+    junit_xml, result = run_and_parse(testdir, 1, args)
+    assert junit_xml.get_testcase_properties('test_flapping')['flip_rate'] == '1.00'
+    assert junit_xml.get_testcase_properties('test_stable')['flip_rate'] == '0.00'
+    assert 'Flaky tests (flip rate >= 0.30):' in result.outlines
+    assert '  flapping_id: 1.00' in result.outlines
+    assert '  stable_id: 0.00' not in result.outlines
+
+
+def test_quarantine(flapping_tests, simple_test_config):
+    """Verify that flaky tests can be excluded from a run or run on their own."""
+
+    # Setup
+    testdir = flapping_tests
+    args = ["--pytest-zigzag-config", simple_test_config, "--zigzag-history={}".format(testdir.tmpdir.join('h.db'))]
+    for _ in range(3):
+        testdir.runpytest(*args)
+
+    # Test
+    result = run_and_parse(testdir, 0, args + ['--zigzag-quarantine=exclude'])[1]
+    result.assert_outcomes(passed=1)
+    assert '1 deselected' in result.stdout.str()
+    assert 'Quarantined 1 flaky tests' in result.outlines
+
+    junit_xml, result = run_and_parse(testdir, 0, args + ['--zigzag-quarantine=only'])
+    result.assert_outcomes(passed=1)
+    assert junit_xml.get_testcase_properties('test_flapping')['test_id'] == 'flapping_id'
+
+
+def test_quarantine_invalid_mode(flapping_tests, simple_test_config):
+    """Verify that an unknown quarantine mode is rejected."""
+
+    # Test
+    result = flapping_tests.runpytest("--pytest-zigzag-config", simple_test_config, "--zigzag-quarantine=sometimes")
+
+    assert "The 'zigzag-quarantine' option must be one of: exclude, only" in result.stderr.str() + result.stdout.str()
+
+
+def test_concurrent_sessions_keep_outcomes(tmpdir):
+    """Verify that sessions sharing a history append their outcomes instead of overwriting each other's."""
+
+    # Setup
+    path = str(tmpdir.join('history.sqlite'))
+    first = OutcomeHistory(path, window=4)
+    second = OutcomeHistory(path, window=4)  # both read the history before either of them saves
+    first.record('shared_id', 'P')
+    first.record('first_id', 'F')
+    second.record('shared_id', 'F')
+
+    # Test
+    first.save()
+    second.save()
+
+    assert OutcomeHistory(path).outcomes == {'shared_id': 'PF', 'first_id': 'F'}
+    for _ in range(3):
+        second.record('shared_id', 'P')
+        second.save()
+    assert OutcomeHistory(path).outcomes['shared_id'] == 'FPPP'  # only the window is kept
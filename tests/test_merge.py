@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for merging the results of several sessions into one deduplicated results file."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import pytest
+from tests.conftest import JunitXml
+from pytest_zigzag.cli import main
+from pytest_zigzag.merge import merge_results
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+SUITE_XML = """<?xml version="1.0" encoding="utf-8"?>
+<testsuite errors="0" failures="0" name="pytest" skips="0" tests="0" time="{time}">
+  <properties><property name="BUILD_URL" value="build-1"/><property name="SCENARIO" value="{scenario}"/></properties>
+{testcases}
+</testsuite>
+"""
+TESTCASE_XML = """  <testcase classname="test_a" name="{name}" time="1.0">
+    <properties><property name="test_id" value="{test_id}"/></properties>{outcome}
+  </testcase>"""
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _write_results(path, scenario, testcases):
+    """Write a JUnitXML results file.
+
+    Args:
+        path (py.path.local): The destination path.
+        scenario (str): The value of the 'SCENARIO' global property.
+        testcases (list(tuple)): A list of (name, test_id, outcome) tuples where outcome is 'passed' or the tag of an
+            outcome element.
+    """
+
+    path.write(SUITE_XML.format(time=10, scenario=scenario, testcases='\n'.join(
+        TESTCASE_XML.format(name=name, test_id=test_id,
+                            outcome='' if outcome == 'passed' else '<{} message="x"/>'.format(outcome))
+        for name, test_id, outcome in testcases)))
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def two_scenarios(tmpdir):
+    """The results of the same tests run by two scenarios."""
+
+    first = tmpdir.join('default.xml')
+    second = tmpdir.join('upgrade.xml')
+    _write_results(first, 'default', [('test_flaky', 'flaky_id', 'failure'),
+                                      ('test_breaks', 'breaks_id', 'passed'),
+                                      ('test_step_one', 'steps_id', 'passed'),
+                                      ('test_step_two', 'steps_id', 'passed'),
+                                      ('test_only_default', 'default_id', 'skipped')])
+    _write_results(second, 'upgrade', [('test_flaky', 'flaky_id', 'passed'),
+                                       ('test_breaks', 'breaks_id', 'error'),
+                                       ('test_step_one', 'steps_id', 'passed'),
+                                       ('test_step_two', 'steps_id', 'passed')])
+
+    return str(first), str(second)
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+@pytest.mark.parametrize('strategy, flaky_outcome', [('last', 'passed'), ('worst', 'failed')])
+def test_merge_results(two_scenarios, tmpdir, strategy, flaky_outcome):
+    """Verify that testcases are deduplicated by test_id and name and that the global properties are reconciled."""
+
+    # Setup
+    output = str(tmpdir.join('merged.xml'))
+
+    # Test
+    assert merge_results(list(two_scenarios), output, strategy) == (5, 4)
+
+    merged = JunitXml(output)
+    outcomes = {tc.name: tc.outcome for tc in merged.testcases}
+    assert outcomes == {'test_flaky': flaky_outcome,
+                        'test_breaks': 'error',
+                        'test_step_one': 'passed',
+                        'test_step_two': 'passed',
+                        'test_only_default': 'skipped'}
+    assert merged.testsuite_props['SCENARIO'] == 'upgrade'
+    assert merged.testsuite_props['BUILD_URL'] == 'build-1'
+    assert merged.testsuite_props['zigzag_merged_files'] == '2'
+    assert merged.testsuite_attribs['tests'] == '5'
+    assert merged.testsuite_attribs['errors'] == '1'
+    assert merged.testsuite_attribs['failures'] == ('1' if strategy == 'worst' else '0')
+    assert merged.testsuite_attribs['time'] == '20.000'
+
+
+def test_cli_merge(two_scenarios, tmpdir, capsys):
+    """Verify that the console script merges a directory of results files."""
+
+    # Setup
+    output = tmpdir.join('merged.xml')
+
+    # Test
+    assert main(['merge', str(output), str(tmpdir), '--order', 'name', '--strategy', 'worst']) == 0
+
+    assert "Merged 2 results files into '{}': 5 testcases (4 duplicates dropped)".format(output) in \
+        capsys.readouterr()[0]
+    assert len(JunitXml(str(output)).testcases) == 5
+
+
+def test_merge_into(testdir, single_decorated_test_function, simple_test_config):
+    """Verify that consecutive sessions accumulate their results in one file and that only the merged file is uploaded
+    when requested."""
+
+    # Setup
+    testdir.makepyfile(single_decorated_test_function.format(mark_type='test_id',
+                                                             mark_arg='123e4567-e89b-12d3-a456-426655440000',
+                                                             test_name='test_uuid'))
+    merged = testdir.tmpdir.join('merged.xml')
+    upload_dir = testdir.tmpdir.join('uploads')
+    args = ["--junitxml={}".format(testdir.tmpdir.join('junit.xml')),
+            "--pytest-zigzag-config={}".format(simple_test_config),
+            "--zigzag-merge-into={}".format(merged)]
+
+    # Test
+    for _ in range(2):
+        result = testdir.runpytest(*args)
+        result.stdout.fnmatch_lines(["Merged the results into '*merged.xml': 1 testcases (* duplicates dropped)"])
+    assert not upload_dir.check()
+
+    testdir.makepyfile(test_other="""
+        import pytest
+        @pytest.mark.test_id('other_id')
+        def test_other():
+            pass
+    """)
+    result = testdir.runpytest(*args + ["--zigzag",
+                                        "--zigzag-backend=directory",
+                                        "--zigzag-upload-dir={}".format(upload_dir)])
+
+    result.stdout.fnmatch_lines(["Merged the results into '*merged.xml': 2 testcases (1 duplicates dropped)"])
+    assert 'ZigZag upload was successful!' in result.outlines
+    uploaded = JunitXml(str(upload_dir.listdir()[0]))
+    assert sorted(tc.name for tc in uploaded.testcases) == ['test_other', 'test_uuid']
+    assert uploaded.testsuite_props['zigzag_merged_files'] == '3'
+
+
+def test_invalid_merge_strategy(testdir, single_decorated_test_function):
+    """Verify that an unknown merge strategy stops the session."""
+
+    # Setup
+    testdir.makepyfile(single_decorated_test_function.format(mark_type='test_id', mark_arg='1', test_name='test_one'))
+
+    # Test
+    result = testdir.runpytest("--zigzag-merge-strategy=best")
+
+    assert result.ret == 1
+    result.stdout.fnmatch_lines(["*The 'zigzag-merge-strategy' option must be one of: last, worst*"])
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for the session and upload metrics written as a Prometheus textfile and as JSON."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import json
+import pytest
+from pytest_zigzag.backends import UploadBackend
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def two_tests(testdir):
+    """A passing and a failing test."""
+
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.test_id('pass_id')
+        @pytest.mark.jira('ASC-1')
+        def test_pass():
+            pass
+        @pytest.mark.test_id('fail_id')
+        @pytest.mark.jira('ASC-2')
+        def test_fail():
+            assert False
+    """)
+
+    return testdir
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_metrics_of_upload(two_tests, simple_test_config, stub_upload_server):
+    """Verify that the test outcomes and the upload timings are written to the textfile and the JSON file."""
+
+    # Setup
+    stub_upload_server.script = [(500, 0)]
+    textfile = two_tests.tmpdir.join('zigzag.prom')
+    json_file = two_tests.tmpdir.join('zigzag.json')
+
+    # Test
+    result = two_tests.runpytest("--junitxml={}".format(two_tests.tmpdir.join('junit.xml')),
+                                 "--pytest-zigzag-config={}".format(simple_test_config),
+                                 "--zigzag",
+                                 "--zigzag-backend=http",
+                                 "--zigzag-upload-url={}".format(stub_upload_server.url),
+                                 "--zigzag-upload-retries=1",
+                                 "--zigzag-upload-backoff=0",
+                                 "--zigzag-metrics-textfile={}".format(textfile),
+                                 "--zigzag-metrics-json={}".format(json_file))
+
+    assert 'ZigZag upload was successful!' in result.outlines
+    metrics = json.loads(json_file.read())
+    assert metrics['zigzag_session_tests'] == {'passed': 1, 'failed': 1, 'error': 0, 'skipped': 0}
+    assert metrics['zigzag_upload_success'] == 1
+    assert metrics['zigzag_upload_documents'] == 1
+    assert metrics['zigzag_upload_requests'] == {'success': 1, 'failure': 1}
+    assert metrics['zigzag_upload_retries'] == 1
+    assert metrics['zigzag_upload_sent_bytes'] == stub_upload_server.bytes_received
+    assert set(metrics['zigzag_upload_stage_duration_seconds']) == {'config', 'prepare', 'validate', 'upload',
+                                                                    'attachments'}
+
+    lines = textfile.read().splitlines()
+    assert '# TYPE zigzag_upload_success gauge' in lines
+    assert 'zigzag_upload_success 1' in lines
+    assert 'zigzag_session_tests{outcome="failed"} 1' in lines
+    assert 'zigzag_upload_requests{result="failure"} 1' in lines
+    assert not two_tests.tmpdir.listdir('*.tmp')
+
+
+def test_metrics_of_custom_upload(two_tests, simple_test_config, mocker):
+    """Verify that a third-party backend which only overrides 'upload' is still used, and timed as a whole, when
+    metrics are enabled."""
+
+    # Setup
+    uploaded = []
+
+    class CustomBackend(UploadBackend):
+        name = 'custom'
+
+        def upload(self, file_path):
+            uploaded.append(file_path)
+            return 'custom-job'
+
+    entry_point = mocker.Mock()
+    entry_point.load.return_value = CustomBackend
+    mocker.patch('pytest_zigzag.backends.iter_entry_points', return_value=[entry_point])
+    json_file = two_tests.tmpdir.join('zigzag.json')
+
+    # Test
+    result = two_tests.runpytest("--junitxml={}".format(two_tests.tmpdir.join('junit.xml')),
+                                 "--pytest-zigzag-config={}".format(simple_test_config),
+                                 "--zigzag",
+                                 "--zigzag-backend=custom",
+                                 "--zigzag-metrics-json={}".format(json_file))
+
+    assert 'Queue Job ID: custom-job' in result.outlines
+    assert len(uploaded) == 1
+    metrics = json.loads(json_file.read())
+    assert metrics['zigzag_upload_requests'] == {'success': 1, 'failure': 0}
+
+
+def test_metrics_without_upload(two_tests):
+    """Verify that only the session metrics are written when nothing is uploaded."""
+
+    # Setup
+    json_file = two_tests.tmpdir.join('zigzag.json')
+
+    # Test
+    two_tests.runpytest("--zigzag-metrics-json={}".format(json_file))
+
+    metrics = json.loads(json_file.read())
+    assert metrics['zigzag_session_tests']['passed'] == 1
+    assert metrics['zigzag_session_duration_seconds'] > 0
+    assert not any(name.startswith('zigzag_upload_') for name in metrics)
+
+
+def test_metrics_write_failure(two_tests):
+    """Verify that a metrics file which cannot be written is reported without failing the session."""
+
+    # Test
+    result = two_tests.runpytest("--zigzag-metrics-textfile={}".format(two_tests.tmpdir.join('missing', 'zz.prom')))
+
+    assert result.ret == 1  # the failing test
+    result.stdout.fnmatch_lines(["Failed to write the metrics to '*zz.prom': *"])
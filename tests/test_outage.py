@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for the outage breaker which skips the rest of a group once its tests fail in the same way."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+from tests.conftest import run_and_parse
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_outage_breaker(testdir):
+    """Verify that consecutive failures with the same signature skip the rest of the module but not other modules."""
+
+    # Setup
+    testdir.makepyfile(test_nova="""
+        import pytest
+        def connect(port):
+            raise IOError('Connection refused to 10.0.0.{}:{}'.format(port, port))
+        @pytest.fixture
+        def client(request):
+            return connect(request.node.name.count('_'))
+        def test_assert_one():
+            assert False
+        def test_assert_two():
+            assert False
+        @pytest.mark.parametrize('n', range(3))
+        def test_list_servers(n):
+            connect(n)
+        def test_boot(client):
+            pass
+        def test_delete():
+            pass
+    """, test_glance="""
+        def test_list_images():
+            pass
+    """)
+
+    # Test
+    junit_xml, result = run_and_parse(testdir, 1, ['--zigzag-outage-threshold=3'])
+
+    outcomes = {tc.name: tc.outcome for tc in junit_xml.testcases}
+    assert outcomes == {'test_assert_one': 'failed',
+                        'test_assert_two': 'failed',
+                        'test_list_servers[0]': 'failed',
+                        'test_list_servers[1]': 'failed',
+                        'test_list_servers[2]': 'failed',
+                        'test_boot': 'skipped',
+                        'test_delete': 'skipped',
+                        'test_list_images': 'passed'}
+    assert junit_xml.get_testcase_property('test_boot', 'skip_reason') == ['outage']
+    signature = junit_xml.get_testcase_property('test_delete', 'outage_signature')
+    assert len(signature) == 1
+    result.stdout.fnmatch_lines(["Outage breaker tripped in 'test_nova.py' ({}): skipped 2 tests after: "
+                                 "{}: Connection refused to 10.0.0.2:2".format(signature[0],
+                                                                               IOError.__name__)])  # OSError on py3
+
+
+def test_outage_breaker_grouped_by_mark(testdir):
+    """Verify that tests are grouped by a mark and that a passing test resets the count of its group."""
+
+    # Setup
+    testdir.makepyfile("""
+        import pytest
+        def down():
+            raise IOError('Service Unavailable')
+        @pytest.mark.service('neutron')
+        def test_one():
+            down()
+        @pytest.mark.service('keystone')
+        def test_two():
+            pass
+        @pytest.mark.service('neutron')
+        def test_three():
+            down()
+        @pytest.mark.service('keystone')
+        def test_four():
+            down()
+        @pytest.mark.service('keystone')
+        def test_five():
+            pass
+        @pytest.mark.service('keystone')
+        def test_six():
+            down()
+        @pytest.mark.service('neutron')
+        def test_seven():
+            pass
+    """)
+
+    # Test
+    junit_xml = run_and_parse(testdir, 1, ['--zigzag-outage-threshold=2', '--zigzag-outage-mark=service'])[0]
+
+    assert junit_xml.get_testcases('test_six')[0].outcome == 'failed'
+    assert junit_xml.get_testcases('test_seven')[0].outcome == 'skipped'
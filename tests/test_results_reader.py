@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for the indexed JUnitXML results reader."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import pytest
+from pytest_zigzag.results import ResultsReader, iter_testcases
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def results_file(tmpdir):
+    """A small JUnitXML results file with suite properties, steps sharing a 'test_id' and mixed outcomes."""
+
+    path = tmpdir.join('junit.xml')
+    path.write("""<?xml version="1.0" encoding="utf-8"?>
+<testsuite errors="0" failures="1" name="pytest" skips="1" tests="3" time="0.5">
+  <properties><property name="BUILD_URL" value="http://build"/></properties>
+  <testcase classname="test_a.TestSteps" name="test_step_one" time="0.1">
+    <properties>
+      <property name="test_id" value="steps_id"/>
+      <property name="jira" value="ASC-1"/>
+      <property name="jira" value="ASC-2"/>
+    </properties>
+  </testcase>
+  <testcase classname="test_a.TestSteps" name="test_step_two" time="0.3">
+    <properties><property name="test_id" value="steps_id"/><property name="jira" value="ASC-1"/></properties>
+    <failure message="assert False">long traceback</failure>
+  </testcase>
+  <testcase classname="test_a" name="test_skipped" time="0.1">
+    <properties><property name="test_id" value="skip_id"/></properties>
+    <skipped message="not today"/>
+  </testcase>
+</testsuite>
+""")
+
+    return str(path)
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_suite_attributes_and_properties(results_file):
+    """Verify that the suite attributes and properties are read."""
+
+    reader = ResultsReader(results_file)
+
+    assert reader.testsuite_attribs['tests'] == '3'
+    assert reader.testsuite_props == {'BUILD_URL': 'http://build'}
+
+
+def test_lookups(results_file):
+    """Verify lookups by testcase name, 'test_id' and 'jira'."""
+
+    reader = ResultsReader(results_file)
+
+    assert reader.get_testcase_property('test_step_one', 'jira') == ['ASC-1', 'ASC-2']
+    assert reader.get_testcase_properties('test_skipped') == {'test_id': 'skip_id'}
+    assert reader.get_testcase_properties('missing') == {}
+    assert [t.name for t in reader.get_testcases_by_test_id('steps_id')] == ['test_step_one', 'test_step_two']
+    assert [t.name for t in reader.get_testcases_by_jira('ASC-2')] == ['test_step_one']
+    assert [t.outcome for t in reader.testcases] == ['passed', 'failed', 'skipped']
+    assert reader.get_testcases('test_step_two')[0].time == pytest.approx(0.3)
+
+
+def test_iter_testcases(results_file):
+    """Verify that testcases can be streamed without building indexes."""
+
+    assert [(t.classname, t.name) for t in iter_testcases(results_file)] == [('test_a.TestSteps', 'test_step_one'),
+                                                                             ('test_a.TestSteps', 'test_step_two'),
+                                                                             ('test_a', 'test_skipped')]
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for resuming 'test_case_with_steps' classes from the failed step on rerun."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import pytest
+from tests.conftest import run_and_parse
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def step_class_failing_on_flag(testdir):
+    """A test case with steps class whose second step fails while a 'fail_flag' file exists in the test directory."""
+
+    testdir.makepyfile("""
+        import os
+        import pytest
+        @pytest.mark.test_id('test_case_class_id')
+        @pytest.mark.jira('ASC-123')
+        @pytest.mark.test_case_with_steps
+        class TestCaseWithSteps(object):
+            def test_step_one(self):
+                pass
+            def test_step_two(self):
+                assert not os.path.exists('fail_flag')
+            def test_step_three(self):
+                pass
+            def test_step_four(self):
+                pass
+    """)
+    testdir.tmpdir.join('fail_flag').write('')
+
+    return testdir
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_resume_from_failed_step(step_class_failing_on_flag, simple_test_config):
+    """Verify that steps which passed before the failure are deselected on rerun and the remaining steps are marked."""
+
+    # Setup
+    testdir = step_class_failing_on_flag
+    args = ["--pytest-zigzag-config", simple_test_config, "--zigzag-resume-steps"]
+
+    # Test
+    run_and_parse(testdir, 1, args)
+    testdir.tmpdir.join('fail_flag').remove()
+
+    junit_xml, result = run_and_parse(testdir, 0, args)
+    result.assert_outcomes(passed=3)
+    assert '1 deselected' in result.stdout.str()
+    assert junit_xml.testsuite_props['resumed_step_classes'] == '1'
+    assert not junit_xml.get_testcase_properties('test_step_one')
+    for step in ('test_step_two', 'test_step_three', 'test_step_four'):
+        assert junit_xml.get_testcase_properties(step)['resumed_after_step'] == 'test_step_one'
+        assert junit_xml.get_testcase_properties(step)['resumed_steps_deselected'] == '1'
+
+    # The class completed so the next run starts from the beginning
+    junit_xml, result = run_and_parse(testdir, 0, args)
+    result.assert_outcomes(passed=4)
+    assert 'resumed_step_classes' not in junit_xml.testsuite_props
+
+
+def test_resume_discarded_when_file_changes(step_class_failing_on_flag, simple_test_config):
+    """Verify that saved progress is ignored once the test file has changed."""
+
+    # Setup
+    testdir = step_class_failing_on_flag
+    args = ["--pytest-zigzag-config", simple_test_config, "--zigzag-resume-steps"]
+
+    # Test
+    run_and_parse(testdir, 1, args)
+    testdir.tmpdir.join('fail_flag').remove()
+    test_file = testdir.tmpdir.join('test_resume_discarded_when_file_changes.py')
+    test_file.write(test_file.read() + '\n# changed\n')
+
+    result = run_and_parse(testdir, 0, args)[1]
+    result.assert_outcomes(passed=4)
+
+
+def test_resume_disabled_by_default(step_class_failing_on_flag, simple_test_config):
+    """Verify that step classes start from the first step unless resuming is enabled."""
+
+    # Setup
+    testdir = step_class_failing_on_flag
+    args = ["--pytest-zigzag-config", simple_test_config]
+
+    # Test
+    run_and_parse(testdir, 1, args)
+    testdir.tmpdir.join('fail_flag').remove()
+
+    result = run_and_parse(testdir, 0, args)[1]
+    result.assert_outcomes(passed=4)
+
+
+def test_resume_ignores_step_mark_outside_class(testdir, simple_test_config):
+    """Verify that a test function marked as a test step without a class always runs."""
+
+    # Setup
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.test_case_with_steps
+        def test_lonely_step():
+            assert False
+    """)
+    args = ["--pytest-zigzag-config", simple_test_config, "--zigzag-resume-steps"]
+
+    # Test
+    for _ in range(2):
+        result = run_and_parse(testdir, 1, args)[1]
+        result.assert_outcomes(failed=1)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for rolling up 'test_case_with_steps' classes into a single testcase."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import pytest
+from tests.conftest import run_and_parse
+from pytest_zigzag.validation import validate_results_file
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def step_classes(testdir):
+    """A passing test case with steps class, a failing one and a regular test."""
+
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.test_id('passing_id')
+        @pytest.mark.jira('ASC-1')
+        @pytest.mark.test_case_with_steps
+        class TestPassing(object):
+            def test_step_one(self):
+                pass
+            def test_step_two(self):
+                pass
+        @pytest.mark.test_id('failing_id')
+        @pytest.mark.jira('ASC-2')
+        @pytest.mark.test_case_with_steps
+        class TestFailing(object):
+            def test_step_one(self):
+                pass
+            def test_step_two(self):
+                assert False, 'step two broke'
+            def test_step_three(self):
+                pass
+        @pytest.mark.test_id('regular_id')
+        @pytest.mark.jira('ASC-3')
+        def test_regular():
+            pass
+    """)
+
+    return testdir
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_rollup(step_classes, simple_test_config):
+    """Verify that each step class becomes one testcase with the packed step results."""
+
+    # Test
+    junit_xml, result = run_and_parse(step_classes, 1, ["--pytest-zigzag-config", simple_test_config,
+                                                        "--zigzag-rollup-steps"])
+
+    assert 'Rolled up 5 test steps into 2 test cases' in result.outlines
+    assert junit_xml.testsuite_attribs['tests'] == '3'
+    assert junit_xml.testsuite_attribs['failures'] == '1'
+    assert junit_xml.testsuite_attribs['skips'] == '0'
+    assert [t.name for t in junit_xml.testcases] == ['TestPassing', 'TestFailing', 'test_regular']
+
+    passing = junit_xml.get_testcase_properties('TestPassing')
+    assert passing['test_id'] == 'passing_id'
+    assert passing['jira'] == 'ASC-1'
+    assert passing['test_step'] == 'false'
+    assert passing['steps'] == '2'
+    assert passing['step_names'] == 'test_step_one,test_step_two'
+    assert passing['step_outcomes'] == 'PP'
+    assert len(passing['step_durations'].split(',')) == 2
+    assert 'first_failed_step' not in passing
+
+    failing = junit_xml.get_testcase_properties('TestFailing')
+    assert failing['step_outcomes'] == 'PFS'
+    assert failing['first_failed_step'] == 'test_step_two'
+    assert junit_xml.get_testcases('TestFailing')[0].outcome == 'failed'
+    assert 'step two broke' in junit_xml.xml_doc.find("./testcase[@name='TestFailing']/failure").get('message')
+
+    assert junit_xml.get_testcase_properties('test_regular')['test_id'] == 'regular_id'
+    assert validate_results_file(str(step_classes.tmpdir.join('junit.xml'))).invalid == []
+
+
+def test_rollup_disabled_by_default(step_classes, simple_test_config):
+    """Verify that every step is a testcase unless the roll up is enabled."""
+
+    # Test
+    junit_xml = run_and_parse(step_classes, 1, ["--pytest-zigzag-config", simple_test_config])[0]
+
+    assert junit_xml.testsuite_attribs['tests'] == '6'
+    assert not junit_xml.get_testcases('TestPassing')
+
+
+def test_rollup_keeps_properties_of_later_steps(testdir, simple_test_config):
+    """Verify that properties which only later steps have are kept on the rolled up testcase."""
+
+    # Setup
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.test_id('steps_id')
+        @pytest.mark.test_case_with_steps
+        class TestSteps(object):
+            def test_step_one(self):
+                pass
+            def test_step_two(self, record_property):
+                record_property('server_id', 'abc')
+            def test_step_three(self, record_property):
+                record_property('server_id', 'def')
+                record_property('skip_reason', 'time_budget')
+    """)
+
+    # Test
+    junit_xml = run_and_parse(testdir, 0, ["--pytest-zigzag-config", simple_test_config, "--zigzag-rollup-steps"])[0]
+
+    props = junit_xml.get_testcase_properties('TestSteps')
+    assert props['test_id'] == 'steps_id'
+    assert props['server_id'] == 'abc'  # the first step with the property wins
+    assert props['skip_reason.test_step_three'] == 'time_budget'
+    assert 'skip_reason' not in props  # the first step decides the outcome and it has no skip reason
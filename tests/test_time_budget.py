@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for the session time budget."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+from tests.conftest import run_and_parse
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_time_budget(testdir, simple_test_config):
+    """Verify that no new tests start once the budget is used up, that a started step class finishes and that the
+    remaining tests are reported as skipped with a reason property.
+    """
+
+    # Setup
+    testdir.makepyfile("""
+        import time
+        import pytest
+        @pytest.mark.test_case_with_steps
+        class TestStarted(object):
+            def test_step_one(self):
+                time.sleep(0.6)
+            def test_step_two(self):
+                pass
+        def test_after():
+            pass
+        @pytest.mark.test_case_with_steps
+        class TestNotStarted(object):
+            def test_step_one(self):
+                pass
+            def test_step_two(self):
+                pass
+    """)
+    args = ["--pytest-zigzag-config={}".format(simple_test_config),
+            "--zigzag-time-budget=1",
+            "--zigzag-time-reserve=0.5"]
+
+    # Test
+    junit_xml, result = run_and_parse(testdir, 0, args)
+
+    outcomes = {'{}.{}'.format(t.classname.rpartition('.')[2], t.name): t.outcome for t in junit_xml.testcases}
+    assert outcomes == {'TestStarted.test_step_one': 'passed',
+                        'TestStarted.test_step_two': 'passed',
+                        'test_time_budget.test_after': 'skipped',
+                        'TestNotStarted.test_step_one': 'skipped',
+                        'TestNotStarted.test_step_two': 'skipped'}
+    assert junit_xml.get_testcase_property('test_after', 'skip_reason') == ['time_budget_exhausted']
+    assert 'Time budget of 1.0s used up: skipped 3 tests' in result.outlines
+
+
+def test_time_budget_not_used_up(testdir, simple_test_config):
+    """Verify that nothing is skipped while the budget lasts."""
+
+    # Setup
+    testdir.makepyfile("""
+        def test_one():
+            pass
+        def test_two():
+            pass
+    """)
+
+    # Test
+    junit_xml, result = run_and_parse(testdir, 0, ["--pytest-zigzag-config={}".format(simple_test_config),
+                                                   "--zigzag-time-budget=600"])
+
+    assert [t.outcome for t in junit_xml.testcases] == ['passed', 'passed']
+    assert not [line for line in result.outlines if line.startswith('Time budget')]
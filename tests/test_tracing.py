@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for the trace spans exported as OTLP JSON."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import os
+import json
+import pytest
+from pytest_zigzag.tracing import Tracer
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def traced_tests(testdir):
+    """A passing test, a failing test and a test case with steps class."""
+
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.test_id('pass_id')
+        @pytest.mark.jira('ASC-1')
+        def test_pass():
+            pass
+        @pytest.mark.test_id('fail_id')
+        @pytest.mark.jira('ASC-2')
+        def test_fail():
+            assert False
+        @pytest.mark.test_id('steps_id')
+        @pytest.mark.jira('ASC-3')
+        @pytest.mark.test_case_with_steps
+        class TestSteps(object):
+            def test_step_one(self):
+                pass
+            def test_step_two(self):
+                pass
+    """)
+
+    return testdir
+
+
+# ======================================================================================================================
+# Functions: Private
+# ======================================================================================================================
+def _load_spans(path):
+    """Load the spans of every export request in an OTLP JSON file.
+
+    Args:
+        path (py.path.local): The OTLP JSON file.
+
+    Returns:
+        dict: Spans by name.
+    """
+
+    spans = {}
+    for line in path.read().splitlines():
+        for resource_spans in json.loads(line)['resourceSpans']:
+            assert {'key': 'service.name', 'value': {'stringValue': 'pytest-zigzag'}} in \
+                resource_spans['resource']['attributes']
+            for scope_spans in resource_spans['scopeSpans']:
+                for span in scope_spans['spans']:
+                    span['attributes'] = {a['key']: list(a['value'].values())[0] for a in span['attributes']}
+                    spans.setdefault(span['name'], []).append(span)
+
+    return spans
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_trace_spans(traced_tests, simple_test_config):
+    """Verify that the session, collection, tests, their phases, test steps and the upload are traced."""
+
+    # Setup
+    trace_path = traced_tests.tmpdir.join('trace.json')
+
+    # Test
+    result = traced_tests.runpytest("--junitxml={}".format(traced_tests.tmpdir.join('junit.xml')),
+                                    "--pytest-zigzag-config={}".format(simple_test_config),
+                                    "--zigzag",
+                                    "--zigzag-backend=directory",
+                                    "--zigzag-upload-dir={}".format(traced_tests.tmpdir.join('uploads')),
+                                    "--zigzag-trace={}".format(trace_path))
+
+    spans = _load_spans(trace_path)
+    result.stdout.fnmatch_lines(["ZigZag trace: {} spans written to '*trace.json'".format(
+        sum(len(s) for s in spans.values()))])
+
+    session = spans['session'][0]
+    assert session['parentSpanId'] == ''
+    assert session['attributes']['pytest.exitstatus'] == '1'
+    assert len({s['traceId'] for named in spans.values() for s in named}) == 1
+    assert spans['collection'][0]['parentSpanId'] == session['spanId']
+    assert spans['collection'][0]['attributes']['pytest.collected'] == '4'
+
+    test_pass, test_fail = spans['test_pass'][0], spans['test_fail'][0]
+    assert test_pass['parentSpanId'] == session['spanId']
+    assert test_pass['attributes']['test_id'] == 'pass_id'
+    assert test_pass['attributes']['jira'] == {'values': [{'stringValue': 'ASC-1'}]}
+    assert test_pass['status'] == {'code': 1}
+    assert test_fail['status']['code'] == 2
+    assert 'AssertionError' in test_fail['status']['message']
+    test_span_ids = {spans[name][0]['spanId'] for name in ('test_pass', 'test_fail', 'test_step_one', 'test_step_two')}
+    for phase in ('setup', 'call', 'teardown'):
+        assert {s['parentSpanId'] for s in spans[phase]} == test_span_ids
+    assert [s['attributes']['pytest.outcome'] for s in spans['call'] if s['parentSpanId'] == test_fail['spanId']] == \
+        ['failed']
+
+    step_class = spans['TestSteps'][0]
+    assert step_class['parentSpanId'] == session['spanId']
+    assert step_class['attributes']['test_id'] == 'steps_id'
+    assert {s['parentSpanId'] for s in spans['test_step_one'] + spans['test_step_two']} == {step_class['spanId']}
+    assert int(step_class['endTimeUnixNano']) >= int(spans['test_step_two'][0]['endTimeUnixNano'])
+
+    upload = spans['zigzag upload'][0]
+    assert upload['parentSpanId'] == session['spanId']
+    assert upload['status'] == {'code': 1}
+    assert upload['attributes']['zigzag.backend'] == 'directory'
+    assert {s['parentSpanId'] for s in spans['prepare'] + spans['validate'] + spans['upload']} == {upload['spanId']}
+
+
+def test_trace_step_failure(testdir, properly_decorated_test_class_with_step_failure):
+    """Verify that a failed test step marks its test case with steps class span as failed."""
+
+    # Setup
+    testdir.makepyfile(properly_decorated_test_class_with_step_failure.format(test_name='TestCaseWithSteps',
+                                                                              test_step_one='test_step_one',
+                                                                              test_step_two='test_step_two',
+                                                                              test_step_three='test_step_three',
+                                                                              test_step_four='test_step_four',
+                                                                              test_id='123',
+                                                                              jira_id='ASC-123'))
+    trace_path = testdir.tmpdir.join('trace.json')
+
+    # Test
+    testdir.runpytest("--zigzag-trace={}".format(trace_path))
+
+    spans = _load_spans(trace_path)
+    assert spans['TestCaseWithSteps'][0]['status'] == {'code': 2, 'message': 'step failed: test_step_two'}
+    assert 'zigzag upload' not in spans
+
+
+def test_trace_step_mark_outside_class(testdir):
+    """Verify that a test function marked as a test step without a class is traced as a plain test case."""
+
+    # Setup
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.test_case_with_steps
+        def test_lonely_step():
+            pass
+    """)
+    trace_path = testdir.tmpdir.join('trace.json')
+
+    # Test
+    result = testdir.runpytest("--zigzag-trace={}".format(trace_path))
+
+    assert result.ret == 0
+    spans = _load_spans(trace_path)
+    assert spans['test_lonely_step'][0]['parentSpanId'] == spans['session'][0]['spanId']
+
+
+def test_trace_counts_dropped_spans(tmpdir):
+    """Verify that only the spans which were written are counted as exported."""
+
+    # Setup
+    fifo_path = str(tmpdir.join('trace.fifo'))
+    os.mkfifo(fifo_path)  # nobody reads so no batch is ever written
+    tracer = Tracer(fifo_path, batch_size=2, buffer_size=1)
+
+    # Test
+    for name in ('one', 'two', 'three', 'four', 'five'):
+        tracer.record_span(name, None, 1.0, 2.0)
+    assert tracer.dropped_spans == 2  # the second batch did not fit in the buffer
+
+    tracer.close(timeout=0.1)
+    assert tracer.exported == 0
+    assert tracer.dropped_spans == 5
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for the failures-only upload policy."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import shutil
+import pytest
+from tests.conftest import JunitXml
+from pytest_zigzag.upload_policy import summarize_durations
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(scope='function')
+def mixed_results(testdir):
+    """Passing, failing and skipped tests plus a test case with steps class with a failing step."""
+
+    testdir.makepyfile("""
+        import pytest
+        @pytest.mark.test_id('pass_one_id')
+        @pytest.mark.jira('ASC-1')
+        def test_pass_one():
+            pass
+        @pytest.mark.test_id('pass_two_id')
+        @pytest.mark.jira('ASC-1')
+        def test_pass_two():
+            pass
+        @pytest.mark.test_id('fail_id')
+        @pytest.mark.jira('ASC-2')
+        def test_fail():
+            assert False
+        @pytest.mark.test_id('skip_id')
+        @pytest.mark.jira('ASC-2')
+        def test_skip():
+            pytest.skip('not today')
+        @pytest.mark.test_id('steps_id')
+        @pytest.mark.jira('ASC-3')
+        @pytest.mark.test_case_with_steps
+        class TestSteps(object):
+            def test_step_one(self):
+                pass
+            def test_step_two(self):
+                assert False
+    """)
+
+    return testdir
+
+
+@pytest.fixture(scope='function')
+def captured_upload(testdir, mocker):
+    """Mock ZigZag and keep a copy of the results file handed to it for upload."""
+
+    uploaded_path = testdir.tmpdir.join('uploaded.xml')
+
+    def zigzag(junit_file_path, pytest_zigzag_config, token):
+        shutil.copy(junit_file_path, str(uploaded_path))
+        return mocker.Mock(upload_test_results=mocker.Mock(return_value=7))
+
+    mocker.patch('pytest_zigzag.backends.ZigZag', side_effect=zigzag)
+    mocker.patch.dict('os.environ', {'QTEST_API_TOKEN': 'validtoken'})
+
+    return uploaded_path
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_failures_only_upload(mixed_results, captured_upload, simple_test_config):
+    """Verify that only the tests which did not pass are uploaded in full along with a summary of the passed tests."""
+
+    # Setup
+    result_path = mixed_results.tmpdir.join('junit.xml')
+
+    # Test
+    result = mixed_results.runpytest("--junitxml={}".format(result_path),
+                                     "--pytest-zigzag-config={}".format(simple_test_config),
+                                     "--zigzag",
+                                     "--zigzag-upload-policy=failures")
+
+    assert 'Uploading 4 failed, errored or skipped tests and a summary of 2 passed tests' in result.outlines
+    assert 'Queue Job ID: 7' in result.outlines
+    assert not mixed_results.tmpdir.join('junit.xml.zigzag-upload.xml').exists()
+    assert JunitXml(str(result_path)).testsuite_attribs['tests'] == '6'  # the local results are complete
+
+    uploaded = JunitXml(str(captured_upload))
+    assert uploaded.testsuite_attribs['tests'] == '4'
+    assert uploaded.testsuite_attribs['failures'] == '2'
+    assert uploaded.testsuite_attribs['skips'] == '1'
+    assert [t.name for t in uploaded.testcases] == ['test_fail', 'test_skip', 'test_step_one', 'test_step_two']
+    assert uploaded.testsuite_props['zigzag_upload_policy'] == 'failures'
+    assert uploaded.testsuite_props['passed_tests_summarized'] == '2'
+    assert uploaded.testsuite_props['passed_summary.test_failures_only_upload.py'].startswith('count=2 total=')
+
+
+def test_summary_grouped_by_property(mixed_results, captured_upload, simple_test_config):
+    """Verify that the passed tests can be summarized per value of a testcase property."""
+
+    # Test
+    mixed_results.runpytest("--junitxml={}".format(mixed_results.tmpdir.join('junit.xml')),
+                            "--pytest-zigzag-config={}".format(simple_test_config),
+                            "--zigzag",
+                            "--zigzag-upload-policy=failures",
+                            "--zigzag-summary-group=jira")
+
+    assert JunitXml(str(captured_upload)).testsuite_props['passed_summary.ASC-1'].startswith('count=2 ')
+
+
+def test_invalid_upload_policy(mixed_results, simple_test_config):
+    """Verify that an unknown upload policy is rejected."""
+
+    # Test
+    result = mixed_results.runpytest("--pytest-zigzag-config={}".format(simple_test_config),
+                                     "--zigzag-upload-policy=some")
+
+    assert "The 'zigzag-upload-policy' option must be one of: all, failures" in result.stdout.str()
+
+
+def test_summarize_durations():
+    """Verify the nearest rank percentiles of the duration summary."""
+
+    assert summarize_durations([float(d) for d in range(100, 0, -1)]) == \
+        'count=100 total=5050.000 p50=50.000 p90=90.000 p99=99.000 max=100.000'
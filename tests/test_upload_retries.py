@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for retrying ZigZag uploads with backoff, timeouts, a deadline and a circuit breaker."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+import json
+import pytest
+try:
+    from urllib.request import urlopen
+except ImportError:  # Python 2
+    from urllib2 import urlopen
+from pytest_zigzag.upload import CircuitBreaker, upload_with_retries
+
+
+# ======================================================================================================================
+# Helpers
+# ======================================================================================================================
+def _stub_upload(server):
+    """Build an upload function which posts to a stub upload server.
+
+    Args:
+        server (pytest_zigzag.stub_server.StubUploadServer): The stub server to post to.
+
+    Returns:
+        callable: A function that returns the job ID reported by the server.
+    """
+
+    def upload():
+        return json.loads(urlopen(server.url, data=b'<testsuite/>').read().decode('utf-8'))['id']
+
+    return upload
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_retry_until_success(stub_upload_server):
+    """Verify that failed attempts are retried and the latency of each attempt is recorded."""
+
+    # Setup
+    stub_upload_server.script = [(500, 0), (503, 0)]
+    messages = []
+
+    # Test
+    job_id = upload_with_retries(_stub_upload(stub_upload_server), messages, retries=2, backoff=0.01)
+
+    assert job_id == 3
+    assert len(stub_upload_server.requests) == 3
+    assert len(messages) == 3
+    assert messages[0].startswith('ZigZag upload attempt 1 failed after')
+    assert messages[2].startswith('ZigZag upload attempt 3 succeeded in')
+
+
+def test_retries_exhausted(stub_upload_server):
+    """Verify that an error is raised once all retries have failed."""
+
+    # Setup
+    stub_upload_server.script = [(500, 0)] * 3
+    messages = []
+
+    # Test
+    with pytest.raises(RuntimeError) as e:
+        upload_with_retries(_stub_upload(stub_upload_server), messages, retries=1, backoff=0.01)
+
+    assert 'Giving up after 2 attempt(s)' in str(e.value)
+    assert len(stub_upload_server.requests) == 2
+
+
+def test_attempt_timeout(stub_upload_server):
+    """Verify that a hung attempt is abandoned after the per-attempt timeout and not retried since it may still
+    complete."""
+
+    # Setup
+    stub_upload_server.script = [(200, 2)]
+    messages = []
+
+    # Test
+    with pytest.raises(RuntimeError) as e:
+        upload_with_retries(_stub_upload(stub_upload_server), messages, retries=1, backoff=0.01, attempt_timeout=0.5)
+
+    assert 'Not retrying after attempt 1 because the timed out upload may still complete' in str(e.value)
+    assert len(messages) == 1
+    assert messages[0].startswith('ZigZag upload attempt 1 failed after 0.5')
+
+
+def test_idempotent_attempt_timeout(stub_upload_server):
+    """Verify that a hung attempt of an idempotent upload is abandoned after the per-attempt timeout and retried."""
+
+    # Setup
+    stub_upload_server.script = [(200, 2)]
+    messages = []
+
+    # Test
+    job_id = upload_with_retries(_stub_upload(stub_upload_server), messages, retries=1, backoff=0.01,
+                                 attempt_timeout=0.5, idempotent=True)
+
+    assert job_id == 1  # the abandoned request is still sleeping on the server
+    assert messages[0].startswith('ZigZag upload attempt 1 failed after 0.5')
+    assert messages[1].startswith('ZigZag upload attempt 2 succeeded in')
+
+
+def test_deadline(stub_upload_server):
+    """Verify that retries stop once the total deadline has been reached."""
+
+    # Setup
+    stub_upload_server.script = [(200, 2)] * 5
+    messages = []
+
+    # Test
+    with pytest.raises(RuntimeError):
+        upload_with_retries(_stub_upload(stub_upload_server), messages, retries=10, backoff=0.3, jitter=0,
+                            deadline=1)
+
+    assert len(messages) <= 2
+
+
+def test_circuit_breaker(stub_upload_server):
+    """Verify that the circuit breaker stops retries after consecutive failures and only allows a single probe attempt
+    while it is open.
+    """
+
+    # Setup
+    stub_upload_server.script = [(500, 0)] * 10
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    messages = []
+
+    # Test
+    with pytest.raises(RuntimeError) as e:
+        upload_with_retries(_stub_upload(stub_upload_server), messages, retries=5, backoff=0.01, breaker=breaker)
+
+    assert 'Circuit breaker opened after 2 consecutive failures' in str(e.value)
+    assert len(stub_upload_server.requests) == 2
+    assert breaker.is_open
+
+    stub_upload_server.script = []
+    assert upload_with_retries(_stub_upload(stub_upload_server), messages, retries=5, breaker=breaker)
+    assert len(stub_upload_server.requests) == 3
+    assert not breaker.is_open
+
+
+def test_retries_inside_pytest(testdir, single_decorated_test_function, simple_test_config, mocker):
+    """Verify that the upload performed in 'pytest_sessionfinish' is retried and that each attempt is reported."""
+
+    # Setup
+    testdir.makepyfile(single_decorated_test_function.format(mark_type='test_id',
+                                                             mark_arg='123e4567-e89b-12d3-a456-426655440000',
+                                                             test_name='test_uuid'))
+    result_path = testdir.tmpdir.join('junit.xml')
+
+    # Mock
+    mocker.patch('zigzag.zigzag.ZigZag.upload_test_results', side_effect=[RuntimeError('Bad gateway'), 42])
+    mocker.patch.dict('os.environ', {'QTEST_API_TOKEN': 'validtoken'})
+
+    result = testdir.runpytest("--junitxml={}".format(result_path),
+                               "--pytest-zigzag-config={}".format(simple_test_config),
+                               "--zigzag",
+                               "--zigzag-upload-retries=2",
+                               "--zigzag-upload-backoff=0.01")
+
+    # Test
+    assert 'ZigZag upload was successful!' in result.outlines
+    assert 'Queue Job ID: 42' in result.outlines
+    result.stdout.fnmatch_lines(['ZigZag upload attempt 1 failed after*', 'ZigZag upload attempt 2 succeeded in*'])
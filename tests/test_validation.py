@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""Test cases for validating JUnitXML results files before they are uploaded."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from __future__ import absolute_import
+from pytest_zigzag import validation
+from pytest_zigzag.validation import validate_results_file
+
+
+# ======================================================================================================================
+# Helpers
+# ======================================================================================================================
+class DictCache(object):
+    """An in-memory stand-in for the pytest cache."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_valid_results_file(tmpdir):
+    """Verify that a valid results file reports no invalid testcases."""
+
+    # Setup
+    results = tmpdir.join('junit.xml')
+    results.write('<testsuite name="pytest" tests="2" failures="0" errors="0">'
+                  '<properties><property name="BUILD_URL" value="None"/></properties>'
+                  '<testcase name="test_one"/><testcase name="test_two"><system-out>hi</system-out></testcase>'
+                  '</testsuite>')
+
+    # Test
+    assert validate_results_file(str(results)) == (2, [])
+
+
+def test_only_invalid_testcases_reported(tmpdir):
+    """Verify that only the names of the testcases that violate the schema are reported."""
+
+    # Setup
+    results = tmpdir.join('junit.xml')
+    results.write('<testsuite name="pytest" tests="3" failures="0" errors="0">'
+                  '<testcase name="test_one"/>'
+                  '<testcase name="test_two" bogus="attribute"/>'
+                  '<testcase name="test_three"><unknown/></testcase>'
+                  '</testsuite>')
+
+    # Test
+    assert validate_results_file(str(results)) == (3, ['test_two', 'test_three'])
+
+
+def test_invalid_testsuite(tmpdir):
+    """Verify that a testsuite missing required attributes and malformed XML are reported."""
+
+    # Setup
+    missing_attribs = tmpdir.join('missing.xml')
+    missing_attribs.write('<testsuite name="pytest"><testcase name="test_one"/></testsuite>')
+    malformed = tmpdir.join('malformed.xml')
+    malformed.write('<testsuite name="pytest" tests="1" failures="0" errors="0"><testcase name="test_one">')
+
+    # Test
+    assert validate_results_file(str(missing_attribs)) == (1, ['<testsuite>'])
+    assert validate_results_file(str(malformed)).invalid[-1].startswith('<malformed XML:')
+
+
+def test_verdict_cached(tmpdir, mocker):
+    """Verify that the verdict is cached and invalidated when the file contents change."""
+
+    # Setup
+    cache = DictCache()
+    results = tmpdir.join('junit.xml')
+    results.write('<testsuite name="pytest" tests="1" failures="0" errors="0"><testcase name="test_one"/></testsuite>')
+    spy = mocker.spy(validation, '_validate')
+
+    # Test
+    assert validate_results_file(str(results), cache) == (1, [])
+    assert validate_results_file(str(results), cache) == (1, [])
+    assert spy.call_count == 1
+
+    results.write('<testsuite name="pytest" tests="1" failures="0" errors="0"><testcase/></testsuite>')
+    assert validate_results_file(str(results), cache) == (1, ['<unnamed testcase>'])
+    assert spy.call_count == 2
+
+
+def test_upload_skipped_for_invalid_results(testdir, simple_test_config, mocker):
+    """Verify that 'pytest_sessionfinish' skips the upload and reports the invalid testcases."""
+
+    # Setup
+    testdir.makepyfile("""
+        def test_valid():
+            pass
+        def test_invalid(record_xml_attribute):
+            record_xml_attribute('bogus', 'attribute')
+    """)
+    result_path = testdir.tmpdir.join('junit.xml')
+
+    # Mock
+    upload = mocker.patch('zigzag.zigzag.ZigZag.upload_test_results')
+    mocker.patch.dict('os.environ', {'QTEST_API_TOKEN': 'validtoken'})
+
+    result = testdir.runpytest("--junitxml={}".format(result_path),
+                               "--pytest-zigzag-config={}".format(simple_test_config),
+                               "--zigzag")
+
+    # Test
+    assert upload.call_count == 0
+    assert 'The ZigZag upload was skipped because the results file is not valid' in result.outlines
+    assert 'Invalid testcases: test_invalid' in result.outlines